@@ -1,11 +1,30 @@
 from google import genai
 from google.genai import types
 
+import os
 import json
-from typing import Dict, Optional, List
+import asyncio
+import hashlib
+import threading
+from typing import Dict, Optional, List, Any, Coroutine, Iterator, get_args, get_origin
+
+from pydantic import TypeAdapter, ValidationError
 
 from app.core.config import settings
+from app.core.path_manager import PathManager
 from app.core.logger import Logger
+from app.core.response_cache import ResponseCache
+from app.core.image_encoder import detect_image_mime_type
+from app.core.context_cache import CachedContext
+from app.core.token_planner import TokenPlanner
+from app.core.request_scheduler import RequestScheduler, PRIORITY_INTERACTIVE
+from app.core.fake_genai import FakeGenAIClient, FakeProfile, RecordingClient
+
+
+# Backends de IA (settings.ai_backend / JACA_AI_BACKEND)
+AI_BACKEND_GEMINI = "gemini"
+AI_BACKEND_FAKE = "fake"
+AI_BACKEND_RECORD = "record"
 
 
 #===========================================================================
@@ -26,41 +45,109 @@ class _GeminiClient:
         self.settings = settings
         self.logger = Logger("GeminiClient")
         self._is_configured = False
-        
+        self._cache_namespace = ""
+        self.cache = ResponseCache(
+            max_size_mb=self.settings.cache_max_size_mb,
+            ttl_hours=self.settings.cache_ttl_hours
+        )
+        self.scheduler = RequestScheduler(
+            default_rpm=self.settings.rate_limit_rpm,
+            default_tpm=self.settings.rate_limit_tpm,
+            model_limits=self.settings.rate_limits,
+            max_retries=self.settings.max_retries,
+            base_delay=self.settings.retry_base_delay,
+            max_delay=self.settings.retry_max_delay
+        )
+
+        self._connect()
+
+
+    #---------------------------------------------------------------------------------
+    # Cria o backend (cliente) usado nas chamadas
+    #---------------------------------------------------------------------------------
+    # O backend e escolhido pela variavel de ambiente JACA_AI_BACKEND ou, na falta
+    # dela, por settings.ai_backend:
+    #   "gemini": genai.Client com a API key (padrao)
+    #   "fake":   FakeGenAIClient local, sem rede nem API key; o comportamento vem
+    #             de JACA_FAKE_PROFILE (ver FakeProfile)
+    #   "record": genai.Client cujas respostas sao gravadas em JACA_AI_RECORD_PATH
+    #             para reproducao posterior pelo backend "fake"
+    # Sem API key o cliente fica desconfigurado (os metodos retornam None), em vez
+    # de falhar na importacao do modulo.
+    #---------------------------------------------------------------------------------
+    def _connect(self) -> bool:
+        backend = os.environ.get("JACA_AI_BACKEND") or self.settings.ai_backend
+
+        if backend == AI_BACKEND_FAKE:
+            return self.use_backend(FakeGenAIClient(FakeProfile.from_env()))
+
         if not self.settings.api_key:
             self.logger.critical("API key do Gemini não foi fornecida nas configurações.")
-            raise ValueError("A API key não pode ser vazia.")
+            return False
 
         try:
             # Criar o cliente com a API key
-            self.client = genai.Client(api_key=self.settings.api_key)
+            client = genai.Client(api_key=self.settings.api_key)
+            if backend == AI_BACKEND_RECORD:
+                record_path = os.environ.get("JACA_AI_RECORD_PATH") or str(PathManager.get_cache_dir() / "recorded_responses.jsonl")
+                self.logger.info(f"Gravando as respostas da API em {record_path}")
+                client = RecordingClient(client, record_path)
+            self.client = client
+            self._cache_namespace = ""
             self._is_configured = True 
             self.logger.info("Cliente Gemini configurado com sucesso.")
+            return True
 
         except Exception as e:
             self.logger.critical(f"Falha ao configurar a API do Gemini: {e}")
+            return False
+
+
+    #---------------------------------------------------------------------------------
+    # Troca o backend em execucao (ex.: um FakeGenAIClient em benchmarks)
+    #---------------------------------------------------------------------------------
+    # Respostas de um backend que nao e a API real ficam em um espaco proprio do
+    # cache de respostas: nunca sao servidas como respostas do Gemini (e vice-versa)
+    #---------------------------------------------------------------------------------
+    def use_backend(self, client: Any) -> bool:
+        self.client = client
+        real = isinstance(client, (genai.Client, RecordingClient))
+        self._cache_namespace = "" if real else type(client).__name__
+        self._is_configured = True
+        self.logger.info(f"Backend de IA em uso: {type(client).__name__}")
+        return True
 
 
     #---------------------------------------------------------------------------------
     # Gera Texto com Gemini 
     #---------------------------------------------------------------------------------
-    # Recebe: um prompt, um nome de modelo
+    # Recebe: um prompt, um nome de modelo e se o cache pode ser usado
     # Retorna: o texto gerado pelo model ou none
     #---------------------------------------------------------------------------------
-    def generate_text_from_prompt(self, prompt: str, model_name: str) -> Optional[str]:
+    def generate_text_from_prompt(self, prompt: str, model_name: str, use_cache: bool = True) -> Optional[str]:
         if not self._is_configured:
             self.logger.error("Cliente Gemini não configurado. Impossível gerar texto.")
             return None
 
+        cache_key = ResponseCache.build_key("text", model_name, prompt)
+        cached = self._get_cached(cache_key, use_cache)
+        if cached is not None:
+            return cached
+
         try:
             self.logger.info(f"Gerando texto com o modelo: {model_name}...")
             
-            response = self.client.models.generate_content(
-                model=model_name,
-                contents=prompt
+            response = self.scheduler.execute(
+                model_name,
+                lambda: self.client.models.generate_content(
+                    model=model_name,
+                    contents=prompt
+                ),
+                self._estimate_request_tokens(prompt)
             )
             
             if response.text:
+                self._set_cached(cache_key, response.text, use_cache)
                 return response.text
             else:
                 self.logger.warning("A resposta do modelo não contém texto. Pode ter sido bloqueada ou estar vazia.")
@@ -74,35 +161,63 @@ class _GeminiClient:
     #---------------------------------------------------------------------------------
     # Gera um Dicionário com Gemini
     #---------------------------------------------------------------------------------
-    # Recebe: um prompt, um nome de modelo
+    # Recebe: um prompt, um nome de modelo e se o cache pode ser usado
+    #         cached_context: contexto ja enviado (ContextCacheManager) que
+    #         precede o prompt, referenciado em vez de reenviado
+    #         response_schema: modelo pydantic (ou list[Modelo]) que restringe a
+    #         resposta; respostas fora do schema sao corrigidas com uma nova tentativa
     # Retorno: Retorna um dicionário Python com os dados extraídos ou none 
     #---------------------------------------------------------------------------------
-    def generate_json_from_prompt(self, prompt: str, model_name: str) -> Optional[Dict]:
+    def generate_json_from_prompt(
+            self,
+            prompt: str,
+            model_name: str,
+            use_cache: bool = True,
+            cached_context: Optional[CachedContext] = None,
+            response_schema: Any = None
+        ) -> Optional[Dict]:
         if not self._is_configured:
             self.logger.error("Cliente Gemini não configurado. Impossível gerar JSON.")
             return None
+
+        cache_key = ResponseCache.build_key("json", model_name, prompt, extra=self._json_cache_extra(cached_context, response_schema))
+        cached = self._get_cached(cache_key, use_cache)
+        if cached is not None:
+            return cached
         
         try:
             self.logger.info(f"Gerando JSON com o modelo: {model_name}...")
-            
-            response = self.client.models.generate_content(
-                model=model_name,
-                contents=prompt,
-                config=types.GenerateContentConfig(
-                    response_mime_type="application/json"
+            contents, cache_config = self._apply_cached_context(prompt, cached_context)
+
+            def request(request_contents):
+                return self.scheduler.execute(
+                    model_name,
+                    lambda: self.client.models.generate_content(
+                        model=model_name,
+                        contents=request_contents,
+                        config=self._build_json_config(response_schema, cache_config)
+                    ),
+                    self._estimate_request_tokens(prompt)
                 )
-            )
 
+            response = request(contents)
             if not response.text:
                  self.logger.warning("A resposta do modelo (JSON mode) não contém texto. Pode ter sido bloqueada.")
                  return None
 
-            response_text = response.text
-            return json.loads(response_text)
+            data, error = self._parse_json_response(response.text, response_schema)
+            if error and response_schema is not None:
+                self.logger.warning(f"Resposta fora do schema ({error}). Solicitando correção ao modelo...")
+                response = request(self._build_repair_contents(contents, response.text, error))
+                data, error = self._parse_json_response(response.text, response_schema)
+
+            if error:
+                self.logger.error(f"Falha ao decodificar JSON. O modelo não retornou um JSON válido ({error}). Resposta: {response.text}")
+                return None
+
+            self._set_cached(cache_key, data, use_cache)
+            return data
 
-        except json.JSONDecodeError:
-            self.logger.error(f"Falha ao decodificar JSON. O modelo não retornou um JSON válido. Resposta: {response_text}")
-            return None
         except Exception as e:
             self.logger.error(f"Erro durante a chamada para a API Gemini (JSON mode): {e}", exc_info=True)
             return None
@@ -114,7 +229,9 @@ class _GeminiClient:
             self, 
             text_prompt: str, 
             images: List[bytes], 
-            model_name: str
+            model_name: str,
+            use_cache: bool = True,
+            response_schema: Any = None
         ) -> Optional[Dict]:
             if not self._is_configured:
                 self.logger.error("Cliente Gemini não configurado. Impossível gerar JSON multimodal.")
@@ -122,38 +239,635 @@ class _GeminiClient:
             if not images:
                 self.logger.error("Nenhuma imagem fornecida para o prompt multimodal.")
                 return None
+
+            cache_key = ResponseCache.build_key("json", model_name, text_prompt, images, extra=self._json_cache_extra(None, response_schema))
+            cached = self._get_cached(cache_key, use_cache)
+            if cached is not None:
+                return cached
             
             try:
                 self.logger.info(f"Gerando JSON com o modelo multimodal: {model_name}...")
+                contents = [text_prompt, *self._build_image_parts(images)]
 
-                response = self.client.models.generate_content(
-                    model=model_name,
-                    contents=[ text_prompt,
-                        [types.Part.from_bytes(data=img_bytes, mime_type='images/jpeg') for img_bytes in images]
-                    ],
-                    config=types.GenerateContentConfig(
-                        response_mime_type="application/json"
+                def request(request_contents):
+                    return self.scheduler.execute(
+                        model_name,
+                        lambda: self.client.models.generate_content(
+                            model=model_name,
+                            contents=request_contents,
+                            config=self._build_json_config(response_schema)
+                        ),
+                        self._estimate_request_tokens(text_prompt, images)
                     )
-                )
-    
+
+                response = request(contents)
                 if not response.text:
                      self.logger.warning("A resposta do modelo multimodal não contém dados.")
                      return None
+
+                data, error = self._parse_json_response(response.text, response_schema)
+                if error and response_schema is not None:
+                    self.logger.warning(f"Resposta multimodal fora do schema ({error}). Solicitando correção ao modelo...")
+                    response = request(self._build_repair_contents(contents, response.text, error))
+                    data, error = self._parse_json_response(response.text, response_schema)
+
+                if error:
+                    self.logger.error(f"Falha ao decodificar JSON. O modelo multimodal não retornou um JSON válido ({error}). Resposta: {response.text}")
+                    return None
+
+                self._set_cached(cache_key, data, use_cache)
+                return data
     
-                response_text = response.text
-                return json.loads(response_text)
-    
-            except json.JSONDecodeError:
-                self.logger.error(f"Falha ao decodificar JSON. O modelo multimodal não retornou um JSON válido. Resposta: {response_text}")
-                return None
             except Exception as e:
                 self.logger.error(f"Erro durante a chamada para a API Gemini (multimodal): {e}", exc_info=True)
                 return None
 
+    #---------------------------------------------------------------------------------
+    # Gera texto com prompt multimodal (texto + imagens)
+    #---------------------------------------------------------------------------------
+    # Usado na consolidacao de paginas digitalizadas (OCR pela IA)
+    #---------------------------------------------------------------------------------
+    def generate_text_from_multimodal_prompt(self, text_prompt: str, images: List[bytes], model_name: str, use_cache: bool = True) -> Optional[str]:
+        if not self._is_configured:
+            self.logger.error("Cliente Gemini não configurado. Impossível gerar texto multimodal.")
+            return None
+        if not images:
+            self.logger.error("Nenhuma imagem fornecida para o prompt multimodal.")
+            return None
+
+        cache_key = ResponseCache.build_key("text", model_name, text_prompt, images)
+        cached = self._get_cached(cache_key, use_cache)
+        if cached is not None:
+            return cached
+
+        try:
+            self.logger.info(f"Gerando texto com o modelo multimodal: {model_name}...")
+            response = self.scheduler.execute(
+                model_name,
+                lambda: self.client.models.generate_content(
+                    model=model_name,
+                    contents=[text_prompt, *self._build_image_parts(images)]
+                ),
+                self._estimate_request_tokens(text_prompt, images)
+            )
+
+            if response.text:
+                self._set_cached(cache_key, response.text, use_cache)
+                return response.text
+
+            self.logger.warning("A resposta do modelo multimodal não contém texto.")
+            return None
+
+        except Exception as e:
+            self.logger.error(f"Erro durante a chamada para a API Gemini (texto multimodal): {e}", exc_info=True)
+            return None
+
+
+    #---------------------------------------------------------------------------------
+    # Gera texto em streaming (generate_content_stream)
+    #---------------------------------------------------------------------------------
+    # Recebe: um prompt, um nome de modelo, imagens opcionais e se o cache pode ser usado
+    # Retorna: um gerador com os trechos de texto na ordem em que chegam. Respostas
+    #          em cache sao entregues em um unico trecho.
+    # Por ser um gerador, nao ha retorno None: erros da API sao registrados e
+    # repassados a quem consome o gerador.
+    #---------------------------------------------------------------------------------
+    def generate_text_stream(self, prompt: str, model_name: str, images: Optional[List[bytes]] = None, use_cache: bool = True) -> Iterator[str]:
+        if not self._is_configured:
+            self.logger.error("Cliente Gemini não configurado. Impossível gerar texto.")
+            raise RuntimeError("Cliente Gemini não configurado.")
+
+        cache_key = ResponseCache.build_key("text", model_name, prompt, images)
+        cached = self._get_cached(cache_key, use_cache)
+        if cached is not None:
+            yield cached
+            return
+
+        contents = [prompt, *self._build_image_parts(images)] if images else prompt
+        parts: List[str] = []
+        try:
+            self.logger.info(f"Gerando texto em streaming com o modelo: {model_name}...")
+            # falhas antes do primeiro trecho sao tentadas de novo; no meio do stream sobem
+            stream = self.scheduler.execute_stream(
+                model_name,
+                lambda: self.client.models.generate_content_stream(model=model_name, contents=contents),
+                self._estimate_request_tokens(prompt, images)
+            )
+            for chunk in stream:
+                if chunk.text:
+                    parts.append(chunk.text)
+                    yield chunk.text
+
+        except Exception as e:
+            self.logger.error(f"Erro durante a chamada para a API Gemini (streaming): {e}", exc_info=True)
+            raise
+
+        text = "".join(parts)
+        if text:
+            self._set_cached(cache_key, text, use_cache)
+        else:
+            self.logger.warning("A resposta em streaming do modelo não contém texto.")
+
+
+    #=================================================================================
+    # Cache de contexto (cached content)
+    #---------------------------------------------------------------------------------
+    # Um texto longo (ex.: o estatuto consolidado) e enviado uma vez ao servidor e
+    # referenciado pelo nome nas chamadas seguintes. O ciclo de vida e controlado
+    # pelo ContextCacheManager.
+    #=================================================================================
+
+    #---------------------------------------------------------------------------------
+    # Cria um cached content no servidor
+    #---------------------------------------------------------------------------------
+    # Retorna: o nome do cache (ex.: "cachedContents/...") ou None
+    #---------------------------------------------------------------------------------
+    def create_cached_content(self, model_name: str, text: str, ttl_seconds: float, display_name: Optional[str] = None) -> Optional[str]:
+        if not self._is_configured:
+            self.logger.error("Cliente Gemini não configurado. Impossível criar cache de contexto.")
+            return None
+
+        try:
+            cache = self.client.caches.create(
+                model=model_name,
+                config=types.CreateCachedContentConfig(
+                    contents=[text],
+                    display_name=display_name,
+                    ttl=f"{int(ttl_seconds)}s"
+                )
+            )
+            return cache.name
+
+        except Exception as e:
+            self.logger.warning(f"Falha ao criar cache de contexto na API Gemini: {e}")
+            return None
+
+
+    #---------------------------------------------------------------------------------
+    # Apaga um cached content do servidor
+    #---------------------------------------------------------------------------------
+    def delete_cached_content(self, name: str) -> bool:
+        if not self._is_configured:
+            return False
+
+        try:
+            self.client.caches.delete(name=name)
+            return True
+
+        except Exception as e:
+            self.logger.warning(f"Falha ao apagar cache de contexto '{name}': {e}")
+            return False
+
+
+    #---------------------------------------------------------------------------------
+    # Monta conteudo e configuracao da chamada com um contexto em cache
+    #---------------------------------------------------------------------------------
+    # No modo servidor o contexto e referenciado por nome; no modo local o texto
+    # e enviado antes do prompt, na mesma posicao que ocuparia no servidor.
+    #---------------------------------------------------------------------------------
+    def _apply_cached_context(self, prompt: str, cached_context: Optional[CachedContext]):
+        if cached_context is None:
+            return prompt, {}
+        if cached_context.is_server:
+            return prompt, {"cached_content": cached_context.name}
+        return [cached_context.text, prompt], {}
+
+
+    @staticmethod
+    def _cached_context_key(cached_context: Optional[CachedContext]) -> Optional[Dict]:
+        # o cache de respostas usa o conteudo do contexto, nao o nome (que muda a cada execucao)
+        return {"cached_context": cached_context.content_hash} if cached_context else None
+
+    #---------------------------------------------------------------------------------
+    # Respostas JSON restritas por schema
+    #---------------------------------------------------------------------------------
+    # O schema (modelo pydantic ou list[Modelo]) vai no response_schema da
+    # chamada e a resposta e validada contra ele. Uma resposta invalida gera uma
+    # unica nova tentativa com o erro anexado ao prompt, em vez de perder a
+    # chamada (ou a etapa inteira) por um JSON malformado.
+    #
+    # Em schemas de lista cada item e validado sozinho: os itens invalidos sao
+    # descartados e os validos aproveitados, cabendo ao chamador refazer so o
+    # que faltar. A nova tentativa fica para quando nenhum item e aproveitavel.
+    #---------------------------------------------------------------------------------
+    @staticmethod
+    def _build_json_config(response_schema: Any = None, extra_config: Optional[Dict] = None) -> types.GenerateContentConfig:
+        config: Dict[str, Any] = {"response_mime_type": "application/json", **(extra_config or {})}
+        if response_schema is not None:
+            config["response_schema"] = response_schema
+        return types.GenerateContentConfig(**config)
+
+
+    # Retorna: (dados, None) ou (None, descricao do erro)
+    def _parse_json_response(self, text: Optional[str], response_schema: Any = None):
+        if not text:
+            return None, "resposta vazia"
+        try:
+            data = json.loads(text)
+        except json.JSONDecodeError as e:
+            return None, f"JSON inválido: {e}"
+
+        if response_schema is None:
+            return data, None
+        if get_origin(response_schema) is list:
+            return self._parse_json_items(data, get_args(response_schema)[0])
+        try:
+            adapter = TypeAdapter(response_schema)
+            return adapter.dump_python(adapter.validate_python(data), mode="json"), None
+        except ValidationError as e:
+            return None, f"fora do schema: {e.error_count()} erro(s), {e.errors()[0]['msg']} em {e.errors()[0]['loc']}"
+
+
+    # Valida os itens de uma lista um a um, mantendo so os validos
+    def _parse_json_items(self, data: Any, item_schema: Any):
+        # aceita tambem um objeto envolvendo a lista (ex.: {"resultados": [...]})
+        if isinstance(data, dict):
+            lists = [value for value in data.values() if isinstance(value, list)]
+            data = lists[0] if len(lists) == 1 else data
+        if not isinstance(data, list):
+            return None, "fora do schema: a resposta não é uma lista"
+
+        adapter = TypeAdapter(item_schema)
+        items, errors = [], []
+        for index, item in enumerate(data):
+            try:
+                items.append(adapter.dump_python(adapter.validate_python(item), mode="json"))
+            except ValidationError as e:
+                errors.append(f"item {index}: {e.errors()[0]['msg']} em {e.errors()[0]['loc']}")
+
+        if errors and not items:
+            return None, f"fora do schema: {len(errors)} item(ns) inválido(s), {errors[0]}"
+        if errors:
+            self.logger.warning(
+                f"{len(errors)} item(ns) fora do schema descartado(s) da resposta ({errors[0]})."
+            )
+        return items, None
+
+
+    @staticmethod
+    def _build_repair_contents(contents: Any, previous_text: str, error: str) -> Any:
+        note = (
+            "\n\nATENÇÃO: a sua resposta anterior não pôde ser utilizada "
+            f"({error}).\nResposta anterior: {previous_text[:2000]}\n"
+            "Responda novamente apenas com o JSON no formato solicitado."
+        )
+        if isinstance(contents, str):
+            return contents + note
+        return [*contents, note]
+
+
+    def _json_cache_extra(self, cached_context: Optional[CachedContext], response_schema: Any = None) -> Optional[Dict]:
+        extra = self._cached_context_key(cached_context) or {}
+        if response_schema is not None:
+            # respostas geradas com outro schema (ou sem schema) nao sao reaproveitadas
+            schema = json.dumps(TypeAdapter(response_schema).json_schema(), sort_keys=True)
+            extra["response_schema"] = hashlib.sha256(schema.encode("utf-8")).hexdigest()
+        return extra or None
+
+    #---------------------------------------------------------------------------------
+    # Prioridade das chamadas feitas dentro do bloco
+    #---------------------------------------------------------------------------------
+    # Ex.: with gemini_client.priority(PRIORITY_INTERACTIVE): ...
+    # As chamadas interativas passam a frente das chamadas em massa na fila do
+    # RequestScheduler. Corotinas criadas dentro do bloco herdam a prioridade.
+    #---------------------------------------------------------------------------------
+    def priority(self, level: int = PRIORITY_INTERACTIVE):
+        return RequestScheduler.priority(level)
+
+
+    #---------------------------------------------------------------------------------
+    # Estimativa local de tokens de entrada usada pelos limites de TPM
+    #---------------------------------------------------------------------------------
+    @staticmethod
+    def _estimate_request_tokens(prompt: str, images: Optional[List[bytes]] = None) -> int:
+        return TokenPlanner.estimate_text_tokens(prompt) + TokenPlanner.estimate_image_tokens(images)
+
+    #---------------------------------------------------------------------------------
+    # Conta os tokens de entrada de uma chamada pelo SDK (count_tokens)
+    #---------------------------------------------------------------------------------
+    # Retorna: o total de tokens ou None se a contagem falhar
+    #---------------------------------------------------------------------------------
+    def count_tokens(self, prompt: str, model_name: str, images: Optional[List[bytes]] = None) -> Optional[int]:
+        if not self._is_configured:
+            return None
+
+        try:
+            contents = [prompt, *self._build_image_parts(images)] if images else prompt
+            response = self.client.models.count_tokens(model=model_name, contents=contents)
+            return response.total_tokens
+
+        except Exception as e:
+            self.logger.warning(f"Falha ao contar tokens pela API Gemini: {e}")
+            return None
+
+
+    #---------------------------------------------------------------------------------
+    # Converte as imagens em partes do conteudo enviado ao modelo
+    #---------------------------------------------------------------------------------
+    def _build_image_parts(self, images: List[bytes]) -> List[types.Part]:
+        # o MIME type e identificado pelos bytes (PNG ou JPEG, conforme o PageImageEncoder)
+        return [types.Part.from_bytes(data=img_bytes, mime_type=detect_image_mime_type(img_bytes)) for img_bytes in images]
+
+    #=================================================================================
+    # Metodos assincronos (client.aio)
+    #---------------------------------------------------------------------------------
+    # Mesmo contrato dos metodos sincronos, mas sem bloquear a thread. O numero de
+    # requisicoes simultaneas por modelo e limitado pelo RequestScheduler (slot) a
+    # settings.max_concurrent_requests.
+    #=================================================================================
+
+    #---------------------------------------------------------------------------------
+    # Ocupa uma vaga de requisicao do modelo sem bloquear o event loop
+    #---------------------------------------------------------------------------------
+    # run_coroutine, os workers do pipeline e as sessoes do Streamlit rodam cada um
+    # o seu event loop; a vaga vale para todos eles e a espera respeita a prioridade
+    # da chamada (interativas antes das em massa).
+    #---------------------------------------------------------------------------------
+    def _model_slot(self, model_name: str):
+        return self.scheduler.slot(model_name, self.settings.max_concurrent_requests or 1)
+
+
+    #---------------------------------------------------------------------------------
+    # Gera Texto com Gemini (assincrono)
+    #---------------------------------------------------------------------------------
+    async def agenerate_text_from_prompt(self, prompt: str, model_name: str, use_cache: bool = True) -> Optional[str]:
+        if not self._is_configured:
+            self.logger.error("Cliente Gemini não configurado. Impossível gerar texto.")
+            return None
+
+        cache_key = ResponseCache.build_key("text", model_name, prompt)
+        cached = self._get_cached(cache_key, use_cache)
+        if cached is not None:
+            return cached
+
+        try:
+            async with self._model_slot(model_name):
+                self.logger.info(f"Gerando texto (async) com o modelo: {model_name}...")
+                response = await self.scheduler.aexecute(
+                    model_name,
+                    lambda: self.client.aio.models.generate_content(
+                        model=model_name,
+                        contents=prompt
+                    ),
+                    self._estimate_request_tokens(prompt)
+                )
+
+            if response.text:
+                self._set_cached(cache_key, response.text, use_cache)
+                return response.text
+
+            self.logger.warning("A resposta do modelo não contém texto. Pode ter sido bloqueada ou estar vazia.")
+            return None
+
+        except Exception as e:
+            self.logger.error(f"Erro durante a chamada assíncrona para a API Gemini: \n\n {e}", exc_info=True)
+            return None
+
+
+    #---------------------------------------------------------------------------------
+    # Gera um Dicionário com Gemini (assincrono)
+    #---------------------------------------------------------------------------------
+    async def agenerate_json_from_prompt(
+            self,
+            prompt: str,
+            model_name: str,
+            use_cache: bool = True,
+            cached_context: Optional[CachedContext] = None,
+            response_schema: Any = None
+        ) -> Optional[Dict]:
+        if not self._is_configured:
+            self.logger.error("Cliente Gemini não configurado. Impossível gerar JSON.")
+            return None
+
+        cache_key = ResponseCache.build_key("json", model_name, prompt, extra=self._json_cache_extra(cached_context, response_schema))
+        cached = self._get_cached(cache_key, use_cache)
+        if cached is not None:
+            return cached
+
+        try:
+            contents, cache_config = self._apply_cached_context(prompt, cached_context)
+
+            async def request(request_contents):
+                async with self._model_slot(model_name):
+                    return await self.scheduler.aexecute(
+                        model_name,
+                        lambda: self.client.aio.models.generate_content(
+                            model=model_name,
+                            contents=request_contents,
+                            config=self._build_json_config(response_schema, cache_config)
+                        ),
+                        self._estimate_request_tokens(prompt)
+                    )
+
+            self.logger.info(f"Gerando JSON (async) com o modelo: {model_name}...")
+            response = await request(contents)
+            if not response.text:
+                self.logger.warning("A resposta do modelo (JSON mode) não contém texto. Pode ter sido bloqueada.")
+                return None
+
+            data, error = self._parse_json_response(response.text, response_schema)
+            if error and response_schema is not None:
+                self.logger.warning(f"Resposta fora do schema ({error}). Solicitando correção ao modelo...")
+                response = await request(self._build_repair_contents(contents, response.text, error))
+                data, error = self._parse_json_response(response.text, response_schema)
+
+            if error:
+                self.logger.error(f"Falha ao decodificar JSON. O modelo não retornou um JSON válido ({error}). Resposta: {response.text}")
+                return None
+
+            self._set_cached(cache_key, data, use_cache)
+            return data
+
+        except Exception as e:
+            self.logger.error(f"Erro durante a chamada assíncrona para a API Gemini (JSON mode): {e}", exc_info=True)
+            return None
+
+
+    #---------------------------------------------------------------------------------
+    # Gera JSON com prompt multimodal (assincrono)
+    #---------------------------------------------------------------------------------
+    async def agenerate_json_from_multimodal_prompt(self, text_prompt: str, images: List[bytes], model_name: str, use_cache: bool = True, response_schema: Any = None) -> Optional[Dict]:
+        if not self._is_configured:
+            self.logger.error("Cliente Gemini não configurado. Impossível gerar JSON multimodal.")
+            return None
+        if not images:
+            self.logger.error("Nenhuma imagem fornecida para o prompt multimodal.")
+            return None
+
+        cache_key = ResponseCache.build_key("json", model_name, text_prompt, images, extra=self._json_cache_extra(None, response_schema))
+        cached = self._get_cached(cache_key, use_cache)
+        if cached is not None:
+            return cached
+
+        try:
+            contents = [text_prompt, *self._build_image_parts(images)]
+
+            async def request(request_contents):
+                async with self._model_slot(model_name):
+                    return await self.scheduler.aexecute(
+                        model_name,
+                        lambda: self.client.aio.models.generate_content(
+                            model=model_name,
+                            contents=request_contents,
+                            config=self._build_json_config(response_schema)
+                        ),
+                        self._estimate_request_tokens(text_prompt, images)
+                    )
+
+            self.logger.info(f"Gerando JSON (async) com o modelo multimodal: {model_name}...")
+            response = await request(contents)
+            if not response.text:
+                self.logger.warning("A resposta do modelo multimodal não contém dados.")
+                return None
+
+            data, error = self._parse_json_response(response.text, response_schema)
+            if error and response_schema is not None:
+                self.logger.warning(f"Resposta multimodal fora do schema ({error}). Solicitando correção ao modelo...")
+                response = await request(self._build_repair_contents(contents, response.text, error))
+                data, error = self._parse_json_response(response.text, response_schema)
+
+            if error:
+                self.logger.error(f"Falha ao decodificar JSON. O modelo multimodal não retornou um JSON válido ({error}). Resposta: {response.text}")
+                return None
+
+            self._set_cached(cache_key, data, use_cache)
+            return data
+
+        except Exception as e:
+            self.logger.error(f"Erro durante a chamada assíncrona para a API Gemini (multimodal): {e}", exc_info=True)
+            return None
+
+
+    #---------------------------------------------------------------------------------
+    # Gera texto com prompt multimodal (assincrono)
+    #---------------------------------------------------------------------------------
+    async def agenerate_text_from_multimodal_prompt(self, text_prompt: str, images: List[bytes], model_name: str, use_cache: bool = True) -> Optional[str]:
+        if not self._is_configured:
+            self.logger.error("Cliente Gemini não configurado. Impossível gerar texto multimodal.")
+            return None
+        if not images:
+            self.logger.error("Nenhuma imagem fornecida para o prompt multimodal.")
+            return None
+
+        cache_key = ResponseCache.build_key("text", model_name, text_prompt, images)
+        cached = self._get_cached(cache_key, use_cache)
+        if cached is not None:
+            return cached
+
+        try:
+            async with self._model_slot(model_name):
+                self.logger.info(f"Gerando texto (async) com o modelo multimodal: {model_name}...")
+                response = await self.scheduler.aexecute(
+                    model_name,
+                    lambda: self.client.aio.models.generate_content(
+                        model=model_name,
+                        contents=[text_prompt, *self._build_image_parts(images)]
+                    ),
+                    self._estimate_request_tokens(text_prompt, images)
+                )
+
+            if response.text:
+                self._set_cached(cache_key, response.text, use_cache)
+                return response.text
+
+            self.logger.warning("A resposta do modelo multimodal não contém texto.")
+            return None
+
+        except Exception as e:
+            self.logger.error(f"Erro durante a chamada assíncrona para a API Gemini (texto multimodal): {e}", exc_info=True)
+            return None
+
+
+    #---------------------------------------------------------------------------------
+    # Executa varios prompts de texto em paralelo
+    #---------------------------------------------------------------------------------
+    # Retorna: lista de resultados na mesma ordem dos prompts (None nas falhas)
+    #---------------------------------------------------------------------------------
+    async def agather_text(self, prompts: List[str], model_name: str, use_cache: bool = True) -> List[Optional[str]]:
+        tasks = [self.agenerate_text_from_prompt(p, model_name, use_cache) for p in prompts]
+        return list(await asyncio.gather(*tasks))
+
+
+    #---------------------------------------------------------------------------------
+    # Executa varios prompts JSON em paralelo
+    #---------------------------------------------------------------------------------
+    # Retorna: lista de resultados na mesma ordem dos prompts (None nas falhas)
+    #---------------------------------------------------------------------------------
+    async def agather_json(self, prompts: List[str], model_name: str, use_cache: bool = True) -> List[Optional[Dict]]:
+        tasks = [self.agenerate_json_from_prompt(p, model_name, use_cache) for p in prompts]
+        return list(await asyncio.gather(*tasks))
+
+
+    #---------------------------------------------------------------------------------
+    # Versoes sincronas dos lotes, para uso a partir do codigo bloqueante
+    #---------------------------------------------------------------------------------
+    def run_batch_text(self, prompts: List[str], model_name: str, use_cache: bool = True) -> List[Optional[str]]:
+        return self.run_coroutine(self.agather_text(prompts, model_name, use_cache))
+
+    def run_batch_json(self, prompts: List[str], model_name: str, use_cache: bool = True) -> List[Optional[Dict]]:
+        return self.run_coroutine(self.agather_json(prompts, model_name, use_cache))
+
+
+    #---------------------------------------------------------------------------------
+    # Executa uma corotina a partir de codigo sincrono
+    #---------------------------------------------------------------------------------
+    # Se ja existir um event loop rodando nesta thread (ex.: dentro de outra
+    # corotina), a execucao e feita em uma thread separada com seu proprio loop.
+    #---------------------------------------------------------------------------------
+    def run_coroutine(self, coro: Coroutine) -> Any:
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(coro)
+
+        result: Dict[str, Any] = {}
+
+        def runner():
+            try:
+                result["value"] = asyncio.run(coro)
+            except BaseException as e:
+                result["error"] = e
+
+        thread = threading.Thread(target=runner)
+        thread.start()
+        thread.join()
+
+        if "error" in result:
+            raise result["error"]
+        return result.get("value")
+
+    #---------------------------------------------------------------------------------
+    # Consulta o cache de respostas (respeitando configuracao e bypass por chamada)
+    #---------------------------------------------------------------------------------
+    def _get_cached(self, cache_key: str, use_cache: bool):
+        if not (use_cache and self.settings.cache_enabled):
+            return None
+
+        cached = self.cache.get(self._namespaced_key(cache_key))
+        if cached is not None:
+            self.logger.info("Resposta obtida do cache local; chamada à API evitada.")
+        return cached
+
+    #---------------------------------------------------------------------------------
+    # Grava uma resposta no cache de respostas
+    #---------------------------------------------------------------------------------
+    def _set_cached(self, cache_key: str, value, use_cache: bool) -> None:
+        if use_cache and self.settings.cache_enabled:
+            self.cache.set(self._namespaced_key(cache_key), value)
+
+    # Chave no espaco do backend atual (a API real usa a chave sem prefixo)
+    def _namespaced_key(self, cache_key: str) -> str:
+        if not self._cache_namespace:
+            return cache_key
+        return hashlib.sha256(f"{self._cache_namespace}:{cache_key}".encode("utf-8")).hexdigest()
+
     #---------------------------------------------------------------------------------
     # Gera uma mensagem simples para verificar a conexão 
     #---------------------------------------------------------------------------------
     def test_api_connection(self, model_name: str) -> bool:
+        if not self._is_configured:
+            return False
+
         response = self.client.models.generate_content(
             model=model_name,
             contents= 'your answer should be exactly:OK',
@@ -173,18 +887,6 @@ class _GeminiClient:
             self._is_configured = False
             self.logger.info("Fechando cliente Google GenAI")
 
-        if not self.settings.api_key:
-            self.logger.critical("API key do Gemini não foi fornecida nas configurações.")
-            raise ValueError("A API key não pode ser vazia.")
-
-        try:
-            self.client = genai.Client(api_key=self.settings.api_key)
-            self._is_configured = True 
-            self.logger.info("Cliente Gemini configurado com sucesso.")
-            return True
-
-        except Exception as e:
-            self.logger.critical(f"Falha ao configurar a API do Gemini: {e}")
-            return False
+        return self._connect()
 
 gemini_client = _GeminiClient()
\ No newline at end of file
@@ -8,6 +8,38 @@ class _Settings:
         self.extraction_model = ''
         self.criteria_model = ''
         self.debug_mode = False
+        self.cache_enabled = True
+        self.cache_ttl_hours = 24.0
+        self.cache_max_size_mb = 200.0
+        self.max_concurrent_requests = 4
+        self.criteria_max_workers = 4
+        self.criteria_scoped_context = True
+        self.ingestion_max_workers = 0
+        self.extraction_hybrid_mode = True
+        self.image_dpi = 110
+        self.image_grayscale = True
+        self.image_jpeg_quality = 70
+        self.image_max_dimension = 1600
+        self.consolidation_chunk_tokens = 24000
+        self.consolidation_overlap_tokens = 400
+        self.token_ceiling = 200000
+        self.token_count_with_sdk = False
+        self.context_cache_mode = "server"
+        self.context_cache_ttl_seconds = 900
+        self.context_cache_min_tokens = 2048
+        self.criteria_batch_mode = False
+        self.criteria_batch_size = 8
+        self.rate_limit_rpm = 60
+        self.rate_limit_tpm = 1000000
+        self.rate_limits = {}
+        self.max_retries = 4
+        self.retry_base_delay = 1.0
+        self.retry_max_delay = 30.0
+        self.pipeline_max_workers = 2
+        self.ai_backend = "gemini"
+        self.project_store = "json"
+        self.write_behind_delay_ms = 500
+        self.project_file_locks = False
         self.config_path = file_path
 
         if not self.config_path.exists() :
@@ -25,6 +57,38 @@ class _Settings:
         self.extraction_model = "gemini-2.5-Flash"
         self.criteria_model = "gemini-2.0-flash"
         self.debug_mode = False
+        self.cache_enabled = True
+        self.cache_ttl_hours = 24.0
+        self.cache_max_size_mb = 200.0
+        self.max_concurrent_requests = 4
+        self.criteria_max_workers = 4
+        self.criteria_scoped_context = True
+        self.ingestion_max_workers = 0
+        self.extraction_hybrid_mode = True
+        self.image_dpi = 110
+        self.image_grayscale = True
+        self.image_jpeg_quality = 70
+        self.image_max_dimension = 1600
+        self.consolidation_chunk_tokens = 24000
+        self.consolidation_overlap_tokens = 400
+        self.token_ceiling = 200000
+        self.token_count_with_sdk = False
+        self.context_cache_mode = "server"
+        self.context_cache_ttl_seconds = 900
+        self.context_cache_min_tokens = 2048
+        self.criteria_batch_mode = False
+        self.criteria_batch_size = 8
+        self.rate_limit_rpm = 60
+        self.rate_limit_tpm = 1000000
+        self.rate_limits = {}
+        self.max_retries = 4
+        self.retry_base_delay = 1.0
+        self.retry_max_delay = 30.0
+        self.pipeline_max_workers = 2
+        self.ai_backend = "gemini"
+        self.project_store = "json"
+        self.write_behind_delay_ms = 500
+        self.project_file_locks = False
         self.save_config()
 
     
@@ -35,6 +99,38 @@ class _Settings:
         self.extraction_model = data.get('extraction_model', '')
         self.criteria_model = data.get('criteria_model', '')
         self.debug_mode = data.get('debug_mode', '')
+        self.cache_enabled = data.get('cache_enabled', True)
+        self.cache_ttl_hours = data.get('cache_ttl_hours', 24.0)
+        self.cache_max_size_mb = data.get('cache_max_size_mb', 200.0)
+        self.max_concurrent_requests = data.get('max_concurrent_requests', 4)
+        self.criteria_max_workers = data.get('criteria_max_workers', 4)
+        self.criteria_scoped_context = data.get('criteria_scoped_context', True)
+        self.ingestion_max_workers = data.get('ingestion_max_workers', 0)
+        self.extraction_hybrid_mode = data.get('extraction_hybrid_mode', True)
+        self.image_dpi = data.get('image_dpi', 110)
+        self.image_grayscale = data.get('image_grayscale', True)
+        self.image_jpeg_quality = data.get('image_jpeg_quality', 70)
+        self.image_max_dimension = data.get('image_max_dimension', 1600)
+        self.consolidation_chunk_tokens = data.get('consolidation_chunk_tokens', 24000)
+        self.consolidation_overlap_tokens = data.get('consolidation_overlap_tokens', 400)
+        self.token_ceiling = data.get('token_ceiling', 200000)
+        self.token_count_with_sdk = data.get('token_count_with_sdk', False)
+        self.context_cache_mode = data.get('context_cache_mode', 'server')
+        self.context_cache_ttl_seconds = data.get('context_cache_ttl_seconds', 900)
+        self.context_cache_min_tokens = data.get('context_cache_min_tokens', 2048)
+        self.criteria_batch_mode = data.get('criteria_batch_mode', False)
+        self.criteria_batch_size = data.get('criteria_batch_size', 8)
+        self.rate_limit_rpm = data.get('rate_limit_rpm', 60)
+        self.rate_limit_tpm = data.get('rate_limit_tpm', 1000000)
+        self.rate_limits = data.get('rate_limits', {})
+        self.max_retries = data.get('max_retries', 4)
+        self.retry_base_delay = data.get('retry_base_delay', 1.0)
+        self.retry_max_delay = data.get('retry_max_delay', 30.0)
+        self.pipeline_max_workers = data.get('pipeline_max_workers', 2)
+        self.ai_backend = data.get('ai_backend', "gemini")
+        self.project_store = data.get('project_store', "json")
+        self.write_behind_delay_ms = data.get('write_behind_delay_ms', 500)
+        self.project_file_locks = data.get('project_file_locks', False)
     
 
     def save_config(self) -> None:
@@ -42,7 +138,39 @@ class _Settings:
             'api_key': self.api_key,
             'extraction_model': self.extraction_model,
             'criteria_model': self.criteria_model,
-            'debug_mode': self.debug_mode
+            'debug_mode': self.debug_mode,
+            'cache_enabled': self.cache_enabled,
+            'cache_ttl_hours': self.cache_ttl_hours,
+            'cache_max_size_mb': self.cache_max_size_mb,
+            'max_concurrent_requests': self.max_concurrent_requests,
+            'criteria_max_workers': self.criteria_max_workers,
+            'criteria_scoped_context': self.criteria_scoped_context,
+            'ingestion_max_workers': self.ingestion_max_workers,
+            'extraction_hybrid_mode': self.extraction_hybrid_mode,
+            'image_dpi': self.image_dpi,
+            'image_grayscale': self.image_grayscale,
+            'image_jpeg_quality': self.image_jpeg_quality,
+            'image_max_dimension': self.image_max_dimension,
+            'consolidation_chunk_tokens': self.consolidation_chunk_tokens,
+            'consolidation_overlap_tokens': self.consolidation_overlap_tokens,
+            'token_ceiling': self.token_ceiling,
+            'token_count_with_sdk': self.token_count_with_sdk,
+            'context_cache_mode': self.context_cache_mode,
+            'context_cache_ttl_seconds': self.context_cache_ttl_seconds,
+            'context_cache_min_tokens': self.context_cache_min_tokens,
+            'criteria_batch_mode': self.criteria_batch_mode,
+            'criteria_batch_size': self.criteria_batch_size,
+            'rate_limit_rpm': self.rate_limit_rpm,
+            'rate_limit_tpm': self.rate_limit_tpm,
+            'rate_limits': self.rate_limits,
+            'max_retries': self.max_retries,
+            'retry_base_delay': self.retry_base_delay,
+            'retry_max_delay': self.retry_max_delay,
+            'pipeline_max_workers': self.pipeline_max_workers,
+            'ai_backend': self.ai_backend,
+            'project_store': self.project_store,
+            'write_behind_delay_ms': self.write_behind_delay_ms,
+            'project_file_locks': self.project_file_locks
         }
         json_string = json.dumps(data, indent=2)
         self.config_path.write_text(json_string)
@@ -63,4 +191,8 @@ class _Settings:
         self.debug_mode = new_status
         self.save_config()
 
+    def update_cache_enabled(self, new_status: bool) -> None:
+        self.cache_enabled = new_status
+        self.save_config()
+
 settings = _Settings(PathManager.get_app_config())
\ No newline at end of file
@@ -0,0 +1,255 @@
+import time
+import hashlib
+import threading
+from collections import Counter
+from typing import Any, Dict, Iterable, Optional
+
+from app.core.config import settings
+from app.core.logger import Logger
+from app.core.token_tools import estimate_tokens
+
+
+# Modos de cache de contexto (settings.context_cache_mode)
+CONTEXT_CACHE_SERVER = "server"
+CONTEXT_CACHE_LOCAL = "local"
+CONTEXT_CACHE_OFF = "off"
+
+
+#================================================================
+# CLASSE: CachedContext
+#----------------------------------------------------------------
+# Referencia a um contexto enviado uma unica vez e reutilizado em
+# varias chamadas. No modo "server" e o nome do cached content do
+# Gemini; no modo "local" o texto e reenviado junto do prompt
+# (mesmo resultado, sem economia real de tokens).
+#================================================================
+
+class CachedContext:
+
+    def __init__(self, name: str, model: str, content_hash: str, text: str, tokens: int, backend: str, expires_at: float):
+        self.name = name
+        self.model = model
+        self.content_hash = content_hash
+        self.text = text
+        self.tokens = tokens
+        self.backend = backend
+        self.expires_at = expires_at
+
+
+    @property
+    def is_server(self) -> bool:
+        return self.backend == CONTEXT_CACHE_SERVER
+
+
+    def is_expired(self) -> bool:
+        return time.time() >= self.expires_at
+
+
+
+
+#================================================================
+# CLASSE: LocalContextStore
+#----------------------------------------------------------------
+# Substituto local do client.caches do Gemini (create/get/delete
+# com expiracao), mantido em memoria. Permite exercitar o ciclo de
+# vida do cache de contexto sem acesso a API.
+#================================================================
+
+class LocalContextStore:
+
+    def __init__(self):
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._counter = 0
+
+
+    def create(self, model_name: str, text: str, ttl_seconds: float) -> str:
+        with self._lock:
+            self._counter += 1
+            name = f"localCachedContents/{self._counter:06d}"
+            self._entries[name] = {"model": model_name, "text": text, "expires_at": time.time() + ttl_seconds}
+            return name
+
+
+    def get(self, name: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry and time.time() >= entry["expires_at"]:
+                del self._entries[name]
+                return None
+            return entry
+
+
+    def delete(self, name: str) -> bool:
+        with self._lock:
+            return self._entries.pop(name, None) is not None
+
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+
+
+#================================================================
+# CLASSE: ContextCacheManager
+#----------------------------------------------------------------
+# Gerencia os contextos em cache de uma execucao (ex.: uma rodada
+# de verificacao de criterios).
+#
+# Os contextos sao enderecados pelo hash do texto: criterios com o
+# mesmo contexto compartilham o mesmo handle, criado na primeira
+# vez que e pedido. Apenas contextos usados por mais de uma chamada
+# (plan) e com pelo menos min_tokens sao colocados em cache; os
+# demais seguem embutidos no prompt.
+#
+# Os handles expiram com o TTL e sao apagados em release(), no fim
+# da execucao (use como context manager: "with ... as cache").
+#================================================================
+
+class ContextCacheManager:
+
+    def __init__(
+            self,
+            ai_client: Any,
+            model_name: str,
+            mode: Optional[str] = None,
+            ttl_seconds: Optional[float] = None,
+            min_tokens: Optional[int] = None,
+            local_store: Optional[LocalContextStore] = None
+        ):
+        self.logger = Logger(name="ContextCacheManager")
+        self.ai = ai_client
+        self.model_name = model_name
+        self.mode = mode or settings.context_cache_mode
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else settings.context_cache_ttl_seconds
+        self.min_tokens = min_tokens if min_tokens is not None else settings.context_cache_min_tokens
+        self.local_store = local_store or LocalContextStore()
+
+        self._handles: Dict[str, Optional[CachedContext]] = {}
+        self._hash_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._shared_hashes: Optional[set] = None
+        self.stats = {"created": 0, "reused": 0, "tokens_saved": 0}
+
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode in (CONTEXT_CACHE_SERVER, CONTEXT_CACHE_LOCAL)
+
+
+    def __enter__(self) -> "ContextCacheManager":
+        return self
+
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.release()
+
+
+
+
+    #----------------------------------------------------------------
+    # Registra os contextos da execucao: so os repetidos vao ao cache
+    #----------------------------------------------------------------
+    def plan(self, texts: Iterable[Optional[str]]) -> int:
+        counts = Counter(self._hash_text(text) for text in texts if text)
+        self._shared_hashes = {content_hash for content_hash, uses in counts.items() if uses > 1}
+        return len(self._shared_hashes)
+
+
+
+
+    #----------------------------------------------------------------
+    # Obtem (ou cria) o handle para um texto de contexto
+    #----------------------------------------------------------------
+    # Retorna: CachedContext, ou None se o texto deve ir no prompt
+    #----------------------------------------------------------------
+    def get_handle(self, text: Optional[str]) -> Optional[CachedContext]:
+        if not self.enabled or not text:
+            return None
+
+        content_hash = self._hash_text(text)
+        if self._shared_hashes is not None and content_hash not in self._shared_hashes:
+            return None
+
+        tokens = estimate_tokens(text)
+        if tokens < self.min_tokens:
+            return None
+
+        with self._lock:
+            hash_lock = self._hash_locks.setdefault(content_hash, threading.Lock())
+
+        # um unico envio por contexto, mesmo com verificacoes em paralelo
+        with hash_lock:
+            if content_hash in self._handles:
+                handle = self._handles[content_hash]
+                if handle is None or not handle.is_expired():
+                    if handle is not None:
+                        self._count_reuse(handle)
+                    return handle
+
+            handle = self._create_handle(text, content_hash, tokens)
+            self._handles[content_hash] = handle
+            return handle
+
+
+
+
+    #----------------------------------------------------------------
+    # Apaga os contextos criados nesta execucao
+    #----------------------------------------------------------------
+    def release(self) -> None:
+        with self._lock:
+            handles = [handle for handle in self._handles.values() if handle is not None]
+            self._handles.clear()
+
+        for handle in handles:
+            if handle.is_server:
+                self.ai.delete_cached_content(handle.name)
+            else:
+                self.local_store.delete(handle.name)
+
+        if handles:
+            self.logger.info(
+                f"{len(handles)} contexto(s) em cache liberado(s). Reutilizações: {self.stats['reused']}, "
+                f"economia estimada de ~{self.stats['tokens_saved']} tokens de entrada."
+            )
+
+
+
+
+    def _create_handle(self, text: str, content_hash: str, tokens: int) -> Optional[CachedContext]:
+        if self.mode == CONTEXT_CACHE_SERVER:
+            name = self.ai.create_cached_content(self.model_name, text, self.ttl_seconds, display_name=f"ctx-{content_hash[:12]}")
+            if not name:
+                # falhas (modelo sem suporte, contexto pequeno demais) voltam ao envio no prompt
+                self.logger.warning("Não foi possível criar o contexto em cache no servidor. O texto seguirá no prompt.")
+                return None
+        else:
+            name = self.local_store.create(self.model_name, text, self.ttl_seconds)
+
+        with self._lock:
+            self.stats["created"] += 1
+        self.logger.info(f"Contexto de ~{tokens} tokens colocado em cache ({self.mode}): {name}")
+        return CachedContext(
+            name=name,
+            model=self.model_name,
+            content_hash=content_hash,
+            text=text,
+            tokens=tokens,
+            backend=self.mode,
+            expires_at=time.time() + self.ttl_seconds
+        )
+
+
+    def _count_reuse(self, handle: CachedContext) -> None:
+        with self._lock:
+            self.stats["reused"] += 1
+            if handle.is_server:
+                self.stats["tokens_saved"] += handle.tokens
+
+
+    @staticmethod
+    def _hash_text(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
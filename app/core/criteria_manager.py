@@ -1,11 +1,20 @@
 import json
-from typing import List, Dict, Optional
+import hashlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict, Optional, Callable, Tuple
 
 from app.core.ai_client import gemini_client
-from app.core.prompt_manager import PromptManager
+from app.core.prompt_manager import PromptManager, CRITERIA_PROMPT_VERSION
 from app.core.logger import Logger
 from app.core.models import ProjectState
 from app.core.path_manager import PathManager
+from app.core.token_tools import estimate_tokens
+from app.core.token_planner import TokenPlanner, ACTION_SEND
+from app.core.context_cache import ContextCacheManager, CachedContext
+from app.core.request_scheduler import PRIORITY_INTERACTIVE
+
+# Status aceitos na resposta da IA para um criterio
+VALID_STATUSES = ("Conforme", "Não Conforme", "Inconclusivo")
 
 #======================================================================================================================
 # Responsável por carregar critérios de um arquivo JSON e executar a verificação de conformidade em dados de um projeto.
@@ -19,6 +28,7 @@ class CriteriaManager:
         self.ai = gemini_client
         self.prompt = PromptManager()
         self.path = PathManager()
+        self.planner = TokenPlanner(self.ai)
 
         criteria_database_path = str(self.path.get_criteria_database())
         self.criteria = self.load_criteria(criteria_database_path)
@@ -46,13 +56,34 @@ class CriteriaManager:
 
 
 
+    #----------------------------------------------------------------
+    # Monta o texto de contexto enviado a IA para um criterio
+    #----------------------------------------------------------------
     def _gather_context_text(self, criterion: Dict, project_data: ProjectState) -> Optional[str]:
-        
+        context_text, _ = self._build_context(criterion, project_data)
+        return context_text
+
+
+
+
+    #----------------------------------------------------------------
+    # Monta o contexto usando apenas os campos relevantes do criterio
+    #----------------------------------------------------------------
+    # Para cada documento fonte, usa os 'content_fields' listados em
+    # criterion["relevant_fields"][doc]. Se nenhum desses campos tiver
+    # conteudo (ou o criterio nao declarar campos), usa o texto
+    # consolidado completo do documento.
+    # Retorna: (texto do contexto ou None, estatisticas de tokens)
+    #----------------------------------------------------------------
+    def _build_context(self, criterion: Dict, project_data: ProjectState) -> Tuple[Optional[str], Dict]:
+
         context_parts = []
         source_docs = criterion.get("source_documents", [])
+        relevant_fields = criterion.get("relevant_fields", {}) if self.ai.settings.criteria_scoped_context else {}
+        stats = {"full_tokens": 0, "context_tokens": 0, "tokens_saved": 0, "scoped_documents": []}
 
         for doc_name in source_docs:
-            doc_data = getattr(project_data.extracted_data, doc_name, None)
+            doc_data = getattr(project_data.extracted_data, doc_name, None) if project_data.extracted_data else None
             
             # Verifica se os dados daquele documento existem
             if not doc_data:
@@ -60,56 +91,155 @@ class CriteriaManager:
                 continue
 
             # Pega o texto consolidado, que é a fonte da verdade após a edição do usuário
-            consolidated_text = getattr(doc_data, 'consolidated_text', '').strip()
+            consolidated_text = (self._get_document_value(doc_data, 'consolidated_text') or '').strip()
+            scoped_text = self._select_relevant_fields(doc_data, relevant_fields.get(doc_name, []))
 
-            if consolidated_text:
+            if scoped_text:
                 # Adiciona um cabeçalho para dar contexto à IA, especialmente em verificações de consistência
+                context_parts.append(f"### Documento Fornecido: {doc_name.upper()} (trechos relevantes) ###\n{scoped_text}")
+                stats["scoped_documents"].append(doc_name)
+                stats["full_tokens"] += estimate_tokens(consolidated_text or scoped_text)
+                stats["context_tokens"] += estimate_tokens(scoped_text)
+            elif consolidated_text:
                 context_parts.append(f"### Documento Fornecido: {doc_name.upper()} ###\n{consolidated_text}")
+                stats["full_tokens"] += estimate_tokens(consolidated_text)
+                stats["context_tokens"] += estimate_tokens(consolidated_text)
             else:
                 self.logger.warning(f"Texto consolidado para '{doc_name}' está vazio para o critério '{criterion['id']}'.")
 
         if not context_parts:
             self.logger.error(f"Nenhum texto de contexto pôde ser reunido para o critério '{criterion['id']}'.")
+            return None, stats
+
+        stats["tokens_saved"] = max(0, stats["full_tokens"] - stats["context_tokens"])
+        if stats["tokens_saved"]:
+            self.logger.info(
+                f"Contexto do critério '{criterion['id']}' reduzido a campos relevantes: "
+                f"~{stats['context_tokens']} tokens (economia de ~{stats['tokens_saved']} tokens)."
+            )
+
+        return "\n\n---\n\n".join(context_parts), stats
+
+
+
+
+    #----------------------------------------------------------------
+    # Junta os campos de conteudo declarados, ignorando os vazios
+    #----------------------------------------------------------------
+    def _select_relevant_fields(self, doc_data, field_names: List[str]) -> str:
+        if not field_names:
+            return ""
+
+        content_fields = self._get_document_value(doc_data, 'content_fields') or {}
+        if not isinstance(content_fields, dict):
+            return ""
+
+        parts = []
+        for field_name in field_names:
+            value = content_fields.get(field_name)
+            if value is None:
+                continue
+            if not isinstance(value, str):
+                value = json.dumps(value, ensure_ascii=False)
+            value = value.strip()
+            if value and value not in ("null", "[]", "{}"):
+                parts.append(f"[{field_name}]\n{value}")
+
+        return "\n\n".join(parts)
+
+
+
+
+    #----------------------------------------------------------------
+    # Le um campo dos dados extraidos (dict vindo do JSON ou modelo)
+    #----------------------------------------------------------------
+    @staticmethod
+    def _get_document_value(doc_data, key: str, default=None):
+        if isinstance(doc_data, dict):
+            return doc_data.get(key, default)
+        return getattr(doc_data, key, default)
+
+
+
+
+    #----------------------------------------------------------------
+    # Calcula a impressao digital do contexto de um criterio
+    #----------------------------------------------------------------
+    @staticmethod
+    def _hash_context(context_text: Optional[str]) -> Optional[str]:
+        if not context_text:
             return None
+        return hashlib.sha256(context_text.encode("utf-8")).hexdigest()
 
-        return "\n\n---\n\n".join(context_parts)
 
+    #----------------------------------------------------------------
+    # Impressao digital da verificacao: contexto, instrucao, modelo e
+    # prompt. Qualquer mudanca invalida o resultado anterior.
+    #----------------------------------------------------------------
+    def _check_fingerprint(self, criterion: Dict, context_text: Optional[str]) -> Optional[str]:
+        context_hash = self._hash_context(context_text)
+        if not context_hash:
+            return None
+        payload = {
+            "context": context_hash,
+            "instruction": self._get_instruction(criterion),
+            "model": self.ai.settings.criteria_model,
+            "prompt_version": CRITERIA_PROMPT_VERSION,
+            # edicoes no texto do prompt tambem contam, mesmo sem mudar a versao
+            "prompt_template": self._hash_context(self.prompt.get_criteria_check_prompt(context_text="", instruction="")),
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
 
 
 
 
-    def _perform_single_check(self, criterion: Dict, project_data: ProjectState) -> Dict:
+    def _perform_single_check(self, criterion: Dict, project_data: ProjectState, context_cache: Optional[ContextCacheManager] = None) -> Dict:
         
         criterion_id = criterion.get("id")
         self.logger.info(f"Executando verificação para o critério {criterion_id} - {criterion.get('title')}")
 
         # 1. Coletar o texto de contexto
-        context_text = self._gather_context_text(criterion, project_data)
-
-        result = {
-            "id": criterion["id"],
-            "title": criterion.get("title"),
-            "category": criterion.get("category"),
-            "status": "Pendente",
-            "justificativa": "A verificação não foi executada."
-        }
+        context_text, context_stats = self._build_context(criterion, project_data)
+        result = self._new_result(criterion, context_text, context_stats)
 
         if not context_text:
             result["status"] = "Erro"
             result["justificativa"] = "Não foi possível coletar os dados necessários dos documentos para realizar esta verificação."
             return result
 
-        # 2. Montar o prompt
-        prompt = self.prompt.get_criteria_check_prompt(
-            context_text=context_text,
-            instruction=criterion.get("promptinstruction", "")
-        )
-
-        # 3. Executar a chamada à IA
+        # 2. Montar o prompt (com contexto em cache, envia so a instrucao)
         model = self.ai.settings.criteria_model
-        ai_response = self.ai.generate_json_from_prompt(prompt, model)
+        cached_context = context_cache.get_handle(self.prompt.get_cached_criteria_context(context_text)) if context_cache else None
+        if cached_context:
+            prompt = self.prompt.get_cached_criteria_check_prompt(
+                instruction=self._get_instruction(criterion)
+            )
+        else:
+            prompt = self.prompt.get_criteria_check_prompt(
+                context_text=context_text,
+                instruction=self._get_instruction(criterion)
+            )
+
+        # 3. Estimar o tamanho e o custo antes do envio
+        plan = self._plan_check(f"criterio:{criterion_id}", prompt, model, cached_context)
+        result["cached_context"] = bool(cached_context)
+        result["input_tokens"] = plan["input_tokens"]
+        result["estimated_cost_usd"] = plan["estimated_cost_usd"]
+
+        if plan["action"] != ACTION_SEND:
+            result["status"] = "Erro"
+            result["justificativa"] = (
+                f"O contexto do critério (~{plan['input_tokens']} tokens) excede o limite de "
+                f"{self.planner.max_input_tokens} tokens por chamada. Verificação não enviada à IA."
+            )
+            return result
+
+        # 4. Executar a chamada à IA
+        ai_response = self.ai.generate_json_from_prompt(
+            prompt, model, cached_context=cached_context, response_schema=self.prompt.get_criteria_check_schema()
+        )
 
-        # 4. Processar a resposta da IA
+        # 5. Processar a resposta da IA
         if ai_response and isinstance(ai_response, dict):
             result["status"] = ai_response.get("status", "Erro de Formato")
             result["justificativa"] = ai_response.get("justificativa", "A IA não forneceu uma justificativa no formato esperado.")
@@ -121,18 +251,387 @@ class CriteriaManager:
 
         return result
 
-    def run_all_checks(self, project_data: ProjectState) -> List[Dict]:
+
+
+
+    #----------------------------------------------------------------
+    # Verifica um unico criterio pelo id (uso interativo)
+    #----------------------------------------------------------------
+    # A chamada entra na fila do RequestScheduler com prioridade
+    # interativa, passando a frente de verificacoes em massa.
+    # Retorna: o resultado ou None se o criterio nao existir
+    #----------------------------------------------------------------
+    def run_single_check(self, criterion_id: str, project_data: ProjectState) -> Optional[Dict]:
+        criterion = next((c for c in self.criteria if c.get("id") == criterion_id), None)
+        if not criterion:
+            self.logger.error(f"Critério com ID '{criterion_id}' não encontrado na base de dados.")
+            return None
+
+        with self.ai.priority(PRIORITY_INTERACTIVE):
+            return self._perform_single_check(criterion, project_data)
+
+
+
+
+    #----------------------------------------------------------------
+    # Resultado inicial de um criterio, com os metadados do contexto
+    #----------------------------------------------------------------
+    def _new_result(self, criterion: Dict, context_text: Optional[str], context_stats: Dict) -> Dict:
+        return {
+            "id": criterion["id"],
+            "title": criterion.get("title"),
+            "category": criterion.get("category"),
+            "status": "Pendente",
+            "justificativa": "A verificação não foi executada.",
+            "context_hash": self._hash_context(context_text),
+            "check_fingerprint": self._check_fingerprint(criterion, context_text),
+            "source_documents": criterion.get("source_documents", []),
+            "context_tokens": context_stats["context_tokens"],
+            "tokens_saved": context_stats["tokens_saved"],
+        }
+
+
+    # O contexto em cache continua contando no limite e no custo
+    # (com desconto so no cache do servidor; no local ele e reenviado)
+    def _plan_check(self, step: str, prompt: str, model: str, cached_context: Optional[CachedContext]) -> Dict:
+        if cached_context is None:
+            return self.planner.plan_step(step, prompt, model)
+        return self.planner.plan_step(step, prompt, model, cached_tokens=cached_context.tokens,
+                                      cached_discount=cached_context.is_server)
+
+
+    @staticmethod
+    def _get_instruction(criterion: Dict) -> str:
+        # a base de criterios usa "prompt_instruction"; "promptinstruction" e aceito por compatibilidade
+        return criterion.get("prompt_instruction") or criterion.get("promptinstruction", "")
+
+
+
+
+    #----------------------------------------------------------------
+    # Verifica um lote de criterios com os mesmos documentos fonte
+    #----------------------------------------------------------------
+    # Uma unica chamada avalia todos os criterios do lote sobre um
+    # contexto comum (uniao dos campos relevantes). A resposta e uma
+    # lista de {id, status, justificativa} validada item a item. As
+    # respostas validas sao aproveitadas; so os criterios com item
+    # ausente ou invalido sao refeitos, primeiro em um novo lote menor
+    # (retry_missing) e, se ainda faltarem, individualmente.
+    # Retorna: resultados na mesma ordem de 'criteria'
+    #----------------------------------------------------------------
+    def _perform_batch_check(self, criteria: List[Dict], project_data: ProjectState, context_cache: Optional[ContextCacheManager] = None,
+                             retry_missing: bool = True) -> List[Dict]:
+        if len(criteria) == 1:
+            return [self._perform_single_check(criteria[0], project_data, context_cache)]
+
+        ids = [criterion["id"] for criterion in criteria]
+        self.logger.info(f"Executando verificação em lote para os critérios {', '.join(ids)}")
+
+        context_text, _ = self._build_context(self._merge_batch_criteria(criteria), project_data)
+        if not context_text:
+            return [self._perform_single_check(criterion, project_data, context_cache) for criterion in criteria]
+
+        model = self.ai.settings.criteria_model
+        cached_context = context_cache.get_handle(self.prompt.get_cached_criteria_context(context_text)) if context_cache else None
+        items = [{"id": criterion["id"], "instruction": self._get_instruction(criterion)} for criterion in criteria]
+        prompt = self.prompt.get_batch_criteria_check_prompt(items, None if cached_context else context_text)
+
+        plan = self._plan_check(f"lote:{'+'.join(ids)}", prompt, model, cached_context)
+        if plan["action"] != ACTION_SEND:
+            # lote grande demais: divide ao meio
+            middle = len(criteria) // 2
+            return (self._perform_batch_check(criteria[:middle], project_data, context_cache, retry_missing)
+                    + self._perform_batch_check(criteria[middle:], project_data, context_cache, retry_missing))
+
+        ai_response = self.ai.generate_json_from_prompt(
+            prompt, model, cached_context=cached_context, response_schema=self.prompt.get_batch_criteria_check_schema()
+        )
+        answers = self._index_batch_answers(ai_response, ids)
+
+        missing = [criterion for criterion in criteria if criterion["id"] not in answers]
+        retried: Dict[str, Dict] = {}
+        if missing:
+            missing_ids = ", ".join(criterion["id"] for criterion in missing)
+            if retry_missing and len(missing) > 1:
+                self.logger.warning(f"Resposta em lote inválida ou ausente para os critérios {missing_ids}. Refazendo só esses em um novo lote.")
+                retried_results = self._perform_batch_check(missing, project_data, context_cache, retry_missing=False)
+            else:
+                self.logger.warning(f"Resposta em lote inválida ou ausente para os critérios {missing_ids}. Refazendo individualmente.")
+                retried_results = [self._perform_single_check(criterion, project_data, context_cache) for criterion in missing]
+            retried = {result["id"]: result for result in retried_results}
+
+        results = []
+        for criterion in criteria:
+            answer = answers.get(criterion["id"])
+            if answer is None:
+                results.append(retried[criterion["id"]])
+                continue
+
+            own_context, own_stats = self._build_context(criterion, project_data)
+            result = self._new_result(criterion, own_context, own_stats)
+            result["status"] = answer["status"]
+            result["justificativa"] = answer["justificativa"]
+            result["batched"] = True
+            result["cached_context"] = bool(cached_context)
+            # custo da chamada dividido entre os criterios do lote
+            result["input_tokens"] = plan["input_tokens"] // len(criteria)
+            result["estimated_cost_usd"] = plan["estimated_cost_usd"] / len(criteria) if plan["estimated_cost_usd"] is not None else None
+            self.logger.info(f"Critério {criterion['id']} finalizado com status {result['status']} (lote)")
+            results.append(result)
+
+        return results
+
+
+
+
+    #----------------------------------------------------------------
+    # Criterio sintetico com a uniao dos campos relevantes do lote
+    #----------------------------------------------------------------
+    # Se algum criterio nao declarar campos para um documento, o
+    # documento entra com o texto consolidado completo.
+    #----------------------------------------------------------------
+    def _merge_batch_criteria(self, criteria: List[Dict]) -> Dict:
+        source_docs = criteria[0].get("source_documents", [])
+        relevant_fields = {}
+
+        for doc_name in source_docs:
+            merged: List[str] = []
+            for criterion in criteria:
+                fields = criterion.get("relevant_fields", {}).get(doc_name, [])
+                if not fields:
+                    merged = []
+                    break
+                merged.extend(field for field in fields if field not in merged)
+            if merged:
+                relevant_fields[doc_name] = merged
+
+        return {
+            "id": "+".join(criterion["id"] for criterion in criteria),
+            "source_documents": source_docs,
+            "relevant_fields": relevant_fields,
+        }
+
+
+
+
+    #----------------------------------------------------------------
+    # Valida a resposta em lote e indexa os itens validos por id
+    #----------------------------------------------------------------
+    def _index_batch_answers(self, ai_response, ids: List[str]) -> Dict[str, Dict]:
+        items = ai_response
+        # aceita tambem um objeto envolvendo a lista (ex.: {"resultados": [...]})
+        if isinstance(items, dict):
+            lists = [value for value in items.values() if isinstance(value, list)]
+            items = lists[0] if len(lists) == 1 else []
+        if not isinstance(items, list):
+            return {}
+
+        answers = {}
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            item_id = item.get("id")
+            status = item.get("status")
+            justificativa = item.get("justificativa")
+            if item_id not in ids or item_id in answers:
+                continue
+            if status not in VALID_STATUSES or not isinstance(justificativa, str) or not justificativa.strip():
+                continue
+            answers[item_id] = {"status": status, "justificativa": justificativa.strip()}
+        return answers
+
+
+
+
+    #----------------------------------------------------------------
+    # Agrupa os criterios pendentes em lotes por documentos fonte
+    #----------------------------------------------------------------
+    def _group_for_batch(self, pending: List[tuple], batch_size: int) -> List[List[tuple]]:
+        groups: Dict[tuple, List[tuple]] = {}
+        for index, criterion in pending:
+            key = tuple(criterion.get("source_documents", []))
+            groups.setdefault(key, []).append((index, criterion))
+
+        batch_size = max(1, int(batch_size or 1))
+        units = []
+        for members in groups.values():
+            for start in range(0, len(members), batch_size):
+                units.append(members[start:start + batch_size])
+        return units
+
+    #----------------------------------------------------------------
+    # Executa todos os criterios para um projeto
+    #----------------------------------------------------------------
+    # parallel: distribui as verificacoes em um pool de threads com
+    #   largura max_workers (padrao: settings.criteria_max_workers)
+    # progress_callback(criterion, result, completed, total): chamado
+    #   a cada criterio concluido
+    # previous_results: resultados anteriores (criteria/results.json);
+    #   quando informados, so os criterios cujo contexto, instrucao,
+    #   modelo ou prompt mudaram desde a ultima verificacao sao
+    #   enviados a IA (modo incremental)
+    # batch: agrupa criterios com os mesmos documentos fonte em uma
+    #   unica chamada (padrao: settings.criteria_batch_mode), com ate
+    #   settings.criteria_batch_size criterios por lote
+    # Contextos repetidos entre criterios (ex.: o estatuto completo)
+    # sao enviados uma unica vez por execucao como contexto em cache
+    # (settings.context_cache_mode) e liberados ao final.
+    # Os resultados sao sempre retornados na ordem dos criterios.
+    #----------------------------------------------------------------
+    def run_all_checks(
+            self,
+            project_data: ProjectState,
+            parallel: bool = False,
+            max_workers: Optional[int] = None,
+            progress_callback: Optional[Callable[[Dict, Dict, int, int], None]] = None,
+            previous_results: Optional[List[Dict]] = None,
+            batch: Optional[bool] = None
+        ) -> List[Dict]:
 
         if not self.criteria:
             self.logger.error("Nenhum critério carregado. Abortando verificação.")
             return []
 
-        self.logger.info(f"Iniciando verificação de {len(self.criteria)} critérios para o projeto {project_data.name}.")
-        all_results = []
+        total = len(self.criteria)
+        self.logger.info(f"Iniciando verificação de {total} critérios para o projeto {project_data.name}.")
+
+        all_results: List[Optional[Dict]] = [None] * total
+        pending = list(enumerate(self.criteria))
+        completed = 0
+
+        if previous_results is not None:
+            pending = []
+            reusable = self._index_reusable_results(previous_results)
+
+            for index, criterion in enumerate(self.criteria):
+                previous = reusable.get(criterion.get("id"))
+                fingerprint = self._check_fingerprint(criterion, self._gather_context_text(criterion, project_data))
+
+                if previous and fingerprint and previous.get("check_fingerprint") == fingerprint:
+                    all_results[index] = previous
+                    completed += 1
+                    self._report_progress(progress_callback, criterion, previous, completed, total)
+                else:
+                    pending.append((index, criterion))
+
+            self.logger.info(f"Verificação incremental: {total - len(pending)} critério(s) reaproveitado(s), {len(pending)} a verificar.")
+
+        if batch is None:
+            batch = self.ai.settings.criteria_batch_mode
+        if batch:
+            units = self._group_for_batch(pending, self.ai.settings.criteria_batch_size)
+            self.logger.info(f"Modo em lote: {len(pending)} critério(s) agrupado(s) em {len(units)} chamada(s).")
+        else:
+            units = [[item] for item in pending]
 
-        for criterion in self.criteria:
-            check_result = self._perform_single_check(criterion, project_data)
-            all_results.append(check_result)
+        with self._create_context_cache(units, project_data) as context_cache:
+            if parallel and units:
+                self._run_checks_in_pool(units, project_data, all_results, completed, max_workers, progress_callback, context_cache)
+            else:
+                for unit in units:
+                    check_results = self._perform_batch_check([criterion for _, criterion in unit], project_data, context_cache)
+                    for (index, criterion), check_result in zip(unit, check_results):
+                        all_results[index] = check_result
+                        completed += 1
+                        self._report_progress(progress_callback, criterion, check_result, completed, total)
 
         self.logger.info("Verificação de todos os critérios concluída.")
         return all_results
+
+
+
+
+    #----------------------------------------------------------------
+    # Prepara o cache de contexto da execucao
+    #----------------------------------------------------------------
+    def _create_context_cache(self, units: List[List[tuple]], project_data: ProjectState) -> ContextCacheManager:
+        context_cache = ContextCacheManager(self.ai, self.ai.settings.criteria_model)
+        if context_cache.enabled:
+            contexts = []
+            for unit in units:
+                criteria = [criterion for _, criterion in unit]
+                merged = criteria[0] if len(criteria) == 1 else self._merge_batch_criteria(criteria)
+                contexts.append(self._gather_context_text(merged, project_data))
+            shared = context_cache.plan(self.prompt.get_cached_criteria_context(text) for text in contexts if text)
+            if shared:
+                self.logger.info(f"{shared} contexto(s) compartilhado(s) entre critérios serão enviados uma única vez.")
+        return context_cache
+
+
+
+
+    #----------------------------------------------------------------
+    # Indexa por id os resultados anteriores que podem ser reaproveitados
+    #----------------------------------------------------------------
+    def _index_reusable_results(self, previous_results: List[Dict]) -> Dict[str, Dict]:
+        reusable = {}
+        for result in previous_results or []:
+            # resultados sem impressao digital (versoes antigas) sao refeitos
+            if not isinstance(result, dict) or not result.get("check_fingerprint"):
+                continue
+            # Falhas de execucao sempre sao refeitas
+            if result.get("status") in ("Erro", "Erro de IA", "Erro de Formato", "Pendente"):
+                continue
+            reusable[result.get("id")] = result
+        return reusable
+
+
+
+
+    #----------------------------------------------------------------
+    # Executa as verificacoes em paralelo mantendo a ordem original
+    #----------------------------------------------------------------
+    def _run_checks_in_pool(
+            self,
+            units: List[List[tuple]],
+            project_data: ProjectState,
+            all_results: List[Optional[Dict]],
+            completed: int,
+            max_workers: Optional[int],
+            progress_callback: Optional[Callable[[Dict, Dict, int, int], None]],
+            context_cache: Optional[ContextCacheManager] = None
+        ) -> None:
+
+        total = len(all_results)
+        width = max(1, min(int(max_workers or self.ai.settings.criteria_max_workers or 1), len(units)))
+        self.logger.info(f"Verificação paralela com {width} worker(s).")
+
+        with ThreadPoolExecutor(max_workers=width, thread_name_prefix="criteria") as pool:
+            futures = {
+                pool.submit(self._perform_batch_check, [criterion for _, criterion in unit], project_data, context_cache): unit
+                for unit in units
+            }
+
+            for future in as_completed(futures):
+                unit = futures[future]
+                try:
+                    check_results = future.result()
+                except Exception as e:
+                    self.logger.error(f"Erro inesperado ao verificar o(s) critério(s) {[c.get('id') for _, c in unit]}: {e}", exc_info=True)
+                    check_results = [
+                        {
+                            "id": criterion.get("id"),
+                            "title": criterion.get("title"),
+                            "category": criterion.get("category"),
+                            "status": "Erro",
+                            "justificativa": "Ocorreu um erro inesperado durante a verificação."
+                        }
+                        for _, criterion in unit
+                    ]
+
+                for (index, criterion), check_result in zip(unit, check_results):
+                    all_results[index] = check_result
+                    completed += 1
+                    self._report_progress(progress_callback, criterion, check_result, completed, total)
+
+
+
+
+    def _report_progress(self, progress_callback, criterion: Dict, result: Dict, completed: int, total: int) -> None:
+        self.logger.info(f"Progresso da verificação: {completed}/{total} ({criterion.get('id')})")
+        if progress_callback is None:
+            return
+        try:
+            progress_callback(criterion, result, completed, total)
+        except Exception as e:
+            self.logger.warning(f"Falha no callback de progresso: {e}")
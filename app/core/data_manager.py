@@ -1,10 +1,10 @@
 import os
 import json
 import fitz  # PyMuPDF
-import docx  # python-docx
 from datetime import datetime
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Iterator
 from pathlib import Path
+from contextlib import contextmanager
 
 
 from app.core.ai_client import gemini_client
@@ -12,6 +12,9 @@ from app.core.prompt_manager import PromptManager
 from app.core.logger import Logger
 from app.core.models import StructuredExtraction
 from app.core.path_manager import PathManager
+from app.core.document_ingestion import DocumentIngestionEngine
+from app.core.image_encoder import PageImageEncoder
+from app.core.token_planner import TokenPlanner, ACTION_SEND
 
 # Orquestra o processo de extração de dados de diferentes formatos de documentos,
 # preparando o conteúdo para análise por IA (texto ou multimodal).
@@ -23,6 +26,17 @@ class ExtractedDataManager:
         self.prompt_manager = PromptManager()
         self.path = PathManager
         self.logger = Logger(name="ExtractedDataManager")
+        self.planner = TokenPlanner(self.gemini_client)
+        settings = self.gemini_client.settings
+        self.ingestion = DocumentIngestionEngine(
+            max_workers=settings.ingestion_max_workers or None,
+            image_encoder=PageImageEncoder(
+                dpi=settings.image_dpi,
+                grayscale=settings.image_grayscale,
+                jpeg_quality=settings.image_jpeg_quality,
+                max_dimension=settings.image_max_dimension
+            )
+        )
 
         # Era melhor tirar isso daqui
         self.workflows = {
@@ -130,51 +144,41 @@ class ExtractedDataManager:
             print(f"Erro ao verificar texto extraído: {e}")
             return False
 
-    def _extract_content_from_files(self, file_paths: List[Path]) -> Dict:
-        texts: List[str] = []
-        images: List[bytes] = []
-        docx_endings = [".docx", ".DOCX"]
-        pdf_endings = [".pdf", ".PDF"]
-
-        for path in file_paths:
-            self.logger.info(f"Processando arquivo {os.path.basename(path)}...")
-            try:
-                if path.suffix in docx_endings:
-                    doc = docx.Document(str(path))
-                    full_text = [p.text for p in doc.paragraphs if p.text.strip()]
-                    texts.append("\n".join(full_text))
-
-                elif path.suffix in pdf_endings:
-                    pdf_doc = fitz.open(path)
-                    has_text_content = False
-                    for page_num in range(len(pdf_doc)):
-                        page = pdf_doc[page_num]
-                        page_text = page.get_text()
-                        if page_text.strip():
-                            texts.append(page_text)
-                            has_text_content = True
-                        else:
-                            self.logger.warning(
-                                f"Página {page_num + 1} de {os.path.basename(path)} não contém texto. Tratando como imagem."
-                            )
-                            pix = page.get_pixmap()
-                            images.append(pix.tobytes())
-                    if has_text_content:
-                        self.logger.info(
-                            f"PDF '{os.path.basename(path)} processado como documento de texto"
-                        )
-                    pdf_doc.close()
-
-                else:
-                    self.logger.warning(f"Formato não suportado: {path}")
-            except Exception as e:
-                self.logger.error(f"Erro ao processar {path}: {e}")
-
-        if texts:
-            return {"type": "text", "content": "\n\n".join(texts)}
-        if images:
-            return {"type": "images", "content": images}
-        return {"type": "empty", "content": None}
+    # Extrai texto (ou imagens das paginas sem texto) dos arquivos.
+    # As paginas sao processadas em paralelo pelo DocumentIngestionEngine
+    # (settings.ingestion_max_workers processos; 0 = numero de CPUs).
+    # Com project_name, arquivos inalterados vem do cache de paginas do projeto.
+    def _extract_content_from_files(self, file_paths: List[Path], project_name: Optional[str] = None) -> Dict:
+        cache_dir = self.path.get_project_ingestion_cache_dir(project_name) if project_name else None
+        content = self.ingestion.extract_content(file_paths, cache_dir)
+        if content["type"] == "text":
+            self.logger.info(f"{len(file_paths)} arquivo(s) processado(s) como documento de texto")
+        return content
+
+    # Percorre as paginas dos arquivos em fluxo ({"file", "page", "type", "content"}).
+    # Com spill_to_disk, as imagens sao gravadas em um diretorio temporario dentro de
+    # PathManager.get_temp_dir() e "content" traz o caminho do arquivo; o diretorio
+    # e removido quando a iteracao termina.
+    # Com spill_dir (ver spill_directory), as imagens vao para o diretorio do
+    # chamador e continuam disponiveis depois da iteracao.
+    def iter_page_records(self, file_paths: List[Path], project_name: Optional[str] = None, spill_to_disk: bool = False,
+                          spill_dir: Optional[Path] = None) -> Iterator[Dict]:
+        cache_dir = self.path.get_project_ingestion_cache_dir(project_name) if project_name else None
+        own_spill_dir = self.ingestion.create_spill_dir() if spill_to_disk and spill_dir is None else None
+        try:
+            yield from self.ingestion.iter_pages(file_paths, cache_dir, spill_dir or own_spill_dir)
+        finally:
+            if own_spill_dir is not None:
+                self.ingestion.remove_spill_dir(own_spill_dir)
+
+    # Diretorio temporario para as imagens das paginas, removido ao sair do bloco
+    @contextmanager
+    def spill_directory(self) -> Iterator[Path]:
+        spill_dir = self.ingestion.create_spill_dir()
+        try:
+            yield spill_dir
+        finally:
+            self.ingestion.remove_spill_dir(spill_dir)
 
     # ===========================================================
     # MÉTODO DE ORQUESTRAÇÃO DA EXTRAÇÃO
@@ -207,6 +211,8 @@ class ExtractedDataManager:
                 content_fields=workflow.get("content_fields", []),
                 ignored_fields=workflow.get("ignored_fields", []),
             )
+            if not self._check_token_budget(f"extracao:{category}", prompt, model_name):
+                return None
             extracted_json = self.gemini_client.generate_json_from_prompt(
                 prompt, model_name
             )
@@ -228,6 +234,8 @@ class ExtractedDataManager:
                     + extracted_content["auxiliary_text"]
                 )
 
+            if not self._check_token_budget(f"extracao:{category}", prompt, model_name, images):
+                return None
             extracted_json = self.gemini_client.generate_json_from_multimodal_prompt(
                 text_prompt=prompt, images=images, model_name=model_name
             )
@@ -247,6 +255,18 @@ class ExtractedDataManager:
         self.logger.info("Extração da IA concluída. Retornando dados estruturados.")
         return extracted_json
 
+    # Estima tokens e custo da chamada antes do envio; chamadas acima de
+    # settings.token_ceiling sao rejeitadas sem ida a API.
+    def _check_token_budget(self, step: str, prompt: str, model_name: str, images: Optional[List[bytes]] = None) -> bool:
+        plan = self.planner.plan_step(step, prompt, model_name, images)
+        self.logger.info(f"Etapa '{step}': {TokenPlanner.format_summary(TokenPlanner.summarize([plan]))}.")
+        if plan["action"] != ACTION_SEND:
+            self.logger.error(
+                f"Extração '{step}' rejeitada: ~{plan['input_tokens']} tokens excedem o limite de {self.planner.max_input_tokens}."
+            )
+            return False
+        return True
+
     def consolidate_content_fields(self, contentfields: Dict[str, str]) -> str:
         useful_texts = [v.strip() for v in contentfields.values() if v and v.strip()]
         return "\n\n".join(useful_texts)
@@ -339,19 +359,3 @@ class ExtractedDataManager:
                 )
 
         return "\n\n".join(consolidated_text)
-
-    def save_dict_to_file(self, project_name: str, category: str, data: Dict) -> bool:
-        file_obj = self.path.get_extracted_file_path(project_name, category)
-
-        try:
-            file_obj.write_text(json.dump(data))
-            self.logger.info(
-                f"Dados ds categoria '{category}' para projeto '{project_name}' escritos."
-            )
-            return True
-        except Exception as e:
-            self.logger.error(
-                f"Erro ao escrever dados de categoria '{category}' em '{file_obj}' para projeto '{project_name}': \n\n {e}"
-            )
-            return False
-
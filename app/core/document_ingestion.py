@@ -0,0 +1,531 @@
+import os
+import json
+import shutil
+import hashlib
+import time
+import tempfile
+import fitz  # PyMuPDF
+import docx  # python-docx
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from app.core.logger import Logger
+from app.core.path_manager import PathManager
+from app.core.image_encoder import PageImageEncoder
+
+
+DOCX_ENDINGS = [".docx", ".DOCX"]
+PDF_ENDINGS = [".pdf", ".PDF"]
+
+# Entradas do cache de paginas sem manifesto (ingestao interrompida) mais
+# antigas que isso sao apagadas na limpeza
+INCOMPLETE_ENTRY_MAX_AGE_SECONDS = 3600
+
+
+#================================================================
+# Funcoes executadas nos processos do pool
+#----------------------------------------------------------------
+# Ficam no nivel do modulo para poderem ser serializadas (pickle)
+# e enviadas aos processos filhos. Cada registro de pagina segue
+# o formato {"page", "type": "text"|"image", "content"}; paginas
+# de imagem trazem tambem "mime_type", "original_bytes" e
+# "encoded_bytes" (ver PageImageEncoder).
+#================================================================
+
+def _process_pdf_pages(path_str: str, page_numbers: List[int], encoder_settings: Optional[Dict] = None) -> List[Dict]:
+    encoder = PageImageEncoder.from_settings(encoder_settings)
+    records = []
+    with fitz.open(path_str) as pdf_doc:
+        for page_num in page_numbers:
+            page = pdf_doc[page_num]
+            page_text = page.get_text()
+            if page_text.strip():
+                records.append({"page": page_num, "type": "text", "content": page_text})
+            else:
+                encoded = encoder.encode_page(page)
+                records.append({
+                    "page": page_num,
+                    "type": "image",
+                    "content": encoded["content"],
+                    "mime_type": encoded["mime_type"],
+                    "original_bytes": encoded["original_bytes"],
+                    "encoded_bytes": encoded["encoded_bytes"],
+                })
+    return records
+
+
+def _process_docx(path_str: str) -> List[Dict]:
+    doc = docx.Document(path_str)
+    full_text = [p.text for p in doc.paragraphs if p.text.strip()]
+    return [{"page": 0, "type": "text", "content": "\n".join(full_text)}]
+
+
+
+
+#================================================================
+# CLASSE: DocumentIngestionEngine
+#----------------------------------------------------------------
+# Le PDFs e DOCX e devolve o conteudo pagina a pagina. As paginas
+# dos PDFs sao divididas em lotes (shards) distribuidos em um pool
+# de processos, e o resultado e remontado na ordem original
+# (ordem dos arquivos, depois ordem das paginas).
+#
+# O processamento e feito em fluxo (iter_pages): apenas uma janela
+# limitada de lotes fica em execucao/memoria ao mesmo tempo, e as
+# imagens podem ser despejadas em disco (spill) em vez de ficarem
+# em memoria, de modo que o pico de memoria nao depende do numero
+# de paginas.
+#
+# Opcionalmente usa um cache em disco (ex.: extracted/ingestion_cache
+# do projeto) enderecado pelo hash do conteudo do arquivo e pelas
+# configuracoes de renderizacao: arquivos que nao mudaram nunca sao
+# lidos ou rasterizados de novo. Ao fim de cada leitura completa as
+# entradas de versoes antigas dos arquivos (ou de outras
+# configuracoes) sao apagadas (ver _prune_cache).
+#================================================================
+
+class DocumentIngestionEngine:
+
+    def __init__(self, max_workers: Optional[int] = None, pages_per_shard: int = 8, image_encoder: Optional[PageImageEncoder] = None):
+        self.logger = Logger(name="DocumentIngestionEngine")
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.pages_per_shard = max(1, pages_per_shard)
+        self.image_encoder = image_encoder or PageImageEncoder()
+        # Qualquer mudanca aqui invalida as entradas do cache de paginas
+        self.render_settings = {"image_format": self.image_encoder.image_format, **self.image_encoder.settings}
+
+
+
+
+    #----------------------------------------------------------------
+    # Percorre as paginas dos arquivos em fluxo, na ordem original
+    #----------------------------------------------------------------
+    # cache_dir: se informado, reaproveita/grava as paginas por arquivo
+    # spill_dir: se informado, as imagens sao gravadas nesse diretorio
+    #   e o registro traz o caminho (Path) em "content" no lugar dos bytes
+    # Gera: {"file", "page", "type", "content"}
+    #----------------------------------------------------------------
+    def iter_pages(self, file_paths: List[Path], cache_dir: Optional[Path] = None, spill_dir: Optional[Path] = None) -> Iterator[Dict]:
+        sources = []
+        all_jobs: List[Tuple[Path, str, List[int]]] = []
+
+        for path in [Path(p) for p in file_paths]:
+            cache_key = self._get_cache_key(path) if cache_dir is not None else None
+            if cache_key and self._has_cache_entry(cache_dir, cache_key):
+                self.logger.info(f"Arquivo {os.path.basename(path)} sem alterações. Páginas obtidas do cache.")
+                sources.append((path, cache_key, None))
+                continue
+
+            jobs = self._plan_jobs([path])
+            if not jobs:
+                # arquivo ilegivel ou nao suportado: nada a guardar no cache
+                cache_key = None
+            sources.append((path, cache_key, (len(all_jobs), len(all_jobs) + len(jobs))))
+            all_jobs.extend(jobs)
+
+        runner = _ShardRunner(self, all_jobs)
+        try:
+            for path, cache_key, job_range in sources:
+                if job_range is None:
+                    records = self._iter_from_cache(cache_dir, cache_key)
+                else:
+                    records = runner.iter_results(*job_range)
+                    if cache_key:
+                        records = self._iter_and_cache(cache_dir, cache_key, records, path,
+                                                       lambda job_range=job_range: not runner.has_failures(*job_range))
+
+                for record in records:
+                    record["file"] = str(path)
+                    if record["type"] == "image":
+                        self._report_image_reduction(path, record)
+                    if spill_dir is not None and record["type"] == "image" and isinstance(record["content"], bytes):
+                        record["content"] = self._spill_image(spill_dir, path, record)
+                    yield record
+        finally:
+            runner.shutdown()
+
+        # so depois de uma leitura completa: as entradas atuais ja tem manifesto
+        if cache_dir is not None:
+            self._prune_cache(cache_dir, {str(path): cache_key for path, cache_key, _ in sources if cache_key})
+
+
+
+
+    #----------------------------------------------------------------
+    # Extrai todas as paginas dos arquivos, na ordem original
+    #----------------------------------------------------------------
+    # Retorna: lista de {"file", "page", "type", "content"}
+    #----------------------------------------------------------------
+    def extract_pages(self, file_paths: List[Path], cache_dir: Optional[Path] = None) -> List[Dict]:
+        return list(self.iter_pages(file_paths, cache_dir))
+
+
+
+
+    #----------------------------------------------------------------
+    # Extrai o conteudo no formato {"type", "content"}
+    #----------------------------------------------------------------
+    # Mantem o contrato historico de _extract_content_from_files:
+    # se houver texto, retorna todo o texto; senao, as imagens.
+    # As imagens ficam em disco durante a leitura e so sao carregadas
+    # no fim, quando se sabe que serao usadas.
+    #----------------------------------------------------------------
+    def extract_content(self, file_paths: List[Path], cache_dir: Optional[Path] = None) -> Dict:
+        texts: List[str] = []
+        image_paths: List[Path] = []
+
+        spill_dir = self.create_spill_dir()
+        try:
+            for record in self.iter_pages(file_paths, cache_dir, spill_dir):
+                if record["type"] == "text":
+                    texts.append(record["content"])
+                    # imagens so sao usadas se nenhum texto for encontrado
+                    image_paths = []
+                else:
+                    self.logger.warning(
+                        f"Página {record['page'] + 1} de {os.path.basename(record['file'])} não contém texto. Tratando como imagem."
+                    )
+                    if not texts:
+                        image_paths.append(record["content"])
+
+            if texts:
+                return {"type": "text", "content": "\n\n".join(texts)}
+            if image_paths:
+                return {"type": "images", "content": [Path(image_path).read_bytes() for image_path in image_paths]}
+            return {"type": "empty", "content": None}
+        finally:
+            self.remove_spill_dir(spill_dir)
+
+
+
+
+    #----------------------------------------------------------------
+    # Cria um diretorio temporario para despejo de imagens
+    #----------------------------------------------------------------
+    @staticmethod
+    def create_spill_dir() -> Path:
+        temp_dir = PathManager.get_temp_dir()
+        temp_dir.mkdir(parents=True, exist_ok=True)
+        return Path(tempfile.mkdtemp(prefix="ingestion_", dir=temp_dir))
+
+
+    @staticmethod
+    def remove_spill_dir(spill_dir: Path) -> None:
+        shutil.rmtree(spill_dir, ignore_errors=True)
+
+
+
+
+    #----------------------------------------------------------------
+    # Divide os arquivos em tarefas (um DOCX ou um lote de paginas)
+    #----------------------------------------------------------------
+    def _plan_jobs(self, file_paths: List[Path]) -> List[Tuple[Path, str, List[int]]]:
+        jobs = []
+        for path in file_paths:
+            path = Path(path)
+            self.logger.info(f"Processando arquivo {os.path.basename(path)}...")
+
+            if path.suffix in DOCX_ENDINGS:
+                jobs.append((path, "docx", []))
+
+            elif path.suffix in PDF_ENDINGS:
+                try:
+                    with fitz.open(path) as pdf_doc:
+                        page_count = len(pdf_doc)
+                except Exception as e:
+                    self.logger.error(f"Erro ao processar {path}: {e}")
+                    continue
+
+                for start in range(0, page_count, self.pages_per_shard):
+                    shard = list(range(start, min(start + self.pages_per_shard, page_count)))
+                    jobs.append((path, "pdf", shard))
+
+            else:
+                self.logger.warning(f"Formato não suportado: {path}")
+
+        return jobs
+
+
+
+
+    # Excecoes sobem para o _ShardRunner, que registra o lote com falha
+    def _run_job(self, job: Tuple[Path, str, List[int]]) -> List[Dict]:
+        path, kind, pages = job
+        if kind == "docx":
+            return _process_docx(str(path))
+        return _process_pdf_pages(str(path), pages, self.image_encoder.settings)
+
+
+
+
+    #----------------------------------------------------------------
+    # Registra a reducao de bytes da imagem em relacao ao bitmap RGB
+    # da pagina a 72 dpi (estimativa, ver PageImageEncoder.encode_page)
+    #----------------------------------------------------------------
+    def _report_image_reduction(self, path: Path, record: Dict) -> None:
+        original = record.get("original_bytes")
+        encoded = record.get("encoded_bytes")
+        if not original or encoded is None:
+            return
+        change = 100.0 * (encoded - original) / original
+        self.logger.info(
+            f"Imagem da página {record['page'] + 1} de {os.path.basename(path)}: "
+            f"{original / 1024:.1f} KB -> {encoded / 1024:.1f} KB ({change:+.0f}%)."
+        )
+
+
+
+
+    def _spill_image(self, spill_dir: Path, path: Path, record: Dict) -> Path:
+        spill_dir = Path(spill_dir)
+        spill_dir.mkdir(parents=True, exist_ok=True)
+        safe_stem = PathManager.get_safe_name(path.stem)
+        # arquivos de pastas ou extensoes diferentes podem ter o mesmo nome
+        path_hash = hashlib.sha256(str(path).encode("utf-8")).hexdigest()[:8]
+        image_path = spill_dir / f"{safe_stem}_{path_hash}_p{record['page'] + 1:04d}.{self.render_settings['image_format']}"
+        image_path.write_bytes(record["content"])
+        return image_path
+
+
+
+
+    #----------------------------------------------------------------
+    # Chave do cache: hash do conteudo do arquivo + configuracoes
+    #----------------------------------------------------------------
+    def _get_cache_key(self, path: Path) -> Optional[str]:
+        try:
+            digest = hashlib.sha256()
+            with open(path, "rb") as f:
+                for block in iter(lambda: f.read(1024 * 1024), b""):
+                    digest.update(block)
+        except OSError as e:
+            self.logger.error(f"Não foi possível calcular o hash de {path}: {e}")
+            return None
+
+        return f"{digest.hexdigest()}_{self._settings_hash()}"
+
+
+    def _settings_hash(self) -> str:
+        settings_raw = json.dumps(self.render_settings, sort_keys=True)
+        return hashlib.sha256(settings_raw.encode("utf-8")).hexdigest()[:12]
+
+
+    def _has_cache_entry(self, cache_dir: Path, cache_key: str) -> bool:
+        return (Path(cache_dir) / cache_key / "manifest.json").exists()
+
+
+
+
+    #----------------------------------------------------------------
+    # Le as paginas de um arquivo do cache, uma a uma
+    #----------------------------------------------------------------
+    def _iter_from_cache(self, cache_dir: Path, cache_key: str) -> Iterator[Dict]:
+        entry_dir = Path(cache_dir) / cache_key
+        try:
+            manifest = json.loads((entry_dir / "manifest.json").read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError) as e:
+            self.logger.warning(f"Entrada de cache de páginas inválida '{cache_key}': {e}")
+            return
+
+        for item in manifest.get("pages", []):
+            try:
+                if item["type"] == "text":
+                    content = item["content"]
+                else:
+                    content = (entry_dir / item["image_file"]).read_bytes()
+            except (OSError, KeyError) as e:
+                self.logger.warning(f"Página ausente no cache de páginas '{cache_key}': {e}")
+                continue
+            record = {"page": item["page"], "type": item["type"], "content": content}
+            if item.get("mime_type"):
+                record["mime_type"] = item["mime_type"]
+            yield record
+
+
+
+
+    #----------------------------------------------------------------
+    # Repassa as paginas gravando-as no cache a medida que passam
+    #----------------------------------------------------------------
+    # O manifesto so e gravado no fim: se o fluxo for interrompido ou
+    # is_complete() indicar que algum lote falhou, a entrada fica
+    # incompleta, e ignorada na proxima leitura e depois removida
+    # por _prune_cache.
+    #----------------------------------------------------------------
+    def _iter_and_cache(self, cache_dir: Path, cache_key: str, records: Iterator[Dict], path: Path,
+                        is_complete: Callable[[], bool] = lambda: True) -> Iterator[Dict]:
+        entry_dir = Path(cache_dir) / cache_key
+        pages = []
+        can_write = True
+
+        try:
+            entry_dir.mkdir(parents=True, exist_ok=True)
+        except OSError as e:
+            self.logger.error(f"Erro ao gravar cache de páginas '{cache_key}': {e}")
+            can_write = False
+
+        for record in records:
+            if can_write:
+                try:
+                    if record["type"] == "text":
+                        pages.append({"page": record["page"], "type": "text", "content": record["content"]})
+                    else:
+                        image_file = f"page_{record['page'] + 1:04d}.{self.render_settings['image_format']}"
+                        (entry_dir / image_file).write_bytes(record["content"])
+                        pages.append({
+                            "page": record["page"],
+                            "type": record["type"],
+                            "image_file": image_file,
+                            "mime_type": record.get("mime_type"),
+                        })
+                except OSError as e:
+                    self.logger.error(f"Erro ao gravar cache de páginas '{cache_key}': {e}")
+                    can_write = False
+            yield record
+
+        if not can_write:
+            return
+        if not is_complete():
+            self.logger.warning(f"Páginas de {os.path.basename(path)} incompletas. Cache não será gravado.")
+            return
+
+        try:
+            manifest = {"source": str(path), "render_settings": self.render_settings, "pages": pages}
+            tmp_path = entry_dir / "manifest.json.tmp"
+            tmp_path.write_text(json.dumps(manifest, ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp_path, entry_dir / "manifest.json")
+        except OSError as e:
+            self.logger.error(f"Erro ao gravar cache de páginas '{cache_key}': {e}")
+
+
+
+
+    #----------------------------------------------------------------
+    # Apaga do cache as entradas que nao servem mais
+    #----------------------------------------------------------------
+    # current_keys: {arquivo lido: chave atual}. Sao apagadas:
+    #   - entradas de um arquivo lido agora com outra chave (conteudo
+    #     ou configuracoes de renderizacao mudaram)
+    #   - entradas cujo arquivo de origem nao existe mais
+    #   - entradas com outras configuracoes de renderizacao
+    #   - entradas sem manifesto (ingestao interrompida) antigas
+    # Entradas de outros arquivos ainda existentes sao mantidas (o
+    # cache e compartilhado pelas categorias do projeto).
+    #----------------------------------------------------------------
+    def _prune_cache(self, cache_dir: Path, current_keys: Dict[str, str]) -> None:
+        cache_dir = Path(cache_dir)
+        if not cache_dir.is_dir():
+            return
+
+        settings_hash = self._settings_hash()
+        keep = set(current_keys.values())
+        removed = 0
+        for entry_dir in cache_dir.iterdir():
+            if not entry_dir.is_dir() or entry_dir.name in keep:
+                continue
+
+            manifest_path = entry_dir / "manifest.json"
+            try:
+                if not manifest_path.exists():
+                    stale = time.time() - entry_dir.stat().st_mtime > INCOMPLETE_ENTRY_MAX_AGE_SECONDS
+                else:
+                    source = json.loads(manifest_path.read_text(encoding="utf-8")).get("source")
+                    stale = (
+                        not entry_dir.name.endswith(f"_{settings_hash}")
+                        or (source is not None and (source in current_keys or not Path(source).exists()))
+                    )
+            except (OSError, json.JSONDecodeError):
+                stale = True
+
+            if stale:
+                shutil.rmtree(entry_dir, ignore_errors=True)
+                removed += 1
+
+        if removed:
+            self.logger.info(f"{removed} entrada(s) antiga(s) removida(s) do cache de páginas.")
+
+
+
+
+#================================================================
+# CLASSE: _ShardRunner
+#----------------------------------------------------------------
+# Executa os lotes de paginas mantendo no maximo uma janela de
+# lotes em andamento no pool de processos. Os resultados sao
+# consumidos na mesma ordem em que os lotes foram planejados.
+#
+# Um lote que falha (erro no processamento ou pool quebrado) e
+# registrado em failed_jobs e nao gera paginas.
+#================================================================
+
+class _ShardRunner:
+
+    def __init__(self, engine: DocumentIngestionEngine, jobs: List[Tuple[Path, str, List[int]]]):
+        self.engine = engine
+        self.jobs = jobs
+        self.window = max(1, engine.max_workers * 2)
+        self.futures = {}
+        self.next_submit = 0
+        self.pool = None
+        self.failed_jobs: Set[int] = set()
+
+        total_pages = sum(len(pages) for _, kind, pages in jobs if kind == "pdf")
+
+        # Para poucas paginas o custo de subir o pool nao compensa
+        if engine.max_workers > 1 and total_pages > engine.pages_per_shard:
+            workers = min(engine.max_workers, len(jobs))
+            try:
+                self.pool = ProcessPoolExecutor(max_workers=workers)
+                engine.logger.info(f"Extraindo {len(jobs)} lote(s) de páginas com {workers} processo(s).")
+            except Exception as e:
+                # Ambientes sem suporte a multiprocessing caem no modo sequencial
+                engine.logger.warning(f"Pool de processos indisponível ({e}). Extraindo sequencialmente.")
+                self.pool = None
+
+
+    def iter_results(self, start: int, end: int) -> Iterator[Dict]:
+        for index in range(start, end):
+            for record in self._get_result(index):
+                yield record
+
+
+    def has_failures(self, start: int, end: int) -> bool:
+        return any(start <= index < end for index in self.failed_jobs)
+
+
+    def _get_result(self, index: int) -> List[Dict]:
+        job = self.jobs[index]
+        try:
+            if self.pool is None:
+                return self.engine._run_job(job)
+
+            while self.next_submit < len(self.jobs) and self.next_submit < index + self.window:
+                self._submit(self.next_submit)
+                self.next_submit += 1
+
+            future = self.futures.pop(index, None)
+            if future is None:
+                return self.engine._run_job(job)
+            return future.result()
+        except Exception as e:
+            self.engine.logger.error(f"Erro ao processar {job[0]}: {e}")
+            self.failed_jobs.add(index)
+            return []
+
+
+    def _submit(self, index: int) -> None:
+        path, kind, pages = self.jobs[index]
+        try:
+            if kind == "docx":
+                self.futures[index] = self.pool.submit(_process_docx, str(path))
+            else:
+                self.futures[index] = self.pool.submit(_process_pdf_pages, str(path), pages, self.engine.image_encoder.settings)
+        except Exception as e:
+            self.engine.logger.warning(f"Falha ao enviar lote ao pool ({e}). Lote será processado localmente.")
+
+
+    def shutdown(self) -> None:
+        if self.pool is not None:
+            self.pool.shutdown(wait=True, cancel_futures=True)
+            self.pool = None
@@ -30,6 +30,8 @@ class DocumentPackageService:
     #----------------------------------------------------------------
     def generate_draft_for_signature(self, project_name: str) -> Optional[str]:
         self.logger.info(f"Gerando rascunho para assinatura: {project_name}")
+        # o documento sai do que esta em disco: grava o que ainda esta na fila
+        self.crud_service.flush(project_name)
         project = self.crud_service.load_project(project_name)
         if not project:
             self.logger.error("Projeto não encontrado")
@@ -85,6 +87,7 @@ class DocumentPackageService:
         signed_path = exports_dir / f"SIGNED_{project_name}.pdf"
         draft_path = exports_dir / f"REQUISICAO_{project_name}.pdf"
 
+        self.crud_service.flush(project_name)
         project = self.crud_service.load_project(project_name)
         if not project:
             self.logger.error("Projeto não encontrado")
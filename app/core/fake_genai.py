@@ -0,0 +1,537 @@
+import os
+import re
+import json
+import time
+import random
+import asyncio
+import hashlib
+import threading
+from pathlib import Path
+from collections import Counter, deque
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+from pydantic import BaseModel, TypeAdapter
+
+from app.core.logger import Logger
+from app.core.token_tools import estimate_tokens
+
+
+# Perfis prontos (JACA_FAKE_PROFILE=<nome>)
+FAKE_PROFILES: Dict[str, Dict[str, Any]] = {
+    "instant": {},
+    "realistic": {"latency_ms": 800, "jitter_ms": 400, "error_rate": 0.02},
+    "flaky": {"latency_ms": 300, "jitter_ms": 200, "error_rate": 0.2},
+    "throttled": {"latency_ms": 200, "jitter_ms": 100, "rate_limit_rpm": 30},
+}
+
+# Ids de criterios no prompt em lote ("[id]" sozinho na linha)
+BATCH_ID_PATTERN = re.compile(r"^\[([^\]\n]+)\]\s*$", re.MULTILINE)
+
+
+#================================================================
+# CLASSE: FakeAPIError
+#----------------------------------------------------------------
+# Erro simulado com 'code' HTTP, reconhecido pelo RequestScheduler
+# (429 e 503 sao transitorios e geram nova tentativa).
+#================================================================
+
+class FakeAPIError(Exception):
+
+    def __init__(self, code: int, message: str):
+        super().__init__(f"{code} {message}")
+        self.code = code
+
+
+
+
+#================================================================
+# CLASSE: FakeProfile
+#----------------------------------------------------------------
+# Comportamento do backend falso:
+#
+#   latency_ms / jitter_ms: atraso de cada chamada (uniforme em
+#       latency_ms +- jitter_ms)
+#   error_rate: fracao das chamadas que falham com 503
+#   rate_limit_rpm: requisicoes por minuto por modelo antes de 429
+#       (0 desativa)
+#   seed: semente das respostas, atrasos e falhas
+#   replay_path: arquivo JSONL de respostas gravadas (RecordingClient)
+#   stream_chunk_chars: tamanho dos trechos no streaming
+#================================================================
+
+class FakeProfile:
+
+    def __init__(
+            self,
+            latency_ms: float = 0.0,
+            jitter_ms: float = 0.0,
+            error_rate: float = 0.0,
+            rate_limit_rpm: int = 0,
+            seed: int = 0,
+            replay_path: Optional[str] = None,
+            stream_chunk_chars: int = 200
+        ):
+        self.latency_ms = max(0.0, float(latency_ms))
+        self.jitter_ms = max(0.0, float(jitter_ms))
+        self.error_rate = min(1.0, max(0.0, float(error_rate)))
+        self.rate_limit_rpm = max(0, int(rate_limit_rpm))
+        self.seed = seed
+        self.replay_path = replay_path
+        self.stream_chunk_chars = max(1, int(stream_chunk_chars))
+
+
+    #----------------------------------------------------------------
+    # Le o perfil de JACA_FAKE_PROFILE: nome de um perfil pronto,
+    # JSON com os campos ou caminho de um arquivo JSON
+    #----------------------------------------------------------------
+    @classmethod
+    def from_env(cls, variable: str = "JACA_FAKE_PROFILE") -> "FakeProfile":
+        raw = os.environ.get(variable, "").strip()
+        if not raw:
+            return cls()
+        if raw in FAKE_PROFILES:
+            return cls(**FAKE_PROFILES[raw])
+        if raw.startswith("{"):
+            return cls(**json.loads(raw))
+        with open(raw, "r", encoding="utf-8") as f:
+            return cls(**json.load(f))
+
+
+    def as_dict(self) -> Dict[str, Any]:
+        return dict(vars(self))
+
+
+
+
+#----------------------------------------------------------------
+# Chave de uma requisicao (modelo + conteudo), usada na gravacao e
+# na reproducao de respostas
+#----------------------------------------------------------------
+def build_request_key(model: str, contents: Any, extra_text: str = "") -> str:
+    digest = hashlib.sha256()
+    digest.update(model.lower().encode("utf-8"))
+    digest.update(extra_text.encode("utf-8"))
+    for item in contents if isinstance(contents, list) else [contents]:
+        inline = getattr(item, "inline_data", None)
+        if inline is not None and inline.data:
+            digest.update(hashlib.sha256(inline.data).digest())
+        elif isinstance(item, bytes):
+            digest.update(hashlib.sha256(item).digest())
+        else:
+            digest.update(str(getattr(item, "text", None) or item).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _contents_text(contents: Any) -> str:
+    items = contents if isinstance(contents, list) else [contents]
+    return "\n".join(item for item in items if isinstance(item, str))
+
+
+def _count_images(contents: Any) -> int:
+    items = contents if isinstance(contents, list) else [contents]
+    return sum(1 for item in items if getattr(item, "inline_data", None) is not None)
+
+
+
+
+#================================================================
+# CLASSE: SchemaSynthesizer
+#----------------------------------------------------------------
+# Gera um JSON valido para um response_schema (modelo pydantic ou
+# list[Modelo]), de forma deterministica para a mesma semente.
+#================================================================
+
+class SchemaSynthesizer:
+
+    def __init__(self, rng: random.Random, prompt: str = ""):
+        self.rng = rng
+        self.batch_ids = BATCH_ID_PATTERN.findall(prompt)
+
+
+    def synthesize(self, response_schema: Any) -> Any:
+        if isinstance(response_schema, BaseModel):
+            # types.Schema do SDK: tipos em maiusculas e any_of em vez de anyOf
+            schema = self._from_sdk_schema(response_schema.model_dump(exclude_none=True, mode="json"))
+        else:
+            schema = TypeAdapter(response_schema).json_schema()
+        return self._value(schema, schema.get("$defs", {}), "")
+
+
+    def _from_sdk_schema(self, schema: Dict) -> Dict:
+        converted = {}
+        for key, value in schema.items():
+            if key == "type":
+                converted["type"] = str(value).lower()
+            elif key == "properties":
+                converted["properties"] = {name: self._from_sdk_schema(prop) for name, prop in value.items()}
+            elif key == "items":
+                converted["items"] = self._from_sdk_schema(value)
+            elif key == "any_of":
+                converted["anyOf"] = [self._from_sdk_schema(option) for option in value]
+            else:
+                converted[key] = value
+        return converted
+
+
+    def _value(self, schema: Dict, defs: Dict, name: str) -> Any:
+        if "$ref" in schema:
+            return self._value(defs[schema["$ref"].split("/")[-1]], defs, name)
+        if "enum" in schema:
+            return self.rng.choice(schema["enum"])
+        if "anyOf" in schema:
+            options = [option for option in schema["anyOf"] if option.get("type") != "null"]
+            return self._value(options[0], defs, name) if options else None
+
+        kind = schema.get("type")
+        if kind == "object":
+            return {key: self._value(value, defs, key) for key, value in schema.get("properties", {}).items()}
+        if kind == "array":
+            items = schema.get("items", {})
+            item_schema = defs.get(items.get("$ref", "").split("/")[-1], items)
+            if self.batch_ids and "id" in item_schema.get("properties", {}):
+                # lote de criterios: um item por id presente no prompt
+                answers = []
+                for batch_id in self.batch_ids:
+                    item = self._value(item_schema, defs, name)
+                    item["id"] = batch_id
+                    answers.append(item)
+                return answers
+            return [self._value(items, defs, name) for _ in range(self.rng.randint(1, 3))]
+        if kind == "integer":
+            return self.rng.randint(0, 100)
+        if kind == "number":
+            return round(self.rng.uniform(0, 100), 2)
+        if kind == "boolean":
+            return self.rng.random() < 0.5
+        return f"{name or 'valor'} {self.rng.randint(1, 9999)}"
+
+
+
+
+#================================================================
+# CLASSE: FakeGenAIClient
+#----------------------------------------------------------------
+# Substituto local do genai.Client, com a mesma interface usada pelo
+# _GeminiClient (o "backend"):
+#
+#   models.generate_content / generate_content_stream / count_tokens
+#   aio.models.generate_content
+#   caches.create / caches.delete
+#   close()
+#
+# As respostas vem de replay_path (gravadas com RecordingClient)
+# quando existirem; senao sao sintetizadas: JSON valido para o
+# response_schema da chamada, ou texto proporcional a entrada.
+# Latencia, falhas e limite de requisicoes seguem o FakeProfile.
+# stats conta as chamadas por metodo.
+#================================================================
+
+class FakeGenAIClient:
+
+    def __init__(self, profile: Optional[FakeProfile] = None):
+        self.logger = Logger(name="FakeGenAIClient")
+        self.profile = profile or FakeProfile()
+        self.stats: Counter = Counter()
+        self._lock = threading.Lock()
+        self._attempts: Counter = Counter()
+        self._windows: Dict[str, Deque[float]] = {}
+        self._cached_contents: Dict[str, str] = {}
+        self._replay = self._load_replay(self.profile.replay_path)
+
+        self.models = _FakeModels(self)
+        self.aio = _FakeAio(self)
+        self.caches = _FakeCaches(self)
+        self.logger.info(f"Backend falso de IA ativo: {self.profile.as_dict()}")
+
+
+    def close(self) -> None:
+        pass
+
+
+
+
+    #----------------------------------------------------------------
+    # Atende uma chamada (sem a latencia, aplicada por quem chama)
+    #----------------------------------------------------------------
+    # Retorna: (texto, atraso em segundos)
+    #----------------------------------------------------------------
+    def respond(self, method: str, model: str, contents: Any, config: Any = None) -> tuple:
+        cached_name = getattr(config, "cached_content", None)
+        cached_text = self._cached_contents.get(cached_name, "") if cached_name else ""
+        key = build_request_key(model, contents, cached_text)
+
+        with self._lock:
+            self.stats[method] += 1
+            self._attempts[key] += 1
+            attempt = self._attempts[key]
+            rng = random.Random(f"{self.profile.seed}:{key}:{attempt}")
+            delay = self._latency(rng)
+            throttled = self._register_request(model)
+
+        if throttled:
+            self._count("rate_limited")
+            raise FakeAPIError(429, "RESOURCE_EXHAUSTED (simulado)")
+        if rng.random() < self.profile.error_rate:
+            self._count("errors")
+            raise FakeAPIError(503, "UNAVAILABLE (simulado)")
+
+        if key in self._replay:
+            self._count("replayed")
+            return self._replay[key], delay
+
+        # respostas sintetizadas dependem so da requisicao, nao da tentativa
+        content_rng = random.Random(f"{self.profile.seed}:{key}")
+        prompt = cached_text + "\n" + _contents_text(contents)
+        schema = getattr(config, "response_schema", None)
+        if schema is not None:
+            return json.dumps(SchemaSynthesizer(content_rng, prompt).synthesize(schema), ensure_ascii=False), delay
+        if getattr(config, "response_mime_type", None) == "application/json":
+            return json.dumps({"resposta": f"resposta sintética {content_rng.randint(1, 9999)}"}), delay
+        return self._synthesize_text(content_rng, model, prompt, _count_images(contents)), delay
+
+
+    def _synthesize_text(self, rng: random.Random, model: str, prompt: str, images: int) -> str:
+        # saida proporcional a entrada, como em uma consolidacao de texto
+        target_chars = min(20000, max(200, len(prompt) // 3 + images * 1500))
+        words = ["artigo", "estatuto", "associação", "assembleia", "diretoria", "comunitária", "rádio", "sede", "mandato", "membros"]
+        lines = [f"[{model}] texto sintético"]
+        size = len(lines[0])
+        while size < target_chars:
+            line = " ".join(rng.choice(words) for _ in range(12)).capitalize() + "."
+            lines.append(line)
+            size += len(line) + 1
+        return "\n".join(lines)
+
+
+    def count_tokens(self, contents: Any) -> int:
+        self._count("count_tokens")
+        return estimate_tokens(_contents_text(contents)) + 258 * _count_images(contents)
+
+
+    def create_cache(self, model: str, text: str) -> str:
+        with self._lock:
+            name = f"fakeCachedContents/{len(self._cached_contents) + 1:06d}"
+            self._cached_contents[name] = text
+            self.stats["cache_create"] += 1
+        return name
+
+
+    def delete_cache(self, name: str) -> None:
+        with self._lock:
+            self._cached_contents.pop(name, None)
+            self.stats["cache_delete"] += 1
+
+
+
+
+    def _latency(self, rng: random.Random) -> float:
+        jitter = rng.uniform(-self.profile.jitter_ms, self.profile.jitter_ms)
+        return max(0.0, self.profile.latency_ms + jitter) / 1000.0
+
+
+    # Chamado com o lock: janela deslizante de 60s por modelo
+    def _register_request(self, model: str) -> bool:
+        if not self.profile.rate_limit_rpm:
+            return False
+        now = time.monotonic()
+        window = self._windows.setdefault(model, deque())
+        while window and now - window[0] >= 60.0:
+            window.popleft()
+        if len(window) >= self.profile.rate_limit_rpm:
+            return True
+        window.append(now)
+        return False
+
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.stats[name] += 1
+
+
+    def _load_replay(self, replay_path: Optional[str]) -> Dict[str, str]:
+        if not replay_path or not Path(replay_path).exists():
+            return {}
+        responses = {}
+        with open(replay_path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    responses[entry["key"]] = entry["text"]
+        self.logger.info(f"{len(responses)} resposta(s) gravada(s) carregada(s) de {replay_path}")
+        return responses
+
+
+
+
+#----------------------------------------------------------------
+# Respostas no formato do SDK (apenas os campos usados pelo app)
+#----------------------------------------------------------------
+class FakeResponse:
+
+    def __init__(self, text: Optional[str]):
+        self.text = text
+
+
+class FakeTokenCount:
+
+    def __init__(self, total_tokens: int):
+        self.total_tokens = total_tokens
+
+
+class FakeCachedContent:
+
+    def __init__(self, name: str):
+        self.name = name
+
+
+
+
+class _FakeModels:
+
+    def __init__(self, owner: FakeGenAIClient):
+        self._owner = owner
+
+
+    def generate_content(self, model: str, contents: Any, config: Any = None) -> FakeResponse:
+        text, delay = self._owner.respond("generate_content", model, contents, config)
+        time.sleep(delay)
+        return FakeResponse(text)
+
+
+    def generate_content_stream(self, model: str, contents: Any, config: Any = None) -> Iterator[FakeResponse]:
+        text, delay = self._owner.respond("generate_content_stream", model, contents, config)
+        return self._stream(text, delay)
+
+
+    def _stream(self, text: str, delay: float) -> Iterator[FakeResponse]:
+        size = self._owner.profile.stream_chunk_chars
+        chunks = [text[i:i + size] for i in range(0, len(text), size)] or [""]
+        # a latencia e dividida entre os trechos, com o primeiro mais lento
+        time.sleep(delay / 2)
+        for chunk in chunks:
+            time.sleep(delay / 2 / len(chunks))
+            yield FakeResponse(chunk)
+
+
+    def count_tokens(self, model: str, contents: Any) -> FakeTokenCount:
+        return FakeTokenCount(self._owner.count_tokens(contents))
+
+
+
+
+class _FakeAsyncModels:
+
+    def __init__(self, owner: FakeGenAIClient):
+        self._owner = owner
+
+
+    async def generate_content(self, model: str, contents: Any, config: Any = None) -> FakeResponse:
+        text, delay = self._owner.respond("agenerate_content", model, contents, config)
+        await asyncio.sleep(delay)
+        return FakeResponse(text)
+
+
+class _FakeAio:
+
+    def __init__(self, owner: FakeGenAIClient):
+        self.models = _FakeAsyncModels(owner)
+
+
+
+
+class _FakeCaches:
+
+    def __init__(self, owner: FakeGenAIClient):
+        self._owner = owner
+
+
+    def create(self, model: str, config: Any = None) -> FakeCachedContent:
+        contents = getattr(config, "contents", None) or []
+        return FakeCachedContent(self._owner.create_cache(model, _contents_text(contents)))
+
+
+    def delete(self, name: str) -> None:
+        self._owner.delete_cache(name)
+
+
+
+
+#================================================================
+# CLASSE: RecordingClient
+#----------------------------------------------------------------
+# Envolve um genai.Client real e grava as respostas de
+# generate_content (sincrono e assincrono) em um arquivo JSONL, no
+# formato lido pelo FakeGenAIClient (replay_path). Os demais
+# atributos sao repassados ao cliente real.
+#================================================================
+
+class RecordingClient:
+
+    def __init__(self, client: Any, record_path: str):
+        self._client = client
+        self._record_path = Path(record_path)
+        self._lock = threading.Lock()
+        self.models = _RecordingModels(self, client.models)
+        self.aio = _RecordingAio(self, client.aio)
+
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._client, name)
+
+
+    def record(self, model: str, contents: Any, config: Any, text: Optional[str]) -> None:
+        if not text:
+            return
+        # contextos em cache nao sao reproduziveis fora da execucao que os criou
+        if getattr(config, "cached_content", None):
+            return
+        entry = {"key": build_request_key(model, contents), "model": model, "text": text}
+        with self._lock:
+            self._record_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self._record_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+
+class _RecordingModels:
+
+    def __init__(self, owner: RecordingClient, models: Any):
+        self._owner = owner
+        self._models = models
+
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._models, name)
+
+
+    def generate_content(self, model: str, contents: Any, config: Any = None) -> Any:
+        response = self._models.generate_content(model=model, contents=contents, config=config)
+        self._owner.record(model, contents, config, response.text)
+        return response
+
+
+class _RecordingAsyncModels:
+
+    def __init__(self, owner: RecordingClient, models: Any):
+        self._owner = owner
+        self._models = models
+
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._models, name)
+
+
+    async def generate_content(self, model: str, contents: Any, config: Any = None) -> Any:
+        response = await self._models.generate_content(model=model, contents=contents, config=config)
+        self._owner.record(model, contents, config, response.text)
+        return response
+
+
+class _RecordingAio:
+
+    def __init__(self, owner: RecordingClient, aio: Any):
+        self._aio = aio
+        self.models = _RecordingAsyncModels(owner, aio.models)
+
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._aio, name)
@@ -0,0 +1,163 @@
+import math
+import struct
+from typing import Any, Dict, Optional, Tuple
+
+import fitz  # PyMuPDF
+
+
+# Resolucao nativa do PDF (pontos por polegada) usada pelo get_pixmap padrao
+BASE_DPI = 72
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+JPEG_SIGNATURE = b"\xff\xd8\xff"
+
+
+#----------------------------------------------------------------
+# Identifica o MIME type de uma imagem pelos bytes iniciais
+#----------------------------------------------------------------
+def detect_image_mime_type(data: bytes, default: str = "image/png") -> str:
+    if data.startswith(JPEG_SIGNATURE):
+        return "image/jpeg"
+    if data.startswith(PNG_SIGNATURE):
+        return "image/png"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    return default
+
+
+
+
+#----------------------------------------------------------------
+# Le largura e altura de uma imagem PNG/JPEG pelo cabecalho
+#----------------------------------------------------------------
+# Retorna: (largura, altura) ou None se o formato nao for reconhecido
+#----------------------------------------------------------------
+def get_image_size(data: bytes) -> Optional[Tuple[int, int]]:
+    if data.startswith(PNG_SIGNATURE) and len(data) >= 24:
+        width, height = struct.unpack(">II", data[16:24])
+        return width, height
+
+    if data.startswith(JPEG_SIGNATURE):
+        index = 2
+        while index + 9 < len(data):
+            if data[index] != 0xFF:
+                index += 1
+                continue
+            marker = data[index + 1]
+            # marcadores SOF0..SOF15 (exceto DHT, JPG e DAC) trazem as dimensoes
+            if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+                height, width = struct.unpack(">HH", data[index + 5:index + 9])
+                return width, height
+            segment_length = struct.unpack(">H", data[index + 2:index + 4])[0]
+            index += 2 + segment_length
+
+    return None
+
+
+
+
+#================================================================
+# CLASSE: PageImageEncoder
+#----------------------------------------------------------------
+# Rasteriza paginas de PDF para envio multimodal a IA.
+#
+# Controla a resolucao (dpi), a conversao para tons de cinza, a
+# qualidade do JPEG e um limite para a maior dimensao da imagem.
+# Com jpeg_quality <= 0 a pagina e gravada em PNG (sem perdas).
+#
+# As configuracoes sao um dicionario simples (settings) para que o
+# codificador possa ser recriado nos processos do pool de ingestao
+# e para compor a chave do cache de paginas.
+#================================================================
+
+class PageImageEncoder:
+
+    def __init__(self, dpi: int = 110, grayscale: bool = True, jpeg_quality: int = 70, max_dimension: int = 1600, report_reduction: bool = True):
+        self.dpi = max(1, int(dpi))
+        self.grayscale = bool(grayscale)
+        self.jpeg_quality = max(0, min(100, int(jpeg_quality)))
+        self.max_dimension = max(0, int(max_dimension))
+        self.report_reduction = report_reduction
+
+
+
+
+    @classmethod
+    def from_settings(cls, settings: Optional[Dict[str, Any]]) -> "PageImageEncoder":
+        return cls(**(settings or {}))
+
+
+    @property
+    def settings(self) -> Dict[str, Any]:
+        return {
+            "dpi": self.dpi,
+            "grayscale": self.grayscale,
+            "jpeg_quality": self.jpeg_quality,
+            "max_dimension": self.max_dimension,
+        }
+
+
+    @property
+    def image_format(self) -> str:
+        return "jpg" if self.jpeg_quality > 0 else "png"
+
+
+    @property
+    def mime_type(self) -> str:
+        return "image/jpeg" if self.jpeg_quality > 0 else "image/png"
+
+
+
+
+    #----------------------------------------------------------------
+    # Codifica uma pagina de PDF
+    #----------------------------------------------------------------
+    # Retorna: {"content", "mime_type", "width", "height",
+    #           "original_bytes", "encoded_bytes"}
+    # original_bytes e o tamanho estimado do bitmap RGB na resolucao
+    # padrao (72 dpi, sem compressao), calculado por page.rect sem
+    # rasterizar a pagina de novo; None se report_reduction=False
+    #----------------------------------------------------------------
+    def encode_page(self, page: "fitz.Page") -> Dict[str, Any]:
+        zoom = self._get_zoom(page.rect.width, page.rect.height)
+        colorspace = fitz.csGRAY if self.grayscale else fitz.csRGB
+        pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), colorspace=colorspace, alpha=False)
+
+        if self.jpeg_quality > 0:
+            content = pix.tobytes("jpeg", jpg_quality=self.jpeg_quality)
+        else:
+            content = pix.tobytes("png")
+
+        original_bytes = self._estimate_base_bytes(page.rect.width, page.rect.height) if self.report_reduction else None
+
+        return {
+            "content": content,
+            "mime_type": self.mime_type,
+            "width": pix.width,
+            "height": pix.height,
+            "original_bytes": original_bytes,
+            "encoded_bytes": len(content),
+        }
+
+
+
+
+    #----------------------------------------------------------------
+    # Bytes de um bitmap RGB da pagina a 72 dpi (get_pixmap padrao)
+    #----------------------------------------------------------------
+    @staticmethod
+    def _estimate_base_bytes(width_pt: float, height_pt: float) -> int:
+        return math.ceil(width_pt) * math.ceil(height_pt) * 3
+
+
+
+
+    #----------------------------------------------------------------
+    # Escala da pagina: dpi escolhido, limitado pela maior dimensao
+    #----------------------------------------------------------------
+    def _get_zoom(self, width_pt: float, height_pt: float) -> float:
+        zoom = self.dpi / BASE_DPI
+        longest = max(width_pt, height_pt) * zoom
+        if self.max_dimension and longest > self.max_dimension:
+            zoom *= self.max_dimension / longest
+        return zoom
@@ -1,4 +1,5 @@
 from pathlib import Path
+import os
 import logging
 import sys
 from logging.handlers import RotatingFileHandler
@@ -8,13 +9,19 @@ from logging.handlers import RotatingFileHandler
 #---------------------------------------------------------------------------------
 # Uma classe wrapper para o módulo logging do Python.
 # Configura um logger para exibir logs no console e, opcionalmente, em um arquivo.
+# A variavel de ambiente JACA_LOG_FILE troca o arquivo (app/log.txt por padrao);
+# vazia, desativa o log em arquivo.
 #=================================================================================
     
 class Logger:
     
     def __init__(self, name: str):
         self.name = name
-        self.logfile = Path(__file__).parent.parent / "log.txt" 
+        override = os.environ.get("JACA_LOG_FILE")
+        if override is None:
+            self.logfile = Path(__file__).parent.parent / "log.txt"
+        else:
+            self.logfile = Path(override) if override else None
         self.logger = logging.getLogger(name)
         self.logger.setLevel(logging.INFO)
 
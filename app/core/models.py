@@ -1,6 +1,82 @@
-from pydantic import BaseModel
-from typing import List, Dict, Optional
+from pydantic import BaseModel, PrivateAttr, create_model, model_serializer
+from typing import Any, Callable, Iterable, List, Dict, Optional, Set, Union, Literal, Type
 import json
+import threading
+
+
+# Trava de carga de cada modelo. Copias do modelo (model_copy,
+# deepcopy, pickle) ganham uma trava nova em vez de falhar.
+class _LoadLock:
+    def __init__(self):
+        self._lock = threading.RLock()
+
+    def __enter__(self):
+        return self._lock.__enter__()
+
+    def __exit__(self, *exc_info):
+        return self._lock.__exit__(*exc_info)
+
+    def __copy__(self):
+        return _LoadLock()
+
+    def __deepcopy__(self, memo):
+        return _LoadLock()
+
+    def __reduce__(self):
+        return (_LoadLock, ())
+
+
+# Modelo com campos carregados sob demanda: os campos adiados com
+# defer() saem do __dict__ e sao lidos por loader(nome) no primeiro
+# acesso (via __getattr__, entao os demais campos nao passam por
+# nenhum gancho). Atribuir um valor antes do acesso cancela a carga.
+# model_dump/model_dump_json (inclusive de um modelo que contenha
+# este) carregam antes os campos pendentes, para nunca gravar os
+# valores padrao no lugar dos dados reais.
+class LazyFieldsModel(BaseModel):
+    _loader: Optional[Callable[[str], Any]] = PrivateAttr(default=None)
+    _pending: Dict[str, Any] = PrivateAttr(default_factory=dict)
+    _load_lock: _LoadLock = PrivateAttr(default_factory=_LoadLock)
+
+    def defer(self, fields: Iterable[str], loader: Callable[[str], Any]) -> None:
+        with self._load_lock:
+            self._loader = loader
+            # valor atual guardado para o caso de o loader nao achar nada
+            self._pending = {name: self.__dict__.pop(name, None) for name in fields}
+
+    def is_loaded(self, name: str) -> bool:
+        return name not in self._pending
+
+    def load_pending(self) -> None:
+        for name in list(self._pending):
+            self._load(name)
+
+    def _load(self, name: str) -> None:
+        # o loader roda fora da trava (ele pode pegar a trava do projeto)
+        value = self._loader(name)
+        with self._load_lock:
+            if name in self._pending:
+                fallback = self._pending.pop(name)
+                BaseModel.__setattr__(self, name, fallback if value is None else value)
+
+    def __getattr__(self, name: str):
+        private = self.__pydantic_private__
+        if private and name in private.get('_pending', ()):
+            self._load(name)
+            return self.__dict__[name]
+        return super().__getattr__(name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        if name[0] != '_' and name in self._pending:
+            with self._load_lock:
+                self._pending.pop(name, None)
+        super().__setattr__(name, value)
+
+    @model_serializer(mode="wrap")
+    def _serialize_loaded(self, handler):
+        self.load_pending()
+        return handler(self)
+
 
 # Estrutura para dados extraídos com campos estruturados
 class StructuredExtraction(BaseModel):  
@@ -13,7 +89,7 @@ class StructuredExtraction(BaseModel):
     reviewed: bool = False
 
 # Container para todos os dados extraídos do projeto
-class ExtractedDataType(BaseModel):
+class ExtractedDataType(LazyFieldsModel):
     estatuto: Optional[StructuredExtraction] = None
     ata: Optional[StructuredExtraction] = None
     identificacao: Optional[Dict] = None  # Estrutura diferente para identificações
@@ -21,15 +97,16 @@ class ExtractedDataType(BaseModel):
     programacao: Optional[StructuredExtraction] = None
 
 # Container para os dados do projeto
-class ProjectState(BaseModel):
+class ProjectState(LazyFieldsModel):
     name: str
     path: Optional[str] = None 
     base_files: Dict = {}
     extracted_data: Optional[ExtractedDataType] = None
-    criteria_results: Dict = {}
+    criteria_results: Union[Dict, List[Dict]] = {}
     current_step: int = 1 
     created_at: str
     last_modified: str
+    version: int = 0  # incrementada a cada save_project; versoes antigas sao recusadas
     
     def save_to_file(self, path: str):
         with open(path, 'w') as f:
@@ -39,3 +116,46 @@ class ProjectState(BaseModel):
     def load_from_file(cls, path: str):
         with open(path, 'r') as f:
             return cls(**json.load(f))
+
+
+
+# ==========================================================================
+# Schemas de resposta da IA
+# Enviados como response_schema nas chamadas JSON e usados para validar
+# a resposta localmente (ver PromptManager e _GeminiClient).
+# ==========================================================================
+
+CriteriaStatus = Literal["Conforme", "Não Conforme", "Inconclusivo"]
+
+# Resposta da verificacao de um criterio
+class CriteriaCheckResponse(BaseModel):
+    analise: str = ""
+    status: CriteriaStatus
+    justificativa: str
+
+# Item da resposta da verificacao em lote
+class BatchCriteriaCheckItem(BaseModel):
+    id: str
+    status: CriteriaStatus
+    justificativa: str
+
+# Extracao de dirigentes eleitos da ata
+class Dirigente(BaseModel):
+    nome: str
+    cargo: str
+
+class AtaDirectorsResponse(BaseModel):
+    lista_dirigentes_eleitos: List[Dirigente] = []
+
+# Extracao de documentos de identificacao
+class PessoaIdentificada(BaseModel):
+    nome: str
+    cpf: str = ""
+    rg: str = ""
+
+class IdDocumentsResponse(BaseModel):
+    lista_pessoas_identificadas: List[PessoaIdentificada] = []
+
+# Extracao secundaria: um campo de texto (ou null) por chave pedida
+def build_fields_response_model(fields: List[str]) -> Type[BaseModel]:
+    return create_model("SecondaryExtractionResponse", **{field: (Optional[str], None) for field in fields})
@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 from typing import List, Dict
 
@@ -24,9 +25,14 @@ class PathManager:
 
     #-------------------------------------------------------------------------
     # obtem o diretorio para os dados da aplicacao "data" (/JACA/app/data)
+    # A variavel de ambiente JACA_DATA_DIR aponta para outro diretorio (ex.:
+    # projetos sinteticos dos benchmarks, sem tocar nos dados reais)
     #-------------------------------------------------------------------------
     @staticmethod
     def get_data_dir() -> Path:
+        override = os.environ.get("JACA_DATA_DIR")
+        if override:
+            return Path(override)
         return PathManager.get_app_path() / "data"
 
 
@@ -100,6 +106,24 @@ class PathManager:
 
 
 
+    #--------------------------------------------------------------------------------------------------------------------
+    # obtem o cache de paginas lidas dos arquivos de um projeto ".../projects/<nome do projeto>/extracted/ingestion_cache"
+    #--------------------------------------------------------------------------------------------------------------------
+    @staticmethod
+    def get_project_ingestion_cache_dir(project_name: str) -> Path:
+        return PathManager.get_project_extracted_dir(project_name) / "ingestion_cache"
+
+
+
+    #--------------------------------------------------------------------------------------------------------------
+    # obtem o estado do pipeline de extracao de um projeto ".../projects/<nome do projeto>/extracted/pipeline_state.json"
+    #--------------------------------------------------------------------------------------------------------------
+    @staticmethod
+    def get_pipeline_state_path(project_name: str) -> Path:
+        return PathManager.get_project_extracted_dir(project_name) / "pipeline_state.json"
+
+
+
     #--------------------------------------------------------------------------------------------------------------
     # obtem o diretorio dos criterios avalidados de um projeto especifico ".../projects/<nome do projeto>/criteria"
     #--------------------------------------------------------------------------------------------------------------
@@ -162,6 +186,27 @@ class PathManager:
 
 
 
+    #---------------------------------------------------------------------------
+    # obtem o banco SQLite dos projetos "JACA/app/data/projects.sqlite3"
+    #---------------------------------------------------------------------------
+    @staticmethod
+    def get_project_store_path() -> Path:
+        return PathManager.get_data_dir() / "projects.sqlite3"
+
+
+
+
+
+    #---------------------------------------------------------------------------
+    # obtem o arquivo de trava de um projeto "JACA/app/data/locks/<projeto>.lock"
+    # (fora da pasta do projeto para sobreviver a exclusao)
+    #---------------------------------------------------------------------------
+    @staticmethod
+    def get_project_lock_path(project_name: str) -> Path:
+        return PathManager.get_data_dir() / "locks" / f"{PathManager.get_safe_name(project_name)}.lock"
+
+
+
 
     #--------------------------------------------------------------------------------
     # obtem configuracoes gerais do aplicativo "JACA/app/data/report_config.json"
@@ -221,6 +266,28 @@ class PathManager:
 
 
 
+    #---------------------------------------------------------
+    # obtem diretorio de cache em "JACA/app/data/cache"
+    #---------------------------------------------------------
+    @staticmethod
+    def get_cache_dir() -> Path:
+        return PathManager.get_data_dir() / "cache"
+
+
+
+
+    #-------------------------------------------------------------------------
+    # obtem diretorio do cache de respostas da IA "JACA/app/data/cache/responses"
+    #-------------------------------------------------------------------------
+    @staticmethod
+    def get_response_cache_dir() -> Path:
+        return PathManager.get_cache_dir() / "responses"
+
+
+
+
+
+
     #-----------------------------------------------
     # obtem o caminho para um arquivo temporario
     #-----------------------------------------------
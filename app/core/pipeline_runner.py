@@ -0,0 +1,215 @@
+import json
+import time
+from pathlib import Path
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable, Dict, List, Optional
+
+from app.core.logger import Logger
+
+
+# Estados de um no do pipeline
+NODE_PENDING = "pending"
+NODE_RUNNING = "running"
+NODE_DONE = "done"
+NODE_RESUMED = "resumed"
+NODE_FAILED = "failed"
+NODE_SKIPPED = "skipped"
+
+
+#================================================================
+# CLASSE: PipelineNode
+#----------------------------------------------------------------
+# Uma etapa do pipeline. action() retorna True em caso de sucesso.
+# fingerprint identifica as entradas da etapa (ex.: arquivos da
+# categoria): uma etapa concluida so e reaproveitada na retomada se
+# o fingerprint nao mudou.
+#================================================================
+
+class PipelineNode:
+
+    def __init__(self, node_id: str, action: Callable[[], bool], depends_on: Optional[List[str]] = None, fingerprint: str = ""):
+        self.id = node_id
+        self.action = action
+        self.depends_on = list(depends_on or [])
+        self.fingerprint = fingerprint
+
+
+
+
+#================================================================
+# CLASSE: PipelineRunner
+#----------------------------------------------------------------
+# Executa um grafo de dependencias (DAG) de PipelineNode.
+#
+#   - Etapas sem dependencias pendentes rodam em paralelo, no
+#     maximo max_workers por vez
+#   - O estado de cada etapa e gravado em state_path a cada mudanca;
+#     uma nova execucao retoma do ponto em que parou, pulando as
+#     etapas concluidas (se as entradas e as dependencias tambem
+#     nao mudaram)
+#   - Dependentes de uma etapa que falhou sao marcados como skipped
+#
+# on_status(node_id, status, info) e chamado na thread de quem
+# chamou run() (seguro para atualizar a UI do Streamlit).
+#================================================================
+
+class PipelineRunner:
+
+    def __init__(
+            self,
+            max_workers: int = 2,
+            state_path: Optional[Path] = None,
+            on_status: Optional[Callable[[str, str, Dict], None]] = None,
+            poll_seconds: float = 0.5
+        ):
+        self.logger = Logger(name="PipelineRunner")
+        self.max_workers = max(1, int(max_workers))
+        self.state_path = Path(state_path) if state_path else None
+        self.on_status = on_status
+        self.poll_seconds = poll_seconds
+        self.state: Dict[str, Dict] = {}
+
+
+
+
+    #----------------------------------------------------------------
+    # Executa o grafo
+    #----------------------------------------------------------------
+    # resume: reaproveita as etapas concluidas na execucao anterior
+    # Retorna: {node_id: status final}
+    #----------------------------------------------------------------
+    def run(self, nodes: List[PipelineNode], resume: bool = True) -> Dict[str, str]:
+        graph = {node.id: node for node in nodes}
+        missing = [dep for node in nodes for dep in node.depends_on if dep not in graph]
+        if missing:
+            raise ValueError(f"Dependências inexistentes no pipeline: {missing}")
+
+        stored = self._load_state()
+        previous = stored if resume else {}
+        # etapas fora deste grafo (ex.: outras categorias) permanecem no estado gravado
+        self.state = dict(stored)
+        statuses: Dict[str, str] = {node_id: NODE_PENDING for node_id in graph}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            running = {}
+            while True:
+                ready = self._ready_nodes(graph, statuses)
+                if not ready and not running:
+                    if any(status == NODE_PENDING for status in statuses.values()):
+                        raise ValueError("O pipeline contém dependências circulares.")
+                    break
+
+                for node in ready:
+                    if any(statuses[dep] in (NODE_FAILED, NODE_SKIPPED) for dep in node.depends_on):
+                        self._set_status(statuses, node, NODE_SKIPPED, {"reason": "dependência falhou"})
+                    elif self._can_resume(node, previous, statuses):
+                        self._set_status(statuses, node, NODE_RESUMED, {"finished_at": previous[node.id].get("finished_at")})
+                    else:
+                        self._set_status(statuses, node, NODE_RUNNING)
+                        running[pool.submit(self._run_node, node)] = node
+
+                if not running:
+                    # etapas retomadas/puladas podem ter liberado novas etapas
+                    continue
+
+                done, _ = wait(running, timeout=self.poll_seconds, return_when=FIRST_COMPLETED)
+                for future in done:
+                    node = running.pop(future)
+                    success, elapsed, error = future.result()
+                    info = {"elapsed_seconds": round(elapsed, 2)}
+                    if success:
+                        self._set_status(statuses, node, NODE_DONE, info)
+                    else:
+                        info["error"] = error
+                        self._set_status(statuses, node, NODE_FAILED, info)
+
+        failed = [node_id for node_id, status in statuses.items() if status == NODE_FAILED]
+        if failed:
+            self.logger.warning(f"Pipeline concluído com falhas em: {failed}. Uma nova execução retoma destas etapas.")
+        else:
+            self.logger.info(f"Pipeline concluído: {len(statuses)} etapa(s).")
+        return statuses
+
+
+
+
+    #----------------------------------------------------------------
+    # Nos pendentes cujas dependencias ja terminaram
+    #----------------------------------------------------------------
+    @staticmethod
+    def _ready_nodes(graph: Dict[str, PipelineNode], statuses: Dict[str, str]) -> List[PipelineNode]:
+        finished = (NODE_DONE, NODE_RESUMED, NODE_FAILED, NODE_SKIPPED)
+        return [
+            node for node_id, node in graph.items()
+            if statuses[node_id] == NODE_PENDING and all(statuses[dep] in finished for dep in node.depends_on)
+        ]
+
+
+    # So retoma se todas as dependencias tambem foram retomadas (nada a montante mudou)
+    @staticmethod
+    def _can_resume(node: PipelineNode, previous: Dict[str, Dict], statuses: Dict[str, str]) -> bool:
+        entry = previous.get(node.id)
+        if not entry or entry.get("status") != NODE_DONE or entry.get("fingerprint") != node.fingerprint:
+            return False
+        return all(statuses[dep] == NODE_RESUMED for dep in node.depends_on)
+
+
+    def _run_node(self, node: PipelineNode):
+        start = time.monotonic()
+        try:
+            success = bool(node.action())
+            return success, time.monotonic() - start, None if success else "a etapa retornou falha"
+        except Exception as e:
+            self.logger.error(f"Erro na etapa '{node.id}' do pipeline: {e}", exc_info=True)
+            return False, time.monotonic() - start, str(e)
+
+
+
+
+    #----------------------------------------------------------------
+    # Atualiza, grava e informa o estado de um no
+    #----------------------------------------------------------------
+    def _set_status(self, statuses: Dict[str, str], node: PipelineNode, status: str, info: Optional[Dict] = None) -> None:
+        statuses[node.id] = status
+        info = info or {}
+
+        # etapas retomadas continuam registradas como concluidas
+        saved_status = NODE_DONE if status == NODE_RESUMED else status
+        entry = {"status": saved_status, "fingerprint": node.fingerprint}
+        if status in (NODE_DONE, NODE_RESUMED):
+            entry["finished_at"] = info.get("finished_at") or datetime.now().isoformat()
+        if info.get("error"):
+            entry["error"] = info["error"]
+        self.state[node.id] = entry
+        self._save_state()
+
+        self.logger.info(f"Etapa '{node.id}': {status}.")
+        if self.on_status is None:
+            return
+        try:
+            self.on_status(node.id, status, info)
+        except Exception as e:
+            self.logger.warning(f"Falha ao informar o estado da etapa '{node.id}': {e}")
+
+
+    def _load_state(self) -> Dict[str, Dict]:
+        if not self.state_path or not self.state_path.exists():
+            return {}
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                return json.load(f).get("nodes", {})
+        except (json.JSONDecodeError, OSError) as e:
+            self.logger.warning(f"Estado do pipeline ilegível em '{self.state_path}': {e}. Execução completa.")
+            return {}
+
+
+    def _save_state(self) -> None:
+        if not self.state_path:
+            return
+        try:
+            self.state_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.state_path, "w", encoding="utf-8") as f:
+                json.dump({"updated_at": datetime.now().isoformat(), "nodes": self.state}, f, indent=2, ensure_ascii=False)
+        except OSError as e:
+            self.logger.error(f"Erro ao gravar o estado do pipeline em '{self.state_path}': {e}")
@@ -0,0 +1,116 @@
+import copy
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from app.core.logger import Logger
+
+
+#================================================================
+# CLASSE: ProjectCache
+#----------------------------------------------------------------
+# Cache em memoria, compartilhado pelo processo, dos arquivos de
+# projeto ja lidos e validados (project.json, extracted/*.json,
+# criteria/results.json).
+#
+# Cada entrada guarda a assinatura do arquivo (mtime em ns e
+# tamanho) no momento da leitura. Antes de devolver uma entrada a
+# assinatura e conferida, entao escritas feitas por fora do
+# ProjectCRUDService (ou por outro processo) invalidam o cache
+# sozinhas. Quem recebe o valor ganha uma copia profunda e pode
+# altera-la sem afetar o cache.
+#================================================================
+
+class ProjectCache:
+
+    def __init__(self):
+        self.logger = Logger(name="ProjectCache")
+        self._lock = threading.RLock()
+        self._entries: Dict[str, Tuple[Tuple[int, int], Any]] = {}
+        self.hits = 0
+        self.misses = 0
+
+
+
+
+    #----------------------------------------------------------------
+    # Le um arquivo pelo cache
+    #----------------------------------------------------------------
+    # parser(path) le e valida o arquivo; so e chamado quando o
+    # arquivo mudou desde a ultima leitura.
+    # Retorna: copia do valor, ou None se o arquivo nao existe
+    #----------------------------------------------------------------
+    def load(self, path: Path, parser: Callable[[Path], Any]) -> Any:
+        key = str(path)
+        signature = self._signature(path)
+        if signature is None:
+            self.discard(path)
+            return None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] == signature:
+                self.hits += 1
+                return copy.deepcopy(entry[1])
+            self.misses += 1
+
+        value = parser(path)
+        with self._lock:
+            self._entries[key] = (signature, value)
+        return copy.deepcopy(value)
+
+
+
+
+    #----------------------------------------------------------------
+    # Registra o valor que acabou de ser gravado em path
+    #----------------------------------------------------------------
+    def store(self, path: Path, value: Any) -> None:
+        signature = self._signature(path)
+        with self._lock:
+            if signature is None:
+                self._entries.pop(str(path), None)
+            else:
+                self._entries[str(path)] = (signature, copy.deepcopy(value))
+
+
+    def discard(self, path: Path) -> None:
+        with self._lock:
+            self._entries.pop(str(path), None)
+
+
+    # Descarta todas as entradas de um diretorio (ex.: projeto deletado)
+    def invalidate_dir(self, directory: Path) -> None:
+        prefix = str(directory)
+        with self._lock:
+            for key in [key for key in self._entries if key == prefix or key.startswith(prefix + "/") or key.startswith(prefix + "\\")]:
+                del self._entries[key]
+
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+
+
+
+    @staticmethod
+    def _signature(path: Path) -> Optional[Tuple[int, int]]:
+        try:
+            stat = Path(path).stat()
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+
+
+
+# Instancia unica: todos os ProjectCRUDService compartilham o cache
+project_cache = ProjectCache()
@@ -140,19 +140,20 @@ class ProjectConfigurationService:
         self.logger.info(f"Atualizando configurações do projeto '{project_name}'.")
         
         try:
-            project_data = self.crud_service.load_project(project_name)
-            if not project_data:
-                self.logger.error(f"Projeto '{project_name}' não encontrado para atualização de configurações.")
-                return False
-            
-            # Atualiza as configurações
-            if not hasattr(project_data, 'settings'):
-                project_data.settings = {}
-            
-            project_data.settings.update(settings)
-            project_data.last_modified = datetime.now().isoformat()
-            
-            return self.crud_service.save_project(project_data)
+            with self.crud_service.lock_project(project_name):
+                project_data = self.crud_service.load_project(project_name)
+                if not project_data:
+                    self.logger.error(f"Projeto '{project_name}' não encontrado para atualização de configurações.")
+                    return False
+                
+                # Atualiza as configurações
+                if not hasattr(project_data, 'settings'):
+                    project_data.settings = {}
+                
+                project_data.settings.update(settings)
+                project_data.last_modified = datetime.now().isoformat()
+                
+                return self.crud_service.save_project(project_data)
             
         except Exception as e:
             self.logger.error(f"Erro ao atualizar configurações do projeto '{project_name}': {e}")
@@ -1,13 +1,22 @@
 import json
 import shutil
 from datetime import datetime
-from typing import List, Optional, Dict
+from typing import Any, Iterator, List, Optional, Dict
 from pathlib import Path
+from contextlib import contextmanager
 
+from app.core.config import settings
 from app.core.models import ProjectState, ExtractedDataType
 from app.core.path_manager import PathManager
+from app.core.project_cache import project_cache
+from app.core.project_locks import project_locks
+from app.core.sqlite_project_store import SQLiteProjectStore
+from app.core.write_behind import project_writer
 from app.core.logger import Logger
 
+
+CATEGORIES = ["estatuto", "ata", "identificacao", "licenca", "programacao"]
+
 #================================================================
 # CLASSE: ProjectCRUDService
 #----------------------------------------------------------------
@@ -20,12 +29,36 @@ from app.core.logger import Logger
 #   - deletar projetos
 #   - listagem de projeto
 #
+# As leituras passam pelo ProjectCache (compartilhado entre as
+# instancias): arquivos que nao mudaram desde a ultima leitura nao
+# sao lidos nem validados de novo.
+#
+# As gravacoes passam pelo WriteBehindWriter: salvamentos seguidos
+# do mesmo arquivo viram uma so gravacao em segundo plano, com troca
+# atomica (os.replace). As leituras enxergam o que ainda esta na
+# fila; flush() grava na hora (ex.: antes de exportar).
+#
+# Concorrencia: leituras e gravacoes pegam a trava do projeto
+# (ProjectLocks, compartilhada pelas sessoes do processo e, com
+# project_file_locks, entre processos). Ciclos ler-alterar-gravar
+# de quem chama usam lock_project(). project.json guarda um
+# contador de versao, incrementado a cada gravacao: save_project
+# com um ProjectState de versao antiga e recusado (retorna False).
+#
+# Com project_store = "sqlite" os dados ficam no SQLiteProjectStore
+# em vez de project.json, extracted/*.json e criteria/results.json;
+# os arquivos enviados continuam na pasta do projeto.
+#
 #================================================================
 
 class ProjectCRUDService:
     
     def __init__(self):
         self.logger = Logger(name="ProjectCRUDService")
+        self.cache = project_cache
+        self.writer = project_writer
+        self.locks = project_locks
+        self.store = SQLiteProjectStore() if settings.project_store == "sqlite" else None
         
         self.projects_dir = PathManager.get_project_dir()
         if not self.projects_dir.is_dir():
@@ -47,6 +80,11 @@ class ProjectCRUDService:
             self.logger.error(f"Nome de projeto invalido: {project_name}")
             return False
         
+        with self.lock_project(project_name):
+            return self._create_project(project_name)
+    
+    
+    def _create_project(self, project_name: str) -> bool:
         # verifica se diretorio do projeto ja existe
         project_path = PathManager.get_project_path(project_name)
         if project_path.exists():
@@ -78,8 +116,12 @@ class ProjectCRUDService:
             )
     
             # Salva metadados do projeto
-            project_json_path = PathManager.get_project_json_path(project_name)
-            project.save_to_file(str(project_json_path))
+            if self.store:
+                if not self.store.save_project(self._metadata(project)):
+                    raise RuntimeError("não foi possível gravar o projeto no banco")
+            else:
+                project_json_path = PathManager.get_project_json_path(project_name)
+                project.save_to_file(str(project_json_path))
             
             self.logger.info(f"Projeto '{project_name}' criado com sucesso.")
             return True
@@ -99,33 +141,31 @@ class ProjectCRUDService:
     #----------------------------------------------------------------
     # Carrega projeto com estrutura de arquivos
     #----------------------------------------------------------------
+    # Le apenas o project.json: extracted_data.<categoria> e
+    # criteria_results sao carregados no primeiro acesso
+    #----------------------------------------------------------------
     def load_project(self, project_name: str) -> Optional[ProjectState]:
         
-        project_json_path = PathManager.get_project_json_path(project_name)
+        if self.store:
+            with self.locks.read(project_name):
+                return self._load_project_from_store(project_name)
         
-        if not project_json_path.exists():
-            self.logger.error(f"Project.json not found for project: {project_name}")
-            return None
+        project_json_path = PathManager.get_project_json_path(project_name)
         
         try:
-            # Load base project metadata
-            project = ProjectState.load_from_file(str(project_json_path))
-            
-            # Load extracted data for each category
-            extracted_dir = PathManager.get_project_extracted_dir(project_name)
-            for category in ["estatuto", "ata", "identificacao", "licenca", "programacao"]:
-                extracted_file = extracted_dir / f"{category}.json"
-                
-                if extracted_file.exists():
-                    with open(extracted_file, 'r', encoding='utf-8') as f:
-                        extracted_data = json.load(f)
-                        setattr(project.extracted_data, category, extracted_data)
+            # Load base project metadata (a versao na fila de gravacao, se houver)
+            with self.locks.read(project_name):
+                project = self._read_project_json(project_json_path)
+            if project is None:
+                self.logger.error(f"Project.json not found for project: {project_name}")
+                return None
             
-            # Load criteria results if they exist
-            criteria_file = PathManager.get_criteria_results_path(project_name)
-            if criteria_file.exists():
-                with open(criteria_file, 'r', encoding='utf-8') as f:
-                    project.criteria_results = json.load(f)
+            # Dados extraidos e resultados sao lidos so no primeiro acesso
+            # (sob a trava de leitura do projeto, ver load_extraction)
+            if project.extracted_data is None:
+                project.extracted_data = ExtractedDataType()
+            project.extracted_data.defer(CATEGORIES, lambda category: self.load_extraction(project_name, category))
+            project.defer(['criteria_results'], lambda _: self.load_criteria_results(project_name))
             
             return project
             
@@ -136,50 +176,115 @@ class ProjectCRUDService:
     
 
 
+    def _load_project_from_store(self, project_name: str) -> Optional[ProjectState]:
+        metadata = self.store.load_project_metadata(project_name)
+        if metadata is None:
+            self.logger.error(f"Projeto não encontrado no banco: {project_name}")
+            return None
+        
+        project = ProjectState(**metadata, extracted_data=ExtractedDataType())
+        project.extracted_data.defer(CATEGORIES, lambda category: self.load_extraction(project_name, category))
+        project.defer(['criteria_results'], lambda _: self.load_criteria_results(project_name))
+        return project
+
+
+    # project.json mais recente: o da fila de gravacao ou o do disco (pelo cache)
+    def _read_project_json(self, path: Path) -> Optional[ProjectState]:
+        pending, project = self.writer.lookup(path)
+        if pending:
+            return project
+        return self.cache.load(path, lambda path: ProjectState.load_from_file(str(path)))
+
+
+    # Carga sob demanda: um arquivo ilegivel e tratado como ausente
+    def _load_deferred(self, path: Path):
+        pending, data = self.writer.lookup(path)
+        if pending:
+            return data
+        try:
+            return self.cache.load(path, self._read_json)
+        except Exception as e:
+            self.logger.error(f"Erro ao ler '{path}': {e}", exc_info=True)
+            return None
+
+
+    @staticmethod
+    def _read_json(path: Path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    
+    
+
+
     #----------------------------------------------------------------
     # Salva Projeto e dados separadamente
     #----------------------------------------------------------------
+    # Recusa (retorna False) se os metadados foram gravados depois que
+    # este ProjectState foi carregado: recarregue e aplique de novo.
+    # So save_project incrementa a versao; gravacoes de extracoes e
+    # resultados (save_extraction, streaming parcial...) nao mexem nela.
+    # Em caso de sucesso project.version passa a ser a nova versao.
+    #----------------------------------------------------------------
     def save_project(self, project: ProjectState) -> bool:
-        
-
+        with self.lock_project(project.name):
+            return self._save_project(project)
+    
+    
+    def _save_project(self, project: ProjectState) -> bool:
         try:
+            if not self.store:
+                current = self._read_project_json(PathManager.get_project_json_path(project.name))
+                if current is not None and current.version != project.version:
+                    self.logger.warning(
+                        f"Gravação recusada: o projeto '{project.name}' está na versão {current.version}, "
+                        f"os dados enviados são da versão {project.version}"
+                    )
+                    return False
+            
             # atualiza timestamp
             project.last_modified = datetime.now().isoformat()
+            metadata = self._metadata(project)
+            metadata["version"] = project.version + 1
+            
+            # So regrava o que foi carregado (categorias nunca lidas nao mudaram)
+            extractions = {}
+            for category in CATEGORIES:
+                if project.extracted_data is None or not project.extracted_data.is_loaded(category):
+                    continue
+                extracted_data = getattr(project.extracted_data, category, None)
+                if extracted_data:
+                    extractions[category] = extracted_data
+            
+            criteria_results = None
+            if project.is_loaded('criteria_results') and project.criteria_results:
+                criteria_results = project.criteria_results
+            
+            if self.store:
+                # metadados, extracoes e resultados na mesma transacao (a versao e conferida nela)
+                if not self.store.save_project(metadata, extractions, criteria_results, expected_version=project.version):
+                    return False
+                project.version = metadata["version"]
+                self.logger.info(f"Projeto '{project.name}' salvo com sucesso.")
+                return True
             
             # cria metadados do projeto
-            metadata_project = ProjectState(
-                name=project.name,
-                path=project.path,
-                base_files=project.base_files,
-                extracted_data=ExtractedDataType(),
-                criteria_results={},
-                current_step=project.current_step,
-                created_at=project.created_at,
-                last_modified=project.last_modified
-            )
+            metadata_project = ProjectState(**metadata, extracted_data=ExtractedDataType(), criteria_results={})
             
-            # Salva metadados do projeto
-            project_json_path = PathManager.get_project_json_path(project.name)
-            metadata_project.save_to_file(str(project_json_path))
+            # Salva metadados do projeto (os arquivos entram no mesmo lote de gravacao)
+            if not self._write_json(PathManager.get_project_json_path(project.name), metadata_project):
+                return False
             
             # Save extracted data separately by category
-            extracted_dir = PathManager.get_project_extracted_dir(project.name)
-            for category in ["estatuto", "ata", "identificacao", "licenca", "programacao"]:
-                extracted_data = getattr(project.extracted_data, category, None)
-                
-                if extracted_data:
-                    extracted_file = extracted_dir / f"{category}.json"
-                    with open(extracted_file, 'w', encoding='utf-8') as f:
-                        json.dump(extracted_data, f, indent=2, ensure_ascii=False)
+            for category, extracted_data in extractions.items():
+                if not self._write_json(PathManager.get_extracted_file_path(project.name, category), extracted_data):
+                    return False
             
             # Save criteria results if they exist
-            if project.criteria_results:
-                criteria_file = PathManager.get_criteria_results_path(project.name)
-                criteria_file.parent.mkdir(parents=True, exist_ok=True)
-                
-                with open(criteria_file, 'w', encoding='utf-8') as f:
-                    json.dump(project.criteria_results, f, indent=2, ensure_ascii=False)
+            if criteria_results is not None:
+                if not self._write_json(PathManager.get_criteria_results_path(project.name), criteria_results):
+                    return False
             
+            project.version = metadata["version"]
             self.logger.info(f"Projeto '{project.name}' salvo com sucesso.")
             return True
             
@@ -188,6 +293,119 @@ class ProjectCRUDService:
             return False
     
     
+    @staticmethod
+    def _metadata(project: ProjectState) -> Dict:
+        return {
+            "name": project.name,
+            "path": project.path,
+            "base_files": project.base_files,
+            "current_step": project.current_step,
+            "created_at": project.created_at,
+            "last_modified": project.last_modified,
+            "version": project.version,
+        }
+    
+    
+    # Entrega um arquivo JSON do projeto ao writer (o cache e atualizado
+    # quando o arquivo chega ao disco)
+    def _write_json(self, path: Path, data: Any) -> bool:
+        return self.writer.write(path, data)
+    
+    
+    #----------------------------------------------------------------
+    # Trava de escrita do projeto para ciclos ler-alterar-gravar
+    #----------------------------------------------------------------
+    # Reentrante: os metodos de gravacao chamados dentro dela nao
+    # esperam. Com travas de arquivo a fila do projeto e gravada ao
+    # sair, para que outros processos leiam os dados atuais.
+    #----------------------------------------------------------------
+    @contextmanager
+    def lock_project(self, project_name: str) -> Iterator[None]:
+        before_release = None
+        if self.locks.file_locks and not self.store:
+            before_release = lambda: self.flush(project_name)
+        with self.locks.write(project_name, before_release=before_release):
+            yield
+    
+    
+    #----------------------------------------------------------------
+    # Grava agora o que esta na fila (todos os projetos se None)
+    #----------------------------------------------------------------
+    def flush(self, project_name: Optional[str] = None) -> bool:
+        if self.store:
+            return True
+        directory = PathManager.get_project_path(project_name) if project_name else None
+        return self.writer.flush(directory)
+    
+
+
+
+    #----------------------------------------------------------------
+    # Dados extraidos de uma categoria
+    #----------------------------------------------------------------
+    def load_extraction(self, project_name: str, category: str) -> Optional[Dict]:
+        with self.locks.read(project_name):
+            if self.store:
+                return self.store.load_extraction(project_name, category)
+            return self._load_deferred(PathManager.get_extracted_file_path(project_name, category))
+
+
+    def save_extraction(self, project_name: str, category: str, data: Dict) -> bool:
+        with self.lock_project(project_name):
+            if self.store:
+                return self.store.save_extraction(project_name, category, data)
+            if not self._write_json(PathManager.get_extracted_file_path(project_name, category), data):
+                self.logger.error(f"Erro ao salvar dados de '{category}' do projeto '{project_name}'")
+                return False
+            return True
+
+
+    #----------------------------------------------------------------
+    # Atualizacao parcial dos dados extraidos de uma categoria
+    #----------------------------------------------------------------
+    # values: chaves de primeiro nivel (ex.: consolidated_text)
+    # content_fields: campos a inserir/atualizar
+    # No banco so as linhas envolvidas sao atualizadas.
+    # A leitura e a gravacao acontecem sob a trava do projeto, entao
+    # duas sessoes editando campos diferentes nao perdem alteracoes.
+    # Retorna: False se a categoria ainda nao tem dados
+    #----------------------------------------------------------------
+    def update_extraction(self, project_name: str, category: str, values: Dict, content_fields: Optional[Dict] = None) -> bool:
+        with self.lock_project(project_name):
+            if self.store:
+                return self.store.update_extraction(project_name, category, values, content_fields)
+            
+            data = self.load_extraction(project_name, category)
+            if data is None:
+                return False
+            data.update(values)
+            if content_fields:
+                data.setdefault('content_fields', {}).update(content_fields)
+            return self.save_extraction(project_name, category, data)
+
+
+
+
+    #----------------------------------------------------------------
+    # Resultados da verificacao de criterios
+    #----------------------------------------------------------------
+    def load_criteria_results(self, project_name: str) -> Optional[List[Dict]]:
+        with self.locks.read(project_name):
+            if self.store:
+                return self.store.load_criteria_results(project_name)
+            return self._load_deferred(PathManager.get_criteria_results_path(project_name))
+
+
+    def save_criteria_results(self, project_name: str, results: List[Dict]) -> bool:
+        with self.lock_project(project_name):
+            if self.store:
+                return self.store.save_criteria_results(project_name, results)
+            if not self._write_json(PathManager.get_criteria_results_path(project_name), results):
+                self.logger.error(f"Erro ao salvar resultados de critérios do projeto '{project_name}'")
+                return False
+            return True
+    
+    
 
 
 
@@ -201,6 +419,19 @@ class ProjectCRUDService:
         project_path = PathManager.get_project_path(project_name)
         
         try:
+            with self.locks.write(project_name):
+                return self._delete_project(project_name, project_path)
+        except Exception as e:
+            self.logger.error(f"Erro ao deletar projeto '{project_name}': {e}", exc_info=True)
+            return False
+    
+    
+    def _delete_project(self, project_name: str, project_path: Path) -> bool:
+        try:
+            if self.store and not self.store.delete_project(project_name):
+                return False
+            self.writer.discard(project_path)
+            self.cache.invalidate_dir(project_path)
             if project_path.exists():
                 shutil.rmtree(project_path)
                 self.logger.info(f"Projeto '{project_name}' deletado com sucesso.")
@@ -223,6 +454,9 @@ class ProjectCRUDService:
     #----------------------------------------------------------------
     def list_projects(self) -> List[str]:
         
+        if self.store:
+            return self.store.list_projects()
+        
         projects = []
         self.projects_dir = PathManager.get_project_dir()
         
@@ -257,6 +491,8 @@ class ProjectCRUDService:
     # Verifica se projeto existe
     #----------------------------------------------------------------
     def project_exists(self, project_name: str) -> bool:
+        if self.store:
+            return self.store.project_exists(project_name)
         return PathManager.is_valid_project_structure(project_name)
     
 
@@ -300,8 +536,19 @@ class ProjectCRUDService:
     #----------------------------------------------------------------
     def get_project_metadata(self, project_name: str) -> Optional[Dict]:
         
+        with self.locks.read(project_name):
+            if self.store:
+                return self.store.load_project_metadata(project_name)
+            return self._get_project_metadata(project_name)
+    
+    
+    def _get_project_metadata(self, project_name: str) -> Optional[Dict]:
         project_json_path = PathManager.get_project_json_path(project_name)
         
+        pending, project = self.writer.lookup(project_json_path)
+        if pending:
+            return project.model_dump()
+        
         if not project_json_path.exists():
             return None
         
@@ -1,8 +1,6 @@
-import json
 from typing import List, Dict, Optional, Any
 from datetime import datetime
 
-from app.core.path_manager import PathManager
 from app.core.logger import Logger
 from app.core.project_crud_service import ProjectCRUDService
 from app.core.data_manager import ExtractedDataManager
@@ -48,25 +46,20 @@ class ProjectDataService:
     # Verifica se existem dados extraidos para uma categoria especifica
     #----------------------------------------------------------------
     def has_extraction_for_category(self, project_name: str, category: str) -> bool:
-        extracted_file_path = PathManager.get_extracted_file_path(project_name, category)
-        
-        if not extracted_file_path.exists():
+        data = self.load_structured_extraction(project_name, category)
+        if not data:
             return False
-        
-        try:
-            with open(extracted_file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
 
-            if data.get('consolidated_text', '').strip():
-                return True
-            
-            content_fields = data.get('content_fields', {})
-            return any(value and str(value).strip() for value in content_fields.values())
-
-        except (json.JSONDecodeError, IOError) as e:
-            self.logger.error(f"Erro ao ler arquivo de extração '{extracted_file_path}': {e}")
+        # texto parcial de uma consolidacao em andamento (ou interrompida)
+        if data.get('partial'):
             return False
 
+        if data.get('consolidated_text', '').strip():
+            return True
+        
+        content_fields = data.get('content_fields', {})
+        return any(value and str(value).strip() for value in content_fields.values())
+
     
 
 
@@ -77,30 +70,19 @@ class ProjectDataService:
     # Carrega dados extraidos
     #----------------------------------------------------------------
     def load_structured_extraction(self, project_name: str, category: str) -> Optional[Dict]:
-        extracted_file_path = PathManager.get_extracted_file_path(project_name, category)
-        
-        if not extracted_file_path.exists():
-            return None
-        
-        try:
-            with open(extracted_file_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except (json.JSONDecodeError, IOError) as e:
-            self.logger.error(f"Erro ao carregar extração estruturada de '{extracted_file_path}': {e}")
-            return None
+        return self.crud_service.load_extraction(project_name, category)
     
 
 
 
 
-
     #----------------------------------------------------------------
     # Salva dados extraídos estruturados
     #----------------------------------------------------------------
     def save_structured_extraction(self, project_name: str, category: str, data: Dict) -> bool:
         content_fields = data.get('content_fields', {})
         ignored_fields = data.get('ignored_fields', {})
-        consolidated_text = data.get('main_content', {})
+        consolidated_text = data.get('consolidated_text', '')
 
         final_data_obj = {
             'content_fields': content_fields,
@@ -113,7 +95,7 @@ class ProjectDataService:
         }
 
     
-        return self.extraction_manager.save_dict_to_file(project_name, category, final_data_obj)
+        return self.crud_service.save_extraction(project_name, category, final_data_obj)
 
 
 
@@ -121,28 +103,12 @@ class ProjectDataService:
     # Atualiza um campo específico de extracao
     #----------------------------------------------------------------
     def update_extraction_field(self, project_name: str, category: str, field: str, value: any) -> bool:
-        data = self.load_structured_extraction(project_name, category)
-        if not data:
-            return False
-        
-        try:
-            # Atualiza o campo específico
-            if 'content_fields' not in data:
-                data['content_fields'] = {}
-            
-            data['content_fields'][field] = value
-            data['last_modified'] = datetime.now().isoformat()
-            
-            # Salva de volta
-            extracted_file_path = PathManager.get_extracted_file_path(project_name, category)
-            with open(extracted_file_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
-            
-            return True
-            
-        except Exception as e:
-            self.logger.error(f"Erro ao atualizar campo '{field}' para categoria '{category}': {e}")
-            return False
+        updated = self.crud_service.update_extraction(
+            project_name, category, {'last_modified': datetime.now().isoformat()}, content_fields={field: value}
+        )
+        if not updated:
+            self.logger.error(f"Erro ao atualizar campo '{field}' para categoria '{category}'.")
+        return updated
     
 
 
@@ -166,31 +132,66 @@ class ProjectDataService:
 
 
 
+    #----------------------------------------------------------------
+    # Carrega o texto consolidado de uma categoria
+    #----------------------------------------------------------------
+    def load_extracted_text(self, project_name: str, category: str) -> Optional[str]:
+        data = self.load_structured_extraction(project_name, category)
+        return data.get('consolidated_text', '') if data else None
+
+
+
+
+    #----------------------------------------------------------------
+    # Salva texto consolidado gerado pela IA
+    #----------------------------------------------------------------
+    # partial=True grava o texto recebido ate o momento durante o
+    # streaming; a categoria so conta como extraida no salvamento final
+    #----------------------------------------------------------------
+    def save_extracted_text(self, project_name: str, category: str, text: str, partial: bool = False) -> bool:
+        values = {
+            'consolidated_text': text,
+            'extracted_at': datetime.now().isoformat(),
+            'last_modified': datetime.now().isoformat(),
+            'reviewed': False,
+            'partial': partial,
+        }
+
+        if self.load_structured_extraction(project_name, category) is None:
+            data = self.extraction_manager._create_empty_extraction_data(category)
+            data.update(values)
+            saved = self.crud_service.save_extraction(project_name, category, data)
+        else:
+            saved = self.crud_service.update_extraction(project_name, category, values)
+
+        if not saved:
+            self.logger.error(f"Erro ao salvar texto extraído de '{category}' do projeto '{project_name}'.")
+        elif not partial:
+            self.logger.info(f"Texto extraído para '{category}' do projeto '{project_name}' salvo com sucesso.")
+        return saved
+
+
+
+
     #----------------------------------------------------------------
     # Verifica se projeto tem dados extraidos
     #----------------------------------------------------------------
     def save_edited_text(self, project_name: str, category: str, text: str) -> bool:
-        data = self.load_structured_extraction(project_name, category)
-        if data is None:
+        if self.load_structured_extraction(project_name, category) is None:
             self.logger.warning(f"Tentativa de salvar texto editado para '{category}', mas o arquivo base não existe.")
             return False
 
-        data['consolidated_text'] = text
-        data['last_modified'] = datetime.now().isoformat()
-        data['reviewed'] = True  # Marca como revisado pelo usuário
+        values = {
+            'consolidated_text': text,
+            'last_modified': datetime.now().isoformat(),
+            'reviewed': True,  # Marca como revisado pelo usuário
+        }
+        if not self.crud_service.update_extraction(project_name, category, values):
+            self.logger.error(f"Erro ao salvar texto editado de '{category}' do projeto '{project_name}'.")
+            return False
 
-        extracted_file_path = PathManager.get_extracted_file_path(project_name, category)
-        
-        try:
-            with open(extracted_file_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
-            
-            self.logger.info(f"Texto editado para '{category}' do projeto '{project_name}' salvo com sucesso.")
-            return True
-            
-        except IOError as e:
-            self.logger.error(f"Erro ao salvar texto editado em '{extracted_file_path}': {e}")
-            return False  
+        self.logger.info(f"Texto editado para '{category}' do projeto '{project_name}' salvo com sucesso.")
+        return True
 
 
 
@@ -296,15 +297,13 @@ class ProjectDataService:
     def update_director_list(self, project_name: str, directors: List[Dict]) -> bool:
         self.logger.info(f"Atualizando a lista de dirigentes para o projeto '{project_name}'.")
         
-        project_data = self.crud_service.load_project(project_name)
-        if not project_data or not project_data.extracted_data.ata:
+        updated = self.crud_service.update_extraction(
+            project_name, 'ata', {'last_modified': datetime.now().isoformat()},
+            content_fields={'lista_dirigentes_eleitos': directors}
+        )
+        if not updated:
             self.logger.error("Não foi possível carregar os dados da ata para atualizar a lista de dirigentes.")
-            return False
-
-        # Atualiza a chave específica com a lista fornecida
-        project_data.extracted_data.ata.content_fields['lista_dirigentes_eleitos'] = directors
-        
-        return self.crud_service.save_project(project_data)
+        return updated
     
 
 
@@ -315,9 +314,8 @@ class ProjectDataService:
     # Obtem lista de diretores
     #----------------------------------------------------------------
     def get_director_list(self, project_name: str) -> List[Dict]:
-        project_data = self.crud_service.load_project(project_name)
-        if not project_data or not project_data.extracted_data.ata:
+        data = self.load_structured_extraction(project_name, 'ata')
+        if not data:
             return []
 
-        content_fields = getattr(project_data.extracted_data.ata, 'content_fields', {})
-        return content_fields.get('lista_dirigentes_eleitos', [])
\ No newline at end of file
+        return data.get('content_fields', {}).get('lista_dirigentes_eleitos', [])
\ No newline at end of file
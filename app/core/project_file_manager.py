@@ -29,6 +29,12 @@ class ProjectFileManager:
     # adiciona arquivo ao projeto dentro de sua categoria
     #----------------------------------------------------------------
     def add_pdf_file(self, project_name: str, uploaded_file: Any, category: str) -> bool:
+        # ler-alterar-gravar sob a trava do projeto
+        with self.crud_service.lock_project(project_name):
+            return self._add_pdf_file(project_name, uploaded_file, category)
+
+
+    def _add_pdf_file(self, project_name: str, uploaded_file: Any, category: str) -> bool:
 
         project = self.crud_service.load_project(project_name)
 
@@ -79,6 +85,12 @@ class ProjectFileManager:
     # Remove arquivo do sistema de arquivos do projeto
     #----------------------------------------------------------------
     def remove_pdf_file(self, project_name: str, file_path: str) -> bool:
+        # ler-alterar-gravar sob a trava do projeto
+        with self.crud_service.lock_project(project_name):
+            return self._remove_pdf_file(project_name, file_path)
+
+
+    def _remove_pdf_file(self, project_name: str, file_path: str) -> bool:
         project = self.crud_service.load_project(project_name)
 
         # verifica projeto
@@ -157,6 +169,12 @@ class ProjectFileManager:
     # valida e limpa caminhos de arquivos
     #----------------------------------------------------------------
     def verify_and_fix_file_paths(self, project_name: str) -> List[str]:
+        # ler-alterar-gravar sob a trava do projeto
+        with self.crud_service.lock_project(project_name):
+            return self._verify_and_fix_file_paths(project_name)
+
+
+    def _verify_and_fix_file_paths(self, project_name: str) -> List[str]:
         project = self.crud_service.load_project(project_name)
         if project is None:
             self.logger.error(f"Nao foi possivel validar arquivos. Projeto '{project_name}' nao foi encontrado")
@@ -222,6 +240,12 @@ class ProjectFileManager:
     # move arquivo para a categoria
     #----------------------------------------------------------------
     def move_file_to_category(self, project_name: str, old_path: str, new_category: str) -> bool:
+        # ler-alterar-gravar sob a trava do projeto
+        with self.crud_service.lock_project(project_name):
+            return self._move_file_to_category(project_name, old_path, new_category)
+
+
+    def _move_file_to_category(self, project_name: str, old_path: str, new_category: str) -> bool:
 
         project = self.crud_service.load_project(project_name)
         if project is None:
@@ -0,0 +1,257 @@
+import time
+import threading
+from pathlib import Path
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional
+
+from app.core.config import settings
+from app.core.logger import Logger
+from app.core.path_manager import PathManager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+try:
+    import msvcrt
+except ImportError:  # POSIX
+    msvcrt = None
+
+
+#================================================================
+# CLASSE: ReadWriteLock
+#----------------------------------------------------------------
+# Trava de leitura/escrita entre threads do mesmo processo.
+#
+#   - varios leitores ao mesmo tempo, um escritor por vez
+#   - escritores esperando tem preferencia sobre novos leitores
+#   - reentrante: a thread que escreve pode escrever e ler de novo;
+#     uma leitura dentro de outra leitura nao espera
+#   - subir de leitura para escrita nao e permitido (RuntimeError),
+#     pois dois leitores fazendo isso travariam um ao outro
+#================================================================
+
+class ReadWriteLock:
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._readers: Dict[int, int] = {}
+        self._writer: Optional[int] = None
+        self._writer_depth = 0
+        self._waiting_writers = 0
+
+
+    def acquire_read(self) -> None:
+        me = threading.get_ident()
+        with self._condition:
+            if self._writer != me and me not in self._readers:
+                while self._writer is not None or self._waiting_writers:
+                    self._condition.wait()
+            self._readers[me] = self._readers.get(me, 0) + 1
+
+
+    def release_read(self) -> None:
+        me = threading.get_ident()
+        with self._condition:
+            depth = self._readers[me] - 1
+            if depth:
+                self._readers[me] = depth
+            else:
+                del self._readers[me]
+                self._condition.notify_all()
+
+
+    # Retorna: True se esta e a escrita mais externa da thread
+    def acquire_write(self) -> bool:
+        me = threading.get_ident()
+        with self._condition:
+            if self._writer == me:
+                self._writer_depth += 1
+                return False
+            if me in self._readers:
+                raise RuntimeError("Não é possível obter a trava de escrita enquanto a thread mantém a de leitura")
+
+            self._waiting_writers += 1
+            try:
+                while self._writer is not None or self._readers:
+                    self._condition.wait()
+            finally:
+                self._waiting_writers -= 1
+            self._writer = me
+            self._writer_depth = 1
+            return True
+
+
+    def release_write(self) -> None:
+        with self._condition:
+            self._writer_depth -= 1
+            if not self._writer_depth:
+                self._writer = None
+                self._condition.notify_all()
+
+
+
+
+#================================================================
+# CLASSE: FileLock
+#----------------------------------------------------------------
+# Trava consultiva (advisory) em um arquivo, para processos que
+# compartilham o mesmo diretorio de dados.
+#
+# POSIX: fcntl.flock (compartilhada ou exclusiva).
+# Windows: msvcrt.locking no primeiro byte, sempre exclusiva.
+# Sem nenhum dos dois a trava nao faz nada.
+#================================================================
+
+class FileLock:
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._file = None
+
+
+    def acquire(self, shared: bool = False) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "a+b")
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            elif msvcrt is not None:
+                self._file.seek(0)
+                while True:
+                    try:
+                        msvcrt.locking(self._file.fileno(), msvcrt.LK_NBLCK, 1)
+                        break
+                    except OSError:
+                        time.sleep(0.05)
+        except BaseException:
+            self._file.close()
+            self._file = None
+            raise
+
+
+    def release(self) -> None:
+        if self._file is None:
+            return
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            elif msvcrt is not None:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self._file.close()
+            self._file = None
+
+
+
+
+#================================================================
+# CLASSE: ProjectLocks
+#----------------------------------------------------------------
+# Travas de leitura/escrita por projeto, compartilhadas por todas
+# as sessoes do processo (o Streamlit usa um unico ProjectManager).
+#
+# Com file_locks = True (project_file_locks na configuracao) a
+# trava mais externa tambem pega a trava de arquivo do projeto
+# (data/locks/<projeto>.lock), protegendo varios processos que usam
+# o mesmo diretorio de dados.
+#
+# Uso:
+#   with project_locks.write("projeto"):
+#       ...ler, alterar e gravar...
+#================================================================
+
+class ProjectLocks:
+
+    def __init__(self, file_locks: bool = False):
+        self.logger = Logger(name="ProjectLocks")
+        self.file_locks = file_locks
+        self._locks: Dict[str, ReadWriteLock] = {}
+        self._guard = threading.Lock()
+        self._held = threading.local()
+
+
+    @contextmanager
+    def read(self, project_name: str) -> Iterator[None]:
+        lock = self._lock_for(project_name)
+        lock.acquire_read()
+        try:
+            file_lock = self._acquire_file(project_name, shared=True)
+        except BaseException:
+            lock.release_read()
+            raise
+        try:
+            yield
+        finally:
+            self._release_file(project_name, file_lock)
+            lock.release_read()
+
+
+    #----------------------------------------------------------------
+    # Trava de escrita do projeto
+    #----------------------------------------------------------------
+    # before_release: chamado uma vez, ao sair da escrita mais
+    # externa e antes de soltar a trava de arquivo (ex.: gravar a
+    # fila do write-behind para que outros processos vejam os dados)
+    #----------------------------------------------------------------
+    @contextmanager
+    def write(self, project_name: str, before_release: Optional[Callable[[], None]] = None) -> Iterator[None]:
+        lock = self._lock_for(project_name)
+        outermost = lock.acquire_write()
+        try:
+            file_lock = self._acquire_file(project_name, shared=False)
+        except BaseException:
+            lock.release_write()
+            raise
+        try:
+            yield
+        finally:
+            try:
+                if outermost and before_release:
+                    before_release()
+            finally:
+                self._release_file(project_name, file_lock)
+                lock.release_write()
+
+
+    def _lock_for(self, project_name: str) -> ReadWriteLock:
+        with self._guard:
+            lock = self._locks.get(project_name)
+            if lock is None:
+                lock = self._locks[project_name] = ReadWriteLock()
+            return lock
+
+
+    # So a trava mais externa da thread usa o arquivo: no flock, dois
+    # descritores do mesmo processo tambem bloqueiam um ao outro
+    def _acquire_file(self, project_name: str, shared: bool) -> Optional[FileLock]:
+        if not self.file_locks:
+            return None
+        held = self._held.__dict__.setdefault("projects", {})
+        if held.get(project_name):
+            held[project_name] += 1
+            return None
+
+        file_lock = FileLock(PathManager.get_project_lock_path(project_name))
+        file_lock.acquire(shared=shared)
+        held[project_name] = 1
+        return file_lock
+
+
+    def _release_file(self, project_name: str, file_lock: Optional[FileLock]) -> None:
+        if not self.file_locks:
+            return
+        held = self._held.__dict__.setdefault("projects", {})
+        held[project_name] = held.get(project_name, 1) - 1
+        if not held[project_name]:
+            del held[project_name]
+        if file_lock is not None:
+            file_lock.release()
+
+
+
+
+# Instancia unica: todas as sessoes e servicos do processo compartilham as travas
+project_locks = ProjectLocks(file_locks=settings.project_file_locks)
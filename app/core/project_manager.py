@@ -56,6 +56,9 @@ class ProjectManager:
     def delete_project(self, project_name: str) -> bool:
         return self.crud.delete_project(project_name)
 
+    def flush_project(self, project_name: Optional[str] = None) -> bool:
+        return self.crud.flush(project_name)
+
     # -----------------------
     # File Management
     # -----------------------
@@ -83,10 +86,16 @@ class ProjectManager:
     
     def run_extraction(self, project_name:str, category:str) -> Optional[str]:
         return self.workflow.run_text_consolidation_for_category(project_name, category)
+
+    def run_streaming_extraction(self, project_name: str, category: str, on_partial=None) -> bool:
+        return self.workflow.run_streaming_text_consolidation_for_category(project_name, category, on_partial)
     
     def run_secondary_extraction(self, project_name:str, category:str)-> bool:
         return self.workflow.run_secondary_extraction_for_category(project_name, category)
 
+    def run_project_extraction(self, project_name: str, on_status=None, resume: bool = True) -> Dict[str, str]:
+        return self.workflow.run_project_extraction_pipeline(project_name, on_status=on_status, resume=resume)
+
     def load_structured_extraction(self, project_name: str, category: str) -> Optional[Dict]:
         return self.data.load_structured_extraction(project_name, category)
 
@@ -122,12 +131,18 @@ class ProjectManager:
     # -----------------------
     # Criteria & Verification
     # -----------------------
-    def execute_criteria_verification(self, project_name: str) -> Dict:
-        return self.workflow.execute_criteria_verification(project_name)
+    def execute_criteria_verification(self, project_name: str, parallel: bool = True, progress_callback=None) -> List[Dict]:
+        return self.workflow.execute_criteria_verification(project_name, parallel, progress_callback)
+
+    def execute_incremental_criteria_verification(self, project_name: str, progress_callback=None) -> List[Dict]:
+        return self.workflow.execute_criteria_verification(project_name, progress_callback=progress_callback, incremental=True)
 
     def execute_single_criterion(self, project_name: str, criterion_id: str) -> Dict:
         return self.workflow.execute_single_criterion_verification(project_name, criterion_id)
 
+    def execute_single_criterion_verification(self, project_name: str, criterion_id: str) -> Dict:
+        return self.workflow.execute_single_criterion_verification(project_name, criterion_id)
+
     def update_manual_override(self, project_name: str, category: str, criterion_id: str, status: str, reason: str) -> bool:
         return self.workflow.update_manual_override(project_name, category, criterion_id, status, reason)
 
@@ -1,5 +1,10 @@
-import json
-from typing import List, Dict, Optional
+import asyncio
+import hashlib
+import threading
+from functools import partial
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import List, Dict, Optional, Callable, Tuple
 
 from app.core.path_manager import PathManager
 from app.core.project_crud_service import ProjectCRUDService
@@ -12,6 +17,19 @@ from app.core.prompt_manager import PromptManager
 from app.core.ai_client import gemini_client
 from app.core.logger import Logger
 from app.core.config import settings
+from app.core.text_chunker import TextChunker
+from app.core.token_planner import TokenPlanner, ACTION_SEND, ACTION_CHUNK
+from app.core.pipeline_runner import PipelineRunner, PipelineNode
+from app.core.request_scheduler import RequestScheduler
+
+# Limite de paginas digitalizadas enviadas em uma unica chamada multimodal
+MAX_IMAGES_PER_REQUEST = 16
+
+# Intervalo entre as gravacoes do texto parcial na consolidacao com streaming
+STREAM_FLUSH_SECONDS = 1.0
+
+# Categorias processadas pelo pipeline de extracao do projeto, nesta ordem
+PIPELINE_CATEGORIES = ["estatuto", "ata", "identificacao", "licenca", "programacao"]
 
 #================================================================
 # CLASS: ProjectWorkflowOrchestrator
@@ -36,6 +54,7 @@ class ProjectWorkflowOrchestrator:
         self.path = PathManager
         self.ai = gemini_client
         self.conf = settings
+        self.planner = TokenPlanner(self.ai)
 
         self.logger.info("Serviço de workflow inicializado com sucesso")
 
@@ -46,58 +65,423 @@ class ProjectWorkflowOrchestrator:
     #----------------------------------------------------------------
     # Orquestra extração de dados por categoria via AI
     #----------------------------------------------------------------
-
+    # Modo hibrido (settings.extraction_hybrid_mode): cada pagina e
+    # roteada pelo seu conteudo. Paginas com texto vao pelo prompt de
+    # texto e paginas digitalizadas (so imagem) pela chamada
+    # multimodal. Paginas consecutivas do mesmo tipo formam um
+    # segmento; os segmentos sao enviados em paralelo e os textos sao
+    # unidos na ordem das paginas.
+    #
+    # Segmentos de texto maiores que settings.consolidation_chunk_tokens
+    # sao consolidados em map-reduce: divididos em partes nos limites
+    # de pagina/artigo, consolidados em paralelo e unidos em seguida.
+    # Cada chamada e planejada (tokens e custo) antes do envio: grupos
+    # de imagens acima de settings.token_ceiling sao divididos e
+    # chamadas que nao podem ser divididas sao rejeitadas.
+    #
+    # As paginas digitalizadas ficam em disco (spill) ate o envio: os
+    # bytes de um grupo de imagens so sao lidos quando a chamada sai.
+    #----------------------------------------------------------------
     def run_text_consolidation_for_category(self, project_name:str, category:str) -> bool:
-        
+        with self.extract.spill_directory() as spill_dir:
+            segments = self._load_category_segments(project_name, category, spill_dir)
+            if not segments:
+                return False
+
+            text = self._consolidate_segments(segments)
+        if not text:
+            self.logger.error("Obtenção de textos falhou")
+            return False
+
+        succes = self.data.save_extracted_text(project_name, category, text)
+        return succes
+
+
+
+
+    #----------------------------------------------------------------
+    # Consolidacao com o texto gravado a medida que chega (streaming)
+    #----------------------------------------------------------------
+    # Mesmo plano de chamadas da consolidacao normal, mas cada chamada
+    # usa generate_content_stream. O texto parcial, na ordem das
+    # paginas, e gravado no arquivo de extracao (partial=True) e
+    # repassado a on_partial a cada STREAM_FLUSH_SECONDS. on_partial e
+    # chamado na thread de quem chamou o metodo (ex.: a pagina do
+    # Streamlit). O salvamento final une as partes como na versao
+    # normal e marca a extracao como completa.
+    #----------------------------------------------------------------
+    def run_streaming_text_consolidation_for_category(self, project_name: str, category: str, on_partial: Optional[Callable[[str], None]] = None) -> bool:
+        with self.extract.spill_directory() as spill_dir:
+            segments = self._load_category_segments(project_name, category, spill_dir)
+            if not segments:
+                return False
+            return self._stream_consolidation(project_name, category, segments, on_partial)
+
+
+    def _stream_consolidation(self, project_name: str, category: str, segments: List[Dict], on_partial: Optional[Callable[[str], None]]) -> bool:
+        planned = self._plan_consolidation(segments)
+        if planned is None:
+            return False
+        tasks_per_segment, chunker = planned
+
+        model_name = self.conf.extraction_model
+        tasks = [task for segment_tasks in tasks_per_segment for task in segment_tasks]
+        buffers = [""] * len(tasks)
+        published = [""]
+        lock = threading.Lock()
+
+        # Um stream interrompido no meio por erro transitorio e refeito
+        # sem streaming (com as novas tentativas do RequestScheduler);
+        # o texto parcial dessa chamada e descartado.
+        def stream_task(index: int, task: tuple) -> Optional[str]:
+            images = None
+            try:
+                images = self._read_images(task[2]) if task[0] == "images" else None
+                for chunk in self.ai.generate_text_stream(task[1], model_name, images):
+                    with lock:
+                        buffers[index] += chunk
+            except Exception as e:
+                if not buffers[index] or not RequestScheduler.is_retryable(e):
+                    self.logger.error(f"Falha no streaming da chamada {index + 1}/{len(tasks)}: {e}")
+                    return None
+                self.logger.warning(f"Streaming da chamada {index + 1}/{len(tasks)} interrompido ({e}). Refazendo sem streaming.")
+                with lock:
+                    buffers[index] = ""
+                if images:
+                    text = self.ai.generate_text_from_multimodal_prompt(task[1], images, model_name)
+                else:
+                    text = self.ai.generate_text_from_prompt(task[1], model_name)
+                with lock:
+                    buffers[index] = text or ""
+            return buffers[index] or None
+
+        def publish() -> None:
+            with lock:
+                partial_text = "\n\n".join(buffer.strip() for buffer in buffers if buffer.strip())
+            if not partial_text or partial_text == published[0]:
+                return
+            published[0] = partial_text
+            self.data.save_extracted_text(project_name, category, partial_text, partial=True)
+            if on_partial:
+                on_partial(partial_text)
+
+        self.logger.info(f"Consolidando {len(segments)} segmento(s) de páginas em {len(tasks)} chamada(s) com streaming.")
+        with ThreadPoolExecutor(max_workers=max(1, self.conf.max_concurrent_requests)) as pool:
+            futures = [pool.submit(stream_task, index, task) for index, task in enumerate(tasks)]
+            pending = set(futures)
+            while pending:
+                _, pending = wait(pending, timeout=STREAM_FLUSH_SECONDS)
+                publish()
+            results = [future.result() for future in futures]
+
+        if any(not result for result in results):
+            self.logger.error("Falha na consolidação de ao menos um segmento. O texto parcial não será marcado como completo.")
+            return False
+
+        text = self._reduce_consolidation(tasks_per_segment, results, chunker)
+        return self.data.save_extracted_text(project_name, category, text)
+
+
+
+
+    #----------------------------------------------------------------
+    # Valida o projeto e agrupa as paginas da categoria em segmentos
+    #----------------------------------------------------------------
+    def _load_category_segments(self, project_name: str, category: str, spill_dir: Path) -> Optional[List[Dict]]:
+
         # verificacao do nome do projeto
         self.logger.info(f"Iniciando extração primária para '{category}' em '{project_name}'.")
         if not self.path.validate_project_name(project_name):
             self.logger.error(f"Projeto {project_name} inválido.")
-            return False
+            return None
         
         # carregar dados do projeto
         project = self.crud.load_project(project_name)
         if not project:
             self.logger.error(f"Erro ao carregar projeto {project_name}.")
-            return False
+            return None
         
         # obter arquivos 
         paths = PathManager.get_files_in_category(project_name, category)
         if not paths:
             self.logger.error(f"Erro ao obter caminhos para arquivos da categoria {category} para projeto {project_name}.")
-            return False
+            return None
 
-        # obtem texto
-        raw = self.extract._extract_content_from_files(paths)
-        if raw["type"] == "empty":
+        # obtem paginas agrupadas por tipo
+        segments = self._build_page_segments(project_name, paths, spill_dir)
+        if not segments:
             self.logger.error(f"Nenhum conteúdo extraído para os arquivos {paths}")
-            return False
-        
-        # constroi prompt para extracao de texto
-        if raw["type"] == "text":
-            prompt = self.prompt.get_text_consolidation_prompt(raw["content"])
-            text = self.ai.generate_text_from_prompt(prompt, raw["content"])
-        else:
-            prompt = self.prompt.get_multimodal_extraction_prompt(raw["content"])
-            text = self.ai.generate_text_from_multimodal_prompt(prompt, raw["content"])
+            return None
+
+        return segments
+
+
+
+
+    #----------------------------------------------------------------
+    # Agrupa as paginas dos arquivos em segmentos de mesmo tipo
+    #----------------------------------------------------------------
+    # As imagens sao gravadas em spill_dir e os segmentos guardam so
+    # os caminhos. Fora do modo hibrido, paginas digitalizadas depois
+    # da primeira pagina de texto nem entram nos segmentos.
+    # Retorna: lista de {"type": "text", "content": str, "pages": [str]}
+    #          ou {"type": "images", "content": [Path]} na ordem das paginas
+    #----------------------------------------------------------------
+    def _build_page_segments(self, project_name: str, paths: List, spill_dir: Path) -> List[Dict]:
+        segments: List[Dict] = []
+        has_text = False
+
+        for record in self.extract.iter_page_records(paths, project_name, spill_dir=spill_dir):
+            if has_text and record["type"] != "text" and not self.conf.extraction_hybrid_mode:
+                continue
+            if record["type"] == "text":
+                has_text = True
+                if segments and segments[-1]["type"] == "text":
+                    segments[-1]["content"] += "\n\n" + record["content"]
+                    segments[-1]["pages"].append(record["content"])
+                else:
+                    segments.append({"type": "text", "content": record["content"], "pages": [record["content"]]})
+            else:
+                if (segments and segments[-1]["type"] == "images"
+                        and len(segments[-1]["content"]) < MAX_IMAGES_PER_REQUEST):
+                    segments[-1]["content"].append(record["content"])
+                else:
+                    segments.append({"type": "images", "content": [record["content"]]})
+
+        # Fora do modo hibrido, documentos com texto ignoram as paginas digitalizadas
+        if has_text and not self.conf.extraction_hybrid_mode:
+            text_segments = [seg for seg in segments if seg["type"] == "text"]
+            text = "\n\n".join(seg["content"] for seg in text_segments)
+            pages = [page for seg in text_segments for page in seg["pages"]]
+            return [{"type": "text", "content": text, "pages": pages}]
+
+        image_pages = sum(len(seg["content"]) for seg in segments if seg["type"] == "images")
+        if has_text and image_pages:
+            self.logger.info(f"Documento misto: {image_pages} página(s) digitalizada(s) seguirão pela chamada multimodal.")
+
+        return segments
+
+
+
+
+    #----------------------------------------------------------------
+    # Consolida os segmentos em paralelo e une na ordem original
+    #----------------------------------------------------------------
+    def _consolidate_segments(self, segments: List[Dict]) -> Optional[str]:
+        planned = self._plan_consolidation(segments)
+        if planned is None:
+            return None
+        tasks_per_segment, chunker = planned
+        model_name = self.conf.extraction_model
+
+        async def consolidate_all():
+            # limita quantos grupos de imagens ficam em memoria ao mesmo tempo
+            image_slots = asyncio.Semaphore(max(1, int(self.conf.max_concurrent_requests or 1)))
+
+            async def consolidate_images(prompt: str, image_paths: List[Path]) -> Optional[str]:
+                async with image_slots:
+                    images = await asyncio.to_thread(self._read_images, image_paths)
+                    return await self.ai.agenerate_text_from_multimodal_prompt(prompt, images, model_name)
+
+            tasks = []
+            for segment_tasks in tasks_per_segment:
+                for task in segment_tasks:
+                    if task[0] == "text":
+                        tasks.append(self.ai.agenerate_text_from_prompt(task[1], model_name))
+                    else:
+                        tasks.append(consolidate_images(task[1], task[2]))
+            return await asyncio.gather(*tasks)
+
+        total_tasks = sum(len(segment_tasks) for segment_tasks in tasks_per_segment)
+        self.logger.info(f"Consolidando {len(segments)} segmento(s) de páginas em {total_tasks} chamada(s).")
+        results = self.ai.run_coroutine(consolidate_all())
+
+        if any(not result for result in results):
+            self.logger.error("Falha na consolidação de ao menos um segmento. O texto não será salvo incompleto.")
+            return None
+
+        return self._reduce_consolidation(tasks_per_segment, results, chunker)
+
+
+
+
+    #----------------------------------------------------------------
+    # Monta e planeja as chamadas de consolidacao dos segmentos
+    #----------------------------------------------------------------
+    # Retorna: (tarefas por segmento, chunker) ou None se alguma
+    # chamada exceder o limite de tokens. Cada tarefa e
+    # ("text", prompt) ou ("images", prompt, caminhos das imagens)
+    #----------------------------------------------------------------
+    def _plan_consolidation(self, segments: List[Dict]) -> Optional[Tuple[List[List[tuple]], TextChunker]]:
+        model_name = self.conf.extraction_model
+
+        chunk_budget = self.conf.consolidation_chunk_tokens
+        if self.planner.max_input_tokens:
+            # desconta as instrucoes do prompt e o trecho de contexto de cada parte
+            instructions = self.prompt.get_chunk_consolidation_prompt("", "-", 1, 1)
+            ceiling_budget = (self.planner.max_input_tokens - self.planner.estimate_text_tokens(instructions)
+                              - self.conf.consolidation_overlap_tokens)
+            if ceiling_budget > 0:
+                chunk_budget = min(chunk_budget, ceiling_budget)
+        chunker = TextChunker(chunk_budget, self.conf.consolidation_overlap_tokens)
+
+        # map: uma tarefa por segmento de imagens ou por parte de texto,
+        # ja com a estimativa de tokens/custo de cada chamada
+        tasks_per_segment = []
+        plans = []
+        for segment in segments:
+            if segment["type"] == "text":
+                chunks = chunker.split(segment.get("pages") or [segment["content"]])
+                if len(chunks) > 1:
+                    self.logger.info(f"Segmento de texto dividido em {len(chunks)} parte(s) para consolidação.")
+                    prompts = [
+                        self.prompt.get_chunk_consolidation_prompt(chunk["text"], chunk["context"], index + 1, len(chunks))
+                        for index, chunk in enumerate(chunks)
+                    ]
+                else:
+                    prompts = [self.prompt.get_text_consolidation_prompt(segment["content"])]
+                tasks_per_segment.append([("text", prompt) for prompt in prompts])
+                plans.extend(self.planner.plan_step("consolidacao:text", prompt, model_name) for prompt in prompts)
+            else:
+                prompt = self.prompt.get_multimodal_consolidation_prompt()
+                groups = self._split_image_group(prompt, segment["content"], model_name)
+                tasks_per_segment.append([("images", prompt, group) for group, _ in groups])
+                plans.extend(plan for _, plan in groups)
+
+        self.logger.info(f"Plano de consolidação: {TokenPlanner.format_summary(TokenPlanner.summarize(plans))}.")
+        if any(plan["action"] != ACTION_SEND for plan in plans):
+            self.logger.error("Ao menos uma chamada de consolidação excede o limite de tokens. Consolidação rejeitada.")
+            return None
+
+        return tasks_per_segment, chunker
+
+
+
+
+    #----------------------------------------------------------------
+    # reduce: une as partes de cada segmento e depois os segmentos
+    #----------------------------------------------------------------
+    @staticmethod
+    def _reduce_consolidation(tasks_per_segment: List[List[tuple]], results: List[str], chunker: TextChunker) -> str:
+        texts = []
+        position = 0
+        for segment_tasks in tasks_per_segment:
+            parts = results[position:position + len(segment_tasks)]
+            position += len(segment_tasks)
+            texts.append(chunker.stitch(parts) if len(parts) > 1 else parts[0].strip())
+
+        return "\n\n".join(texts)
+
+
+
+
+    #----------------------------------------------------------------
+    # Divide um grupo de imagens ate cada parte caber no limite de tokens
+    #----------------------------------------------------------------
+    # Os bytes so ficam em memoria durante a estimativa de cada grupo.
+    # Retorna: lista de (caminhos das imagens, plano da chamada)
+    #----------------------------------------------------------------
+    def _split_image_group(self, prompt: str, image_paths: List[Path], model_name: str) -> List[Tuple[List[Path], Dict]]:
+        plan = self.planner.plan_step("consolidacao:images", prompt, model_name,
+                                      self._read_images(image_paths), chunkable=len(image_paths) > 1)
+        if plan["action"] != ACTION_CHUNK:
+            return [(image_paths, plan)]
+
+        middle = len(image_paths) // 2
+        return (self._split_image_group(prompt, image_paths[:middle], model_name)
+                + self._split_image_group(prompt, image_paths[middle:], model_name))
 
-        if not text:
-            self.logger.error("Obtenção de textos falhou")
-            return False
 
-        succes = self.data.save_extracted_text(project_name, category, text)
-        return succes
 
 
+    #----------------------------------------------------------------
+    # Le do disco as imagens de uma chamada (aceita bytes ja carregados)
+    #----------------------------------------------------------------
+    @staticmethod
+    def _read_images(images: List) -> List[bytes]:
+        return [image if isinstance(image, bytes) else Path(image).read_bytes() for image in images]
 
 
 
 
+    #----------------------------------------------------------------
+    # Extracao do projeto inteiro em um grafo de etapas (DAG)
+    #----------------------------------------------------------------
+    # Para cada categoria com arquivos: ingest -> consolidate ->
+    # secondary. Categorias independentes rodam em paralelo (no maximo
+    # settings.pipeline_max_workers etapas por vez) e o estado de cada
+    # etapa fica em extracted/pipeline_state.json: depois de uma falha,
+    # uma nova execucao (resume=True) retoma das etapas que faltaram.
+    # As etapas de uma categoria sao refeitas se os arquivos mudarem.
+    #
+    # Categorias que ja tem texto consolidado (ex.: extraido e
+    # revisado pela pagina de extracao) nao sao consolidadas de novo,
+    # a menos que overwrite_existing=True.
+    #
+    # on_status(node_id, status, info): ver PipelineRunner
+    # Retorna: {node_id: status final}, ex.: {"consolidate:ata": "done"}
+    #----------------------------------------------------------------
+    def run_project_extraction_pipeline(
+            self,
+            project_name: str,
+            categories: Optional[List[str]] = None,
+            on_status: Optional[Callable[[str, str, Dict], None]] = None,
+            resume: bool = True,
+            overwrite_existing: bool = False
+        ) -> Dict[str, str]:
+
+        if not self.path.validate_project_name(project_name) or not self.crud.load_project(project_name):
+            self.logger.error(f"Projeto {project_name} inválido.")
+            return {}
 
+        nodes = []
+        for category in categories or PIPELINE_CATEGORIES:
+            paths = PathManager.get_files_in_category(project_name, category)
+            if not paths:
+                continue
+            fingerprint = self._fingerprint_files(paths)
+            nodes.extend([
+                PipelineNode(f"ingest:{category}", partial(self._ingest_category, project_name, category, paths), fingerprint=fingerprint),
+                PipelineNode(f"consolidate:{category}", partial(self._consolidate_category, project_name, category, overwrite_existing),
+                             depends_on=[f"ingest:{category}"], fingerprint=fingerprint),
+                PipelineNode(f"secondary:{category}", partial(self.run_secondary_extraction_for_category, project_name, category),
+                             depends_on=[f"consolidate:{category}"], fingerprint=fingerprint),
+            ])
+
+        if not nodes:
+            self.logger.warning(f"Nenhuma categoria com arquivos no projeto '{project_name}'.")
+            return {}
+
+        runner = PipelineRunner(
+            max_workers=self.conf.pipeline_max_workers,
+            state_path=PathManager.get_pipeline_state_path(project_name),
+            on_status=on_status
+        )
+        return runner.run(nodes, resume=resume)
 
 
+    # Le (e guarda no cache de ingestao) todas as paginas da categoria
+    def _ingest_category(self, project_name: str, category: str, paths: List) -> bool:
+        pages = sum(1 for _ in self.extract.iter_page_records(paths, project_name))
+        self.logger.info(f"{pages} página(s) lida(s) para '{category}'.")
+        return pages > 0
 
 
+    def _consolidate_category(self, project_name: str, category: str, overwrite_existing: bool) -> bool:
+        if not overwrite_existing and self.data.has_extraction_for_category(project_name, category):
+            self.logger.info(f"'{category}' já possui texto consolidado. Consolidação mantida.")
+            return True
+        return self.run_text_consolidation_for_category(project_name, category)
+
+
+    @staticmethod
+    def _fingerprint_files(paths: List) -> str:
+        digest = hashlib.sha256()
+        for path in sorted(paths):
+            stat = path.stat()
+            digest.update(f"{path.name}|{stat.st_size}|{stat.st_mtime_ns}\n".encode("utf-8"))
+        return digest.hexdigest()[:16]
+
 
 
 
@@ -113,21 +497,24 @@ class ProjectWorkflowOrchestrator:
             self.logger.error(f"Falha em validar projeto de nome: {project_name} \n\n {e}")
             return False
 
-        consolidated_text = self.data.load_consolidated_text(project_name, category)
+        consolidated_text = self.data.load_extracted_text(project_name, category)
         if not consolidated_text:
             self.logger.warning(f"Texto consolidado para '{category}' não disponível. Pulando extração secundária.")
             return True
         
         prompt = None
+        schema = None
 
         if category == 'ata':
             prompt = self.prompt.get_ata_director_extraction_prompt()
+            schema = self.prompt.get_ata_director_extraction_schema()
         elif category == 'identificacao':
-            prompt = self.prompt.get_id_document_extraction_prommpt()
+            prompt = self.prompt.get_id_document_extraction_prompt()
+            schema = self.prompt.get_id_document_extraction_schema()
 
 
         else: # -- Determina campos para extracao se nao e nem ata e nem identificacao --
-            report_config = self.report.get_report_configuration()
+            report_config = self.report.get_full_config()
 
             fields_to_extract = []
             for table in report_config.get('tables', []):
@@ -140,11 +527,12 @@ class ProjectWorkflowOrchestrator:
                 self.logger.info(f"Nenhum campo secundário a ser extraído para a categoria '{category}'.")
                 return True
             prompt = self.prompt.get_secondary_extraction_prompt(fields_to_extract)
+            schema = self.prompt.get_secondary_extraction_schema(fields_to_extract)
 
         # Executa a chamada à IA
         full_prompt = prompt + "\n\n--- TEXTO PARA ANÁLISE ---\n" + consolidated_text
         extracted = self.ai.generate_json_from_prompt(
-            full_prompt, self.ai.extraction_model()
+            full_prompt, self.conf.extraction_model, response_schema=schema
         )
 
         if not extracted:
@@ -168,23 +556,29 @@ class ProjectWorkflowOrchestrator:
     #----------------------------------------------------------------
     # Executa todas as verificações de critérios para um projeto
     #----------------------------------------------------------------
-    def execute_criteria_verification(self, project_name: str) -> Dict:
+    # incremental: reaproveita os resultados salvos cujo contexto
+    # (hash do texto enviado a IA) nao mudou desde a ultima execucao
+    #----------------------------------------------------------------
+    def execute_criteria_verification(self, project_name: str, parallel: bool = True, progress_callback: Optional[Callable] = None, incremental: bool = False) -> List[Dict]:
         self.logger.info(f"Iniciando verificação de critérios para '{project_name}'.")
         project = self.crud.load_project(project_name)
-        categories = self.criteria.list_categories()
-        all_results: Dict[str, Dict] = {}
+        if not project:
+            self.logger.error(f"Erro ao carregar projeto {project_name}.")
+            return []
 
-        for category in categories:
-            files = project.files.get(category, [])
-            results = self.criteria.verify_all(
-                project_name, category, files
-            )
-            all_results[category] = results
+        previous_results = None
+        if incremental:
+            previous_results = project.criteria_results if isinstance(project.criteria_results, list) else []
+
+        all_results = self.criteria.run_all_checks(
+            project,
+            parallel=parallel,
+            progress_callback=progress_callback,
+            previous_results=previous_results
+        )
 
-        # Salva resultados em JSON
-        criteria_path = PathManager.get_criteria_results_path(project_name)
-        with open(criteria_path, "w", encoding="utf-8") as f:
-            json.dump(all_results, f, indent=2, ensure_ascii=False)
+        # Salva resultados
+        self.crud.save_criteria_results(project_name, all_results)
 
         self.logger.info("Verificação de critérios concluída.")
         return all_results
@@ -204,21 +598,27 @@ class ProjectWorkflowOrchestrator:
         
         self.logger.info(f"Verificando critério '{criterion_id}' para '{project_name}'.")
 
-        file_list = self.get_all_criteria(project_name)
-        criterion_to_check = next((c for c in file_list if c['id']== criterion_id), None)
+        project = self.crud.load_project(project_name)
+        if not project:
+            self.logger.error(f"Erro ao carregar projeto {project_name}.")
+            return None
 
-        if not criterion_to_check:
-            self.logger.error(f"Critério com ID '{criterion_id}' não encontrado na base de dados.")
+        new_result = self.criteria.run_single_check(criterion_id, project)
+        if not new_result:
             return None
-        
-        self.projectfil
 
-        new_result = self.criteria._perform_single_check(criterion_to_check, project_data)
-        result = self.criteria.verify_single(
-            project_name, category, criterion_id, file_list
-        )
+        # substitui o resultado anterior do criterio, mantendo a ordem da base de criterios
+        previous = project.criteria_results if isinstance(project.criteria_results, list) else []
+        results_by_id = {r.get("id"): r for r in previous if isinstance(r, dict)}
+        results_by_id[criterion_id] = new_result
+        order = [c.get("id") for c in self.criteria.criteria]
+        all_results = [results_by_id[cid] for cid in order if cid in results_by_id]
+        all_results += [r for cid, r in results_by_id.items() if cid not in order]
+
+        self.crud.save_criteria_results(project_name, all_results)
+
         self.logger.info(f"Verificação de critério '{criterion_id}' concluída.")
-        return result
+        return new_result
 
 
 
@@ -254,13 +654,11 @@ class ProjectWorkflowOrchestrator:
     # Exibe resultados de critérios existentes
     #----------------------------------------------------------------
     def get_all_criteria(self, project_name: str) -> Dict:
-        criteria_path = PathManager.get_criteria_results_path(project_name)
-        try:
-            with open(criteria_path, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except Exception as e:
-            self.logger.error(f"Erro ao ler resultados de critérios: {e}")
+        results = self.crud.load_criteria_results(project_name)
+        if results is None:
+            self.logger.error(f"Não há resultados de critérios para '{project_name}'.")
             return {}
+        return results
 
 
 
@@ -275,6 +673,8 @@ class ProjectWorkflowOrchestrator:
     #----------------------------------------------------------------
     def export_project_package(self, project_name: str) -> Optional[str]:
         self.logger.info(f"Iniciando exportação para '{project_name}'.")
+        # o pacote sai do que esta em disco: grava o que ainda esta na fila
+        self.crud.flush(project_name)
         project = self.crud.load_project(project_name)
         if not project:
             self.logger.error("Projeto não encontrado.")
@@ -1,4 +1,19 @@
-from typing import List
+from typing import Any, Dict, List, Optional, Type
+
+from pydantic import BaseModel
+
+from app.core.models import (
+    CriteriaCheckResponse,
+    BatchCriteriaCheckItem,
+    AtaDirectorsResponse,
+    IdDocumentsResponse,
+    build_fields_response_model,
+)
+
+# Versao dos prompts de verificacao de criterios. Incremente ao mudar o
+# formato da resposta ou as variantes em lote/cache: resultados anteriores
+# deixam de ser reaproveitados na verificacao incremental.
+CRITERIA_PROMPT_VERSION = 1
 
 
 #============================================================================
@@ -28,6 +43,18 @@ Preserve todo o conteúdo textual principal, como artigos e parágrafos.
 Retorne APENAS o texto limpo e consolidado, sem nenhuma introdução, explicação ou formatação adicional.
 """
 
+    def get_chunk_consolidation_prompt(self, chunk_text: str, previous_context: str, part_number: int, total_parts: int) -> str:
+        instructions = f"""Sua única tarefa é ler a PARTE {part_number} de {total_parts} do texto de um documento oficial e criar uma versão limpa e consolidada dessa parte em um único bloco de texto.
+Remova todos os elementos que não fazem parte do conteúdo principal, como cabeçalhos repetidos, rodapés com números de página, e outros artefatos de formatação.
+Preserve todo o conteúdo textual principal da parte, como artigos, parágrafos e o conteúdo de tabelas, de forma legível e contínua, sem resumir.
+O trecho de contexto, quando houver, é o final da parte anterior e serve apenas para dar continuidade a frases e artigos interrompidos: NÃO o repita na resposta.
+Retorne APENAS o texto limpo e consolidado desta parte, sem nenhuma introdução, explicação ou formatação adicional.
+"""
+        context_block = ""
+        if previous_context:
+            context_block = f"\n\n--- CONTEXTO (FINAL DA PARTE ANTERIOR, NÃO REPETIR) ---\n\n{previous_context}\n\n--- FIM DO CONTEXTO ---"
+        return f"{instructions}{context_block}\n\n--- INÍCIO DA PARTE {part_number} DO DOCUMENTO ---\n\n{chunk_text}\n\n--- FIM DA PARTE {part_number} DO DOCUMENTO ---"
+
     # ==========================================================================
     # 2. Prompts para Extração Secundária de Dados
     # (Objetivo: Extrair campos específicos de um texto já limpo)
@@ -67,7 +94,7 @@ Se nenhuma pessoa for identificada, retorne uma lista vazia.
         prompt_template = f"""
 **Contexto:** Você é um assistente de IA especialista em analisar a conformidade de documentos para a outorga de rádios comunitárias no Brasil. Sua análise deve ser objetiva e baseada estritamente no texto fornecido.
 
-**Tarefa:** Com base na instrução a seguir, analise o 'Texto do Documento Consolidado' e forneça uma resposta estruturada em JSON com as chaves 'analise' e 'resultado'.
+**Tarefa:** Com base na instrução a seguir, analise o 'Texto do Documento Consolidado' e forneça uma resposta estruturada em JSON com as chaves 'analise', 'status' e 'justificativa'.
 
 **Instrução de Análise Específica:**
 ---
@@ -80,8 +107,92 @@ Se nenhuma pessoa for identificada, retorne uma lista vazia.
 ---
 
 **Formato de Saída Obrigatório:**
-Sua resposta DEVE ser um único objeto JSON contendo duas chaves principais: `analise` e `resultado`.
+Sua resposta DEVE ser um único objeto JSON com as chaves `analise`, `status` e `justificativa`.
+- Na chave `analise` (string), descreva seu raciocínio passo a passo.
+- Na chave `status` (string), forneça sua conclusão final: 'Conforme', 'Não Conforme' ou 'Inconclusivo'.
+- Na chave `justificativa` (string), resuma em poucas linhas o trecho do texto ou o motivo que comprova a conclusão.
+"""
+        return prompt_template.strip()
+
+    # Verificacao em lote: varios criterios sobre o mesmo contexto em uma unica chamada.
+    # Sem context_text, o texto dos documentos foi enviado antes (contexto em cache).
+    def get_batch_criteria_check_prompt(self, criteria_items: List[Dict[str, str]], context_text: Optional[str] = None) -> str:
+        instructions = "\n\n".join(
+            f"[{item['id']}]\n{item['instruction']}" for item in criteria_items
+        )
+        if context_text is None:
+            document_block = "Use o 'Texto do Documento Consolidado' fornecido anteriormente."
+        else:
+            document_block = f"""**Texto do Documento Consolidado para Análise:**
+---
+{context_text}
+---"""
+
+        prompt_template = f"""
+**Contexto:** Você é um assistente de IA especialista em analisar a conformidade de documentos para a outorga de rádios comunitárias no Brasil. Sua análise deve ser objetiva e baseada estritamente no texto fornecido.
+
+**Tarefa:** Avalie o texto do documento contra CADA um dos critérios listados a seguir, de forma independente. Cada critério é identificado pelo seu id entre colchetes.
+
+**Critérios:**
+---
+{instructions}
+---
+
+{document_block}
+
+**Formato de Saída Obrigatório:**
+Sua resposta DEVE ser uma LISTA JSON com exatamente um objeto por critério, na mesma ordem, cada um com as chaves:
+- `id` (string): o id do critério, exatamente como informado.
+- `status` (string): 'Conforme', 'Não Conforme' ou 'Inconclusivo'.
+- `justificativa` (string): o trecho do texto ou o raciocínio curto que comprova a conclusão.
+"""
+        return prompt_template.strip()
+
+    # Variante para contexto em cache: o texto dos documentos e enviado uma unica
+    # vez (get_cached_criteria_context) e cada criterio envia apenas a instrucao.
+    def get_cached_criteria_context(self, context_text: str) -> str:
+        return f"""**Texto do Documento Consolidado para Análise:**
+---
+{context_text}
+---"""
+
+    def get_cached_criteria_check_prompt(self, instruction: str) -> str:
+        prompt_template = f"""
+**Contexto:** Você é um assistente de IA especialista em analisar a conformidade de documentos para a outorga de rádios comunitárias no Brasil. Sua análise deve ser objetiva e baseada estritamente no texto fornecido.
+
+**Tarefa:** Com base na instrução a seguir, analise o 'Texto do Documento Consolidado' fornecido anteriormente e forneça uma resposta estruturada em JSON com as chaves 'analise', 'status' e 'justificativa'.
+
+**Instrução de Análise Específica:**
+---
+{instruction}
+---
+
+**Formato de Saída Obrigatório:**
+Sua resposta DEVE ser um único objeto JSON com as chaves `analise`, `status` e `justificativa`.
 - Na chave `analise` (string), descreva seu raciocínio passo a passo.
-- Na chave `resultado` (objeto), forneça sua conclusão final com as chaves `conformidade` ('Conforme', 'Não Conforme' ou 'Inconclusivo') e `justificativa` (um resumo curto).
+- Na chave `status` (string), forneça sua conclusão final: 'Conforme', 'Não Conforme' ou 'Inconclusivo'.
+- Na chave `justificativa` (string), resuma em poucas linhas o trecho do texto ou o motivo que comprova a conclusão.
 """
         return prompt_template.strip()
+
+    # ==========================================================================
+    # 4. Schemas de Resposta
+    # (Objetivo: Restringir a saída JSON de cada prompt a um formato tipado,
+    #  enviado como response_schema e validado localmente)
+    # ==========================================================================
+
+    def get_criteria_check_schema(self) -> Type[BaseModel]:
+        return CriteriaCheckResponse
+
+    # list[...] nativo: o GenerateContentConfig converte typing.List[...] em um Schema vazio
+    def get_batch_criteria_check_schema(self) -> Any:
+        return list[BatchCriteriaCheckItem]
+
+    def get_ata_director_extraction_schema(self) -> Type[BaseModel]:
+        return AtaDirectorsResponse
+
+    def get_id_document_extraction_schema(self) -> Type[BaseModel]:
+        return IdDocumentsResponse
+
+    def get_secondary_extraction_schema(self, fields_to_extract: List[str]) -> Type[BaseModel]:
+        return build_fields_response_model(fields_to_extract)
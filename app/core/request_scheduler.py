@@ -0,0 +1,411 @@
+import time
+import heapq
+import random
+import asyncio
+import itertools
+import threading
+import contextvars
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Awaitable, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app.core.logger import Logger
+
+try:
+    import httpx  # transporte usado pelo google-genai
+except ImportError:
+    httpx = None
+
+
+# Prioridades: menor valor e atendido primeiro
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BULK = 10
+
+# Codigos HTTP que justificam nova tentativa
+RETRYABLE_STATUS_CODES = (408, 429, 500, 502, 503, 504)
+RETRYABLE_MARKERS = ("RESOURCE_EXHAUSTED", "UNAVAILABLE", "DEADLINE_EXCEEDED", "INTERNAL")
+
+# Falhas de rede/timeout (o SDK repassa as excecoes do httpx)
+RETRYABLE_ERRORS: Tuple[type, ...] = (TimeoutError, ConnectionError)
+if httpx is not None:
+    RETRYABLE_ERRORS += (httpx.TimeoutException, httpx.TransportError)
+
+# Prioridade da chamada atual (herdada por corotinas criadas a partir dela)
+_current_priority: contextvars.ContextVar = contextvars.ContextVar("request_priority", default=PRIORITY_BULK)
+
+
+#================================================================
+# CLASSE: TokenBucket
+#----------------------------------------------------------------
+# Balde de fichas com reposicao continua: 'capacity' fichas por
+# minuto. Uma capacidade <= 0 desativa o limite.
+#================================================================
+
+class TokenBucket:
+
+    def __init__(self, capacity: float):
+        self.capacity = float(capacity)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.capacity / 60.0)
+        self.updated_at = now
+
+
+    # Segundos ate haver 'amount' fichas (0 se ja houver)
+    def wait_time(self, amount: float) -> float:
+        if self.capacity <= 0:
+            return 0.0
+        self._refill()
+        # pedidos maiores que a capacidade esperam o balde encher
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) * 60.0 / self.capacity
+
+
+    def consume(self, amount: float) -> None:
+        if self.capacity <= 0:
+            return
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+
+
+
+
+#================================================================
+# CLASSE: ConcurrencyLimiter
+#----------------------------------------------------------------
+# Limite de chamadas simultaneas valido para o processo inteiro,
+# inclusive entre event loops de threads diferentes.
+#
+# Quem espera entra em uma fila de prioridade (mesma ordem do
+# RequestScheduler: prioridade e depois chegada) e a vaga liberada
+# e entregue direto ao proximo da fila, acordando o event loop
+# dele com call_soon_threadsafe (sem consultas periodicas).
+#================================================================
+
+class ConcurrencyLimiter:
+
+    def __init__(self, limit: int):
+        self.limit = max(1, int(limit))
+        self.active = 0
+        self._lock = threading.Lock()
+        self._waiters: List[Tuple[int, int, Dict]] = []
+        self._sequence = itertools.count()
+
+
+    def set_limit(self, limit: int) -> None:
+        with self._lock:
+            self.limit = max(1, int(limit))
+            self._grant_waiters()
+
+
+    async def acquire(self, priority: int = PRIORITY_BULK) -> None:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self.active < self.limit and not self._waiters:
+                self.active += 1
+                return
+            waiter = {"loop": loop, "future": loop.create_future(), "granted": False}
+            heapq.heappush(self._waiters, (priority, next(self._sequence), waiter))
+
+        try:
+            await waiter["future"]
+        except BaseException:
+            # cancelada: sai da fila ou, se a vaga ja foi entregue, devolve
+            with self._lock:
+                if waiter["granted"]:
+                    self.active -= 1
+                else:
+                    self._waiters = [entry for entry in self._waiters if entry[2] is not waiter]
+                    heapq.heapify(self._waiters)
+                self._grant_waiters()
+            raise
+
+
+    def release(self) -> None:
+        with self._lock:
+            self.active -= 1
+            self._grant_waiters()
+
+
+    # Chamado com o lock: entrega as vagas livres aos primeiros da fila
+    def _grant_waiters(self) -> None:
+        while self._waiters and self.active < self.limit:
+            _, _, waiter = heapq.heappop(self._waiters)
+            try:
+                waiter["loop"].call_soon_threadsafe(_resolve_waiter, waiter["future"])
+            except RuntimeError:
+                # event loop ja encerrado: ninguem vai usar a vaga
+                continue
+            waiter["granted"] = True
+            self.active += 1
+
+
+def _resolve_waiter(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+
+
+#================================================================
+# CLASSE: RequestScheduler
+#----------------------------------------------------------------
+# Ponto unico de envio das chamadas a IA.
+#
+#   - Limites por modelo de requisicoes (RPM) e tokens (TPM) por
+#     minuto, com um TokenBucket para cada
+#   - Fila de prioridade por modelo: chamadas interativas (ex.:
+#     verificar um criterio pela UI) passam a frente das chamadas
+#     em massa; dentro da mesma prioridade a ordem e de chegada
+#   - Novas tentativas com backoff exponencial e jitter para erros
+#     de limite (429) e falhas transitorias (5xx)
+#
+# Funciona com chamadas sincronas (execute) e assincronas
+# (aexecute), que compartilham os mesmos limites e a mesma fila.
+# slot() limita as chamadas assincronas simultaneas por modelo.
+#================================================================
+
+class RequestScheduler:
+
+    def __init__(
+            self,
+            default_rpm: int = 60,
+            default_tpm: int = 1_000_000,
+            model_limits: Optional[Dict[str, Dict[str, int]]] = None,
+            max_retries: int = 4,
+            base_delay: float = 1.0,
+            max_delay: float = 30.0
+        ):
+        self.logger = Logger(name="RequestScheduler")
+        self.default_rpm = default_rpm
+        self.default_tpm = default_tpm
+        self.model_limits = {name.lower(): limits for name, limits in (model_limits or {}).items()}
+        self.max_retries = max(0, int(max_retries))
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        self._buckets: Dict[str, Tuple[TokenBucket, TokenBucket]] = {}
+        self._queues: Dict[str, List[Tuple[int, int]]] = {}
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._limiters: Dict[str, ConcurrencyLimiter] = {}
+        self.stats = {"requests": 0, "retries": 0, "throttled_seconds": 0.0}
+
+
+
+
+    #----------------------------------------------------------------
+    # Define a prioridade das chamadas feitas dentro do bloco
+    #----------------------------------------------------------------
+    @staticmethod
+    @contextmanager
+    def priority(level: int) -> Iterator[None]:
+        token = _current_priority.set(level)
+        try:
+            yield
+        finally:
+            _current_priority.reset(token)
+
+
+
+
+    #----------------------------------------------------------------
+    # Ocupa uma das 'limit' vagas simultaneas do modelo
+    #----------------------------------------------------------------
+    # A espera segue a prioridade atual (ver priority). Se o limite
+    # mudar, o limitador do modelo e ajustado sem perder as vagas
+    # ocupadas.
+    #----------------------------------------------------------------
+    @asynccontextmanager
+    async def slot(self, model_name: str, limit: int):
+        with self._condition:
+            limiter = self._limiters.get(model_name)
+            if limiter is None:
+                limiter = self._limiters[model_name] = ConcurrencyLimiter(limit)
+            elif limiter.limit != max(1, int(limit)):
+                limiter.set_limit(limit)
+
+        await limiter.acquire(_current_priority.get())
+        try:
+            yield
+        finally:
+            limiter.release()
+
+
+
+
+    #----------------------------------------------------------------
+    # Executa uma chamada sincrona respeitando limites e tentativas
+    #----------------------------------------------------------------
+    def execute(self, model_name: str, call: Callable[[], Any], estimated_tokens: int = 0) -> Any:
+        attempt = 0
+        while True:
+            self._acquire(model_name, estimated_tokens)
+            try:
+                return call()
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+                attempt += 1
+                time.sleep(delay)
+
+
+
+
+    #----------------------------------------------------------------
+    # Executa uma chamada em streaming respeitando limites e tentativas
+    #----------------------------------------------------------------
+    # open_stream: abre o stream (o SDK so faz a requisicao ao iterar)
+    # Falhas antes do primeiro item sao tentadas de novo como em
+    # execute. Depois que algum item foi entregue o erro e repassado:
+    # repetir o stream duplicaria o texto ja recebido pelo chamador,
+    # que decide como refazer (ver _stream_consolidation).
+    #----------------------------------------------------------------
+    def execute_stream(self, model_name: str, open_stream: Callable[[], Iterable[Any]], estimated_tokens: int = 0) -> Iterator[Any]:
+        attempt = 0
+        while True:
+            self._acquire(model_name, estimated_tokens)
+            started = False
+            try:
+                for item in open_stream():
+                    started = True
+                    yield item
+                return
+            except Exception as e:
+                delay = None if started else self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+                attempt += 1
+                time.sleep(delay)
+
+
+
+
+    #----------------------------------------------------------------
+    # Executa uma chamada assincrona respeitando limites e tentativas
+    #----------------------------------------------------------------
+    async def aexecute(self, model_name: str, call: Callable[[], Awaitable[Any]], estimated_tokens: int = 0) -> Any:
+        attempt = 0
+        while True:
+            await self._aacquire(model_name, estimated_tokens)
+            try:
+                return await call()
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+                attempt += 1
+                await asyncio.sleep(delay)
+
+
+
+
+    #----------------------------------------------------------------
+    # Aguarda a vez na fila e a capacidade dos baldes do modelo
+    #----------------------------------------------------------------
+    def _acquire(self, model_name: str, tokens: int) -> None:
+        ticket = self._enqueue(model_name)
+        with self._condition:
+            while True:
+                wait = self._try_admit(model_name, ticket, tokens)
+                if wait == 0:
+                    return
+                self._condition.wait(timeout=wait)
+
+
+    async def _aacquire(self, model_name: str, tokens: int) -> None:
+        ticket = self._enqueue(model_name)
+        try:
+            while True:
+                with self._condition:
+                    wait = self._try_admit(model_name, ticket, tokens)
+                if wait == 0:
+                    return
+                # corotinas nao podem bloquear no Condition: consultam de novo apos um intervalo
+                await asyncio.sleep(min(wait, 0.1))
+        except BaseException:
+            # tarefa cancelada: libera o lugar na fila
+            self._dequeue(model_name, ticket)
+            raise
+
+
+    def _enqueue(self, model_name: str) -> Tuple[int, int]:
+        ticket = (_current_priority.get(), next(self._sequence))
+        with self._condition:
+            heapq.heappush(self._queues.setdefault(model_name, []), ticket)
+        return ticket
+
+
+    def _dequeue(self, model_name: str, ticket: Tuple[int, int]) -> None:
+        with self._condition:
+            queue = self._queues.get(model_name, [])
+            if ticket in queue:
+                queue.remove(ticket)
+                heapq.heapify(queue)
+                self._condition.notify_all()
+
+
+    # Chamado com o lock: retorna 0 se admitido, ou quanto esperar
+    def _try_admit(self, model_name: str, ticket: Tuple[int, int], tokens: int) -> float:
+        queue = self._queues[model_name]
+        if queue[0] != ticket:
+            return 0.5
+
+        requests_bucket, tokens_bucket = self._get_buckets(model_name)
+        wait = max(requests_bucket.wait_time(1), tokens_bucket.wait_time(tokens))
+        if wait > 0:
+            self.stats["throttled_seconds"] += min(wait, 0.5)
+            return min(wait, 0.5)
+
+        requests_bucket.consume(1)
+        tokens_bucket.consume(tokens)
+        heapq.heappop(queue)
+        self.stats["requests"] += 1
+        self._condition.notify_all()
+        return 0
+
+
+    def _get_buckets(self, model_name: str) -> Tuple[TokenBucket, TokenBucket]:
+        if model_name not in self._buckets:
+            limits = self.model_limits.get(model_name.lower(), {})
+            self._buckets[model_name] = (
+                TokenBucket(limits.get("rpm", self.default_rpm)),
+                TokenBucket(limits.get("tpm", self.default_tpm)),
+            )
+        return self._buckets[model_name]
+
+
+
+
+    #----------------------------------------------------------------
+    # Decide se o erro justifica nova tentativa e quanto esperar
+    #----------------------------------------------------------------
+    # Retorna: segundos ate a proxima tentativa ou None (desistir)
+    #----------------------------------------------------------------
+    def _retry_delay(self, error: Exception, attempt: int) -> Optional[float]:
+        if attempt >= self.max_retries or not self.is_retryable(error):
+            return None
+
+        delay = min(self.max_delay, self.base_delay * (2 ** attempt))
+        delay = random.uniform(delay / 2, delay)
+        with self._condition:
+            self.stats["retries"] += 1
+        self.logger.warning(f"Erro transitório na API ({error}). Nova tentativa {attempt + 1}/{self.max_retries} em {delay:.1f}s.")
+        return delay
+
+
+    @staticmethod
+    def is_retryable(error: Exception) -> bool:
+        if isinstance(error, RETRYABLE_ERRORS):
+            return True
+        code = getattr(error, "code", None) or getattr(error, "status_code", None)
+        if isinstance(code, int):
+            return code in RETRYABLE_STATUS_CODES
+        message = str(error)
+        return any(marker in message for marker in RETRYABLE_MARKERS)
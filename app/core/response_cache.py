@@ -0,0 +1,194 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.core.logger import Logger
+from app.core.path_manager import PathManager
+
+
+#================================================================
+# CLASSE: ResponseCache
+#----------------------------------------------------------------
+# Cache em disco das respostas da IA, enderecado pelo conteudo
+# da requisicao: modelo + hash do prompt + hash das imagens.
+#
+# Cada entrada e um arquivo JSON em "data/cache/responses". A
+# ordem LRU e mantida pelo mtime dos arquivos (atualizado a cada
+# acerto), o tamanho total em disco e limitado e entradas mais
+# antigas que o TTL sao descartadas na leitura.
+#================================================================
+
+class ResponseCache:
+
+    def __init__(self, cache_dir: Optional[Path] = None, max_size_mb: float = 200.0, ttl_hours: float = 24.0):
+        self.logger = Logger(name="ResponseCache")
+        self.cache_dir = Path(cache_dir) if cache_dir else PathManager.get_response_cache_dir()
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024)
+        self.ttl_seconds = ttl_hours * 3600
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            self._current_size = sum(p.stat().st_size for p in self.cache_dir.glob("*.json"))
+        except OSError as e:
+            self.logger.error(f"Não foi possível preparar o diretório de cache '{self.cache_dir}': {e}")
+            self._current_size = 0
+
+
+
+
+    #----------------------------------------------------------------
+    # Monta a chave da entrada a partir do conteudo da requisicao
+    #----------------------------------------------------------------
+    @staticmethod
+    def build_key(kind: str, model_name: str, prompt: str, images: Optional[List[bytes]] = None, extra: Optional[Dict] = None) -> str:
+        payload = {
+            "kind": kind,
+            "model": model_name,
+            "prompt": hashlib.sha256(prompt.encode("utf-8")).hexdigest(),
+            "images": [hashlib.sha256(img).hexdigest() for img in (images or [])],
+            "extra": extra or {},
+        }
+        raw = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+
+
+    #----------------------------------------------------------------
+    # Obtem uma resposta do cache (None se ausente ou expirada)
+    #----------------------------------------------------------------
+    def get(self, key: str) -> Optional[Any]:
+        entry_path = self._entry_path(key)
+
+        with self._lock:
+            if not entry_path.exists():
+                self.misses += 1
+                return None
+
+            try:
+                entry = json.loads(entry_path.read_text(encoding="utf-8"))
+            except (OSError, json.JSONDecodeError) as e:
+                self.logger.warning(f"Entrada de cache corrompida '{entry_path.name}' será descartada: {e}")
+                self._remove(entry_path)
+                self.misses += 1
+                return None
+
+            if self.ttl_seconds > 0 and time.time() - entry.get("created_at", 0) > self.ttl_seconds:
+                self._remove(entry_path)
+                self.misses += 1
+                return None
+
+            # atualiza o mtime para manter a ordem LRU
+            try:
+                os.utime(entry_path, None)
+            except OSError:
+                pass
+
+            self.hits += 1
+            return entry.get("value")
+
+
+
+
+    #----------------------------------------------------------------
+    # Grava uma resposta no cache e aplica o limite de tamanho
+    #----------------------------------------------------------------
+    def set(self, key: str, value: Any) -> None:
+        if value is None:
+            return
+
+        entry_path = self._entry_path(key)
+        entry = {"created_at": time.time(), "value": value}
+
+        with self._lock:
+            try:
+                old_size = entry_path.stat().st_size if entry_path.exists() else 0
+                tmp_path = entry_path.with_suffix(".tmp")
+                tmp_path.write_text(json.dumps(entry, ensure_ascii=False), encoding="utf-8")
+                os.replace(tmp_path, entry_path)
+                self._current_size += entry_path.stat().st_size - old_size
+            except (OSError, TypeError, ValueError) as e:
+                self.logger.error(f"Erro ao gravar entrada de cache '{entry_path.name}': {e}")
+                return
+
+            self._evict_if_needed()
+
+
+
+
+    #----------------------------------------------------------------
+    # Remove todas as entradas do cache
+    #----------------------------------------------------------------
+    def clear(self) -> None:
+        with self._lock:
+            for entry_path in self.cache_dir.glob("*.json"):
+                self._remove(entry_path)
+            self._current_size = 0
+        self.logger.info("Cache de respostas limpo.")
+
+
+
+
+    #----------------------------------------------------------------
+    # Obtem estatisticas de uso do cache
+    #----------------------------------------------------------------
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size_bytes": self._current_size,
+            "max_size_bytes": self.max_size_bytes,
+        }
+
+
+
+
+    #----------------------------------------------------------------
+    # Descarta as entradas menos usadas ate caber no limite
+    #----------------------------------------------------------------
+    def _evict_if_needed(self) -> None:
+        if self.max_size_bytes <= 0 or self._current_size <= self.max_size_bytes:
+            return
+
+        entries = []
+        for entry_path in self.cache_dir.glob("*.json"):
+            try:
+                stat = entry_path.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry_path))
+            except OSError:
+                continue
+
+        entries.sort(key=lambda item: item[0])
+        self._current_size = sum(size for _, size, _ in entries)
+
+        evicted = 0
+        for _, size, entry_path in entries:
+            if self._current_size <= self.max_size_bytes:
+                break
+            self._remove(entry_path)
+            evicted += 1
+
+        if evicted:
+            self.logger.info(f"{evicted} entrada(s) removida(s) do cache de respostas por limite de tamanho.")
+
+
+
+
+    def _remove(self, entry_path: Path) -> None:
+        try:
+            size = entry_path.stat().st_size
+            entry_path.unlink()
+            self._current_size = max(0, self._current_size - size)
+        except OSError:
+            pass
+
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
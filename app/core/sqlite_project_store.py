@@ -0,0 +1,521 @@
+import json
+import sqlite3
+import argparse
+from pathlib import Path
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from app.core.logger import Logger
+from app.core.path_manager import PathManager
+
+
+CATEGORIES = ["estatuto", "ata", "identificacao", "licenca", "programacao"]
+
+# Secoes de uma extracao guardadas campo a campo na tabela 'fields'
+FIELD_SECTIONS = ("content_fields", "ignored_fields")
+
+# Chaves de uma extracao guardadas em colunas de 'extractions' (o resto vai em 'extra')
+EXTRACTION_COLUMNS = ("consolidated_text", "workflow_used", "extracted_at", "last_modified", "reviewed", "partial")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS projects (
+    name            TEXT PRIMARY KEY,
+    path            TEXT,
+    current_step    INTEGER NOT NULL DEFAULT 1,
+    created_at      TEXT NOT NULL,
+    last_modified   TEXT NOT NULL,
+    version         INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS files (
+    project     TEXT NOT NULL REFERENCES projects(name) ON DELETE CASCADE,
+    category    TEXT NOT NULL,
+    position    INTEGER NOT NULL,
+    path        TEXT NOT NULL,
+    PRIMARY KEY (project, category, position)
+);
+
+CREATE TABLE IF NOT EXISTS extractions (
+    project             TEXT NOT NULL REFERENCES projects(name) ON DELETE CASCADE,
+    category            TEXT NOT NULL,
+    consolidated_text   TEXT,
+    workflow_used       TEXT,
+    extracted_at        TEXT,
+    last_modified       TEXT,
+    reviewed            INTEGER,
+    partial             INTEGER,
+    extra               TEXT NOT NULL DEFAULT '{}',
+    PRIMARY KEY (project, category)
+);
+
+CREATE TABLE IF NOT EXISTS fields (
+    project     TEXT NOT NULL,
+    category    TEXT NOT NULL,
+    section     TEXT NOT NULL,
+    name        TEXT NOT NULL,
+    position    INTEGER NOT NULL,
+    value       TEXT NOT NULL,
+    PRIMARY KEY (project, category, section, name),
+    FOREIGN KEY (project, category) REFERENCES extractions(project, category) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS criteria_results (
+    project         TEXT NOT NULL REFERENCES projects(name) ON DELETE CASCADE,
+    criterion_id    TEXT NOT NULL,
+    position        INTEGER NOT NULL,
+    status          TEXT,
+    data            TEXT NOT NULL,
+    PRIMARY KEY (project, criterion_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_fields_name ON fields(name);
+CREATE INDEX IF NOT EXISTS idx_criteria_status ON criteria_results(status);
+"""
+
+
+#================================================================
+# CLASSE: SQLiteProjectStore
+#----------------------------------------------------------------
+# Guarda os dados dos projetos em um unico arquivo SQLite no
+# diretorio de dados, no lugar de project.json, extracted/*.json e
+# criteria/results.json (os arquivos enviados continuam na pasta
+# do projeto).
+#
+#   projects           metadados do projeto
+#   files              arquivos base por categoria
+#   extractions        uma linha por categoria extraida
+#   fields             content_fields / ignored_fields, um campo
+#                      por linha (valores em JSON)
+#   criteria_results   um resultado de criterio por linha
+#
+# Cada operacao roda em uma transacao propria; editar um campo ou
+# o texto de uma categoria atualiza so as linhas envolvidas.
+# save_project incrementa projects.version e recusa metadados com
+# versao antiga (outra sessao gravou antes); extracoes e resultados
+# sao gravados sem mexer na versao.
+# Ativado com project_store = "sqlite" na configuracao.
+#================================================================
+
+class SQLiteProjectStore:
+
+    def __init__(self, db_path: Optional[Path] = None):
+        self.logger = Logger(name="SQLiteProjectStore")
+        self.db_path = Path(db_path) if db_path else PathManager.get_project_store_path()
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        # executescript confirma a transacao por conta propria
+        with self._reader() as conn:
+            conn.executescript(SCHEMA)
+            # bancos criados antes da coluna version
+            columns = [row["name"] for row in conn.execute("PRAGMA table_info(projects)")]
+            if "version" not in columns:
+                conn.execute("ALTER TABLE projects ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+
+
+
+
+    #----------------------------------------------------------------
+    # Conexao por operacao (seguro entre threads)
+    #----------------------------------------------------------------
+    # BEGIN IMMEDIATE reserva a escrita logo no inicio, evitando que
+    # duas transacoes leiam e depois disputem a mesma escrita.
+    #----------------------------------------------------------------
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            yield conn
+            conn.execute("COMMIT")
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+
+    @contextmanager
+    def _reader(self) -> Iterator[sqlite3.Connection]:
+        conn = self._connect()
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+
+
+
+    #----------------------------------------------------------------
+    # Projetos
+    #----------------------------------------------------------------
+    def project_exists(self, project_name: str) -> bool:
+        try:
+            with self._reader() as conn:
+                return conn.execute("SELECT 1 FROM projects WHERE name = ?", (project_name,)).fetchone() is not None
+        except sqlite3.Error as e:
+            self.logger.error(f"Erro ao consultar o projeto '{project_name}': {e}")
+            return False
+
+
+    def list_projects(self) -> List[str]:
+        try:
+            with self._reader() as conn:
+                return [row["name"] for row in conn.execute("SELECT name FROM projects ORDER BY name")]
+        except sqlite3.Error as e:
+            self.logger.error(f"Erro ao listar projetos: {e}")
+            return []
+
+
+    # Retorna os metadados no formato do project.json (sem dados extraidos)
+    def load_project_metadata(self, project_name: str) -> Optional[Dict]:
+        try:
+            with self._reader() as conn:
+                row = conn.execute("SELECT * FROM projects WHERE name = ?", (project_name,)).fetchone()
+                if row is None:
+                    return None
+                base_files: Dict[str, List[str]] = {}
+                for file_row in conn.execute(
+                    "SELECT category, path FROM files WHERE project = ? ORDER BY category, position", (project_name,)
+                ):
+                    base_files.setdefault(file_row["category"], []).append(file_row["path"])
+        except sqlite3.Error as e:
+            self.logger.error(f"Erro ao carregar o projeto '{project_name}': {e}")
+            return None
+
+        return {
+            "name": row["name"],
+            "path": row["path"],
+            "base_files": {category: base_files.get(category, []) for category in CATEGORIES} | base_files,
+            "current_step": row["current_step"],
+            "created_at": row["created_at"],
+            "last_modified": row["last_modified"],
+            "version": row["version"],
+        }
+
+
+    #----------------------------------------------------------------
+    # Salva o projeto em uma unica transacao
+    #----------------------------------------------------------------
+    # extractions / criteria_results: so o que deve ser regravado
+    # (None deixa os dados atuais como estao)
+    # expected_version: versao lida pelo chamador; se o banco tiver
+    # outra, nada e gravado (None grava sem conferir, ex.: migracao)
+    # metadata["version"] e a versao gravada
+    #----------------------------------------------------------------
+    def save_project(self, metadata: Dict, extractions: Optional[Dict[str, Dict]] = None, criteria_results: Optional[List[Dict]] = None,
+                     expected_version: Optional[int] = None) -> bool:
+        name = metadata["name"]
+        try:
+            with self._transaction() as conn:
+                if expected_version is not None:
+                    row = conn.execute("SELECT version FROM projects WHERE name = ?", (name,)).fetchone()
+                    if row is not None and row["version"] != expected_version:
+                        self.logger.warning(
+                            f"Gravação recusada: o projeto '{name}' está na versão {row['version']}, "
+                            f"os dados enviados são da versão {expected_version}"
+                        )
+                        return False
+                conn.execute(
+                    """INSERT INTO projects (name, path, current_step, created_at, last_modified, version) VALUES (?, ?, ?, ?, ?, ?)
+                       ON CONFLICT(name) DO UPDATE SET path = excluded.path, current_step = excluded.current_step,
+                       created_at = excluded.created_at, last_modified = excluded.last_modified, version = excluded.version""",
+                    (name, metadata.get("path"), metadata.get("current_step", 1), metadata["created_at"], metadata["last_modified"],
+                     metadata.get("version", 0)),
+                )
+                conn.execute("DELETE FROM files WHERE project = ?", (name,))
+                conn.executemany(
+                    "INSERT INTO files (project, category, position, path) VALUES (?, ?, ?, ?)",
+                    [
+                        (name, category, position, str(path))
+                        for category, paths in (metadata.get("base_files") or {}).items()
+                        for position, path in enumerate(paths or [])
+                    ],
+                )
+                for category, data in (extractions or {}).items():
+                    self._write_extraction(conn, name, category, data)
+                if criteria_results is not None:
+                    self._write_criteria_results(conn, name, criteria_results)
+            return True
+        except sqlite3.Error as e:
+            self.logger.error(f"Erro ao salvar o projeto '{name}' no banco: {e}", exc_info=True)
+            return False
+
+
+    def delete_project(self, project_name: str) -> bool:
+        try:
+            with self._transaction() as conn:
+                conn.execute("DELETE FROM projects WHERE name = ?", (project_name,))
+            return True
+        except sqlite3.Error as e:
+            self.logger.error(f"Erro ao deletar o projeto '{project_name}' do banco: {e}")
+            return False
+
+
+
+
+    #----------------------------------------------------------------
+    # Extracoes
+    #----------------------------------------------------------------
+    def load_extraction(self, project_name: str, category: str) -> Optional[Dict]:
+        try:
+            with self._reader() as conn:
+                row = conn.execute(
+                    "SELECT * FROM extractions WHERE project = ? AND category = ?", (project_name, category)
+                ).fetchone()
+                if row is None:
+                    return None
+                field_rows = conn.execute(
+                    "SELECT section, name, value FROM fields WHERE project = ? AND category = ? ORDER BY section, position",
+                    (project_name, category),
+                ).fetchall()
+        except sqlite3.Error as e:
+            self.logger.error(f"Erro ao carregar a extração '{category}' do projeto '{project_name}': {e}")
+            return None
+
+        data: Dict[str, Any] = {}
+        for field_row in field_rows:
+            data.setdefault(field_row["section"], {})[field_row["name"]] = json.loads(field_row["value"])
+        for column in EXTRACTION_COLUMNS:
+            if row[column] is not None:
+                data[column] = bool(row[column]) if column in ("reviewed", "partial") else row[column]
+        data.update(json.loads(row["extra"]))
+        return data
+
+
+    def save_extraction(self, project_name: str, category: str, data: Dict) -> bool:
+        try:
+            with self._transaction() as conn:
+                self._write_extraction(conn, project_name, category, data)
+            return True
+        except sqlite3.Error as e:
+            self.logger.error(f"Erro ao salvar a extração '{category}' do projeto '{project_name}': {e}", exc_info=True)
+            return False
+
+
+    #----------------------------------------------------------------
+    # Atualizacao parcial de uma extracao existente
+    #----------------------------------------------------------------
+    # values: chaves de primeiro nivel (ex.: consolidated_text)
+    # content_fields: campos a inserir/atualizar, um por linha
+    # Retorna: False se a categoria ainda nao foi extraida
+    #----------------------------------------------------------------
+    def update_extraction(self, project_name: str, category: str, values: Dict, content_fields: Optional[Dict] = None) -> bool:
+        try:
+            with self._transaction() as conn:
+                row = conn.execute(
+                    "SELECT extra FROM extractions WHERE project = ? AND category = ?", (project_name, category)
+                ).fetchone()
+                if row is None:
+                    return False
+
+                columns = {key: value for key, value in values.items() if key in EXTRACTION_COLUMNS}
+                extra = {key: value for key, value in values.items() if key not in EXTRACTION_COLUMNS and key not in FIELD_SECTIONS}
+                if extra:
+                    columns["extra"] = json.dumps(json.loads(row["extra"]) | extra, ensure_ascii=False)
+                if columns:
+                    assignments = ", ".join(f"{column} = ?" for column in columns)
+                    conn.execute(
+                        f"UPDATE extractions SET {assignments} WHERE project = ? AND category = ?",
+                        (*columns.values(), project_name, category),
+                    )
+
+                for name, value in (content_fields or {}).items():
+                    self._upsert_field(conn, project_name, category, "content_fields", name, value)
+            return True
+        except sqlite3.Error as e:
+            self.logger.error(f"Erro ao atualizar a extração '{category}' do projeto '{project_name}': {e}", exc_info=True)
+            return False
+
+
+    def _write_extraction(self, conn: sqlite3.Connection, project_name: str, category: str, data: Dict) -> None:
+        columns = {column: data.get(column) for column in EXTRACTION_COLUMNS}
+        extra = {
+            key: value for key, value in data.items()
+            if key not in EXTRACTION_COLUMNS and not (key in FIELD_SECTIONS and isinstance(value, dict))
+        }
+        conn.execute("DELETE FROM fields WHERE project = ? AND category = ?", (project_name, category))
+        conn.execute(
+            f"""INSERT OR REPLACE INTO extractions (project, category, {", ".join(EXTRACTION_COLUMNS)}, extra)
+                VALUES (?, ?, {", ".join("?" for _ in EXTRACTION_COLUMNS)}, ?)""",
+            (project_name, category, *columns.values(), json.dumps(extra, ensure_ascii=False)),
+        )
+        conn.executemany(
+            "INSERT INTO fields (project, category, section, name, position, value) VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (project_name, category, section, name, position, json.dumps(value, ensure_ascii=False))
+                for section in FIELD_SECTIONS if isinstance(data.get(section), dict)
+                for position, (name, value) in enumerate(data[section].items())
+            ],
+        )
+
+
+    @staticmethod
+    def _upsert_field(conn: sqlite3.Connection, project_name: str, category: str, section: str, name: str, value: Any) -> None:
+        encoded = json.dumps(value, ensure_ascii=False)
+        updated = conn.execute(
+            "UPDATE fields SET value = ? WHERE project = ? AND category = ? AND section = ? AND name = ?",
+            (encoded, project_name, category, section, name),
+        ).rowcount
+        if not updated:
+            conn.execute(
+                """INSERT INTO fields (project, category, section, name, position, value)
+                   SELECT ?, ?, ?, ?, COALESCE(MAX(position) + 1, 0), ? FROM fields
+                   WHERE project = ? AND category = ? AND section = ?""",
+                (project_name, category, section, name, encoded, project_name, category, section),
+            )
+
+
+
+
+    #----------------------------------------------------------------
+    # Resultados de criterios
+    #----------------------------------------------------------------
+    def load_criteria_results(self, project_name: str) -> Optional[List[Dict]]:
+        try:
+            with self._reader() as conn:
+                rows = conn.execute(
+                    "SELECT data FROM criteria_results WHERE project = ? ORDER BY position", (project_name,)
+                ).fetchall()
+        except sqlite3.Error as e:
+            self.logger.error(f"Erro ao carregar os resultados de critérios do projeto '{project_name}': {e}")
+            return None
+        return [json.loads(row["data"]) for row in rows] if rows else None
+
+
+    def save_criteria_results(self, project_name: str, results: List[Dict]) -> bool:
+        try:
+            with self._transaction() as conn:
+                self._write_criteria_results(conn, project_name, results)
+            return True
+        except sqlite3.Error as e:
+            self.logger.error(f"Erro ao salvar os resultados de critérios do projeto '{project_name}': {e}", exc_info=True)
+            return False
+
+
+    @staticmethod
+    def _write_criteria_results(conn: sqlite3.Connection, project_name: str, results: Any) -> None:
+        conn.execute("DELETE FROM criteria_results WHERE project = ?", (project_name,))
+        if not isinstance(results, list):
+            return
+        conn.executemany(
+            "INSERT OR REPLACE INTO criteria_results (project, criterion_id, position, status, data) VALUES (?, ?, ?, ?, ?)",
+            [
+                (project_name, str(result.get("id", position)), position, result.get("status"), json.dumps(result, ensure_ascii=False))
+                for position, result in enumerate(results) if isinstance(result, dict)
+            ],
+        )
+
+
+
+
+    #----------------------------------------------------------------
+    # Consultas entre projetos
+    #----------------------------------------------------------------
+    # Contagem de status dos criterios: {projeto: {status: total}}
+    def criteria_status_summary(self) -> Dict[str, Dict[str, int]]:
+        summary: Dict[str, Dict[str, int]] = {}
+        with self._reader() as conn:
+            for row in conn.execute(
+                "SELECT project, status, COUNT(*) AS total FROM criteria_results GROUP BY project, status ORDER BY project"
+            ):
+                summary.setdefault(row["project"], {})[row["status"]] = row["total"]
+        return summary
+
+
+    # Valor de um campo extraido em todos os projetos: [{project, category, value}]
+    def find_field_values(self, field_name: str, category: Optional[str] = None) -> List[Dict]:
+        query = "SELECT project, category, value FROM fields WHERE section = 'content_fields' AND name = ?"
+        params: List[Any] = [field_name]
+        if category:
+            query += " AND category = ?"
+            params.append(category)
+        with self._reader() as conn:
+            return [
+                {"project": row["project"], "category": row["category"], "value": json.loads(row["value"])}
+                for row in conn.execute(query + " ORDER BY project, category", params)
+            ]
+
+
+
+
+    #----------------------------------------------------------------
+    # Migracao dos projetos no formato JSON
+    #----------------------------------------------------------------
+    # Le project.json, extracted/*.json e criteria/results.json de
+    # cada pasta de projeto e grava tudo no banco, um projeto por
+    # transacao. Os arquivos JSON nao sao apagados.
+    # Retorna: {projeto: "migrated" | "skipped" | "failed"}
+    #----------------------------------------------------------------
+    def migrate_from_json(self, projects_dir: Optional[Path] = None, overwrite: bool = False) -> Dict[str, str]:
+        projects_dir = Path(projects_dir) if projects_dir else PathManager.get_project_dir()
+        report: Dict[str, str] = {}
+        if not projects_dir.is_dir():
+            return report
+
+        for project_dir in sorted(projects_dir.iterdir()):
+            project_json = project_dir / "project.json"
+            if not project_json.is_file():
+                continue
+            try:
+                metadata = self._read_json(project_json)
+                name = metadata.get("name") or PathManager.extract_project_name_from_path(project_dir)
+                metadata["name"] = name
+                if self.project_exists(name) and not overwrite:
+                    report[name] = "skipped"
+                    continue
+
+                extractions = {}
+                for extracted_file in sorted((project_dir / "extracted").glob("*.json")):
+                    if extracted_file.stem in CATEGORIES:
+                        extractions[extracted_file.stem] = self._read_json(extracted_file)
+                criteria_file = project_dir / "criteria" / "results.json"
+                criteria_results = self._read_json(criteria_file) if criteria_file.is_file() else []
+
+                if overwrite:
+                    self.delete_project(name)
+                report[name] = "migrated" if self.save_project(metadata, extractions, criteria_results) else "failed"
+            except (OSError, ValueError, KeyError) as e:
+                self.logger.error(f"Erro ao migrar o projeto em '{project_dir}': {e}")
+                report[project_dir.name] = "failed"
+
+        self.logger.info(f"Migração para '{self.db_path}' concluída: {report}")
+        return report
+
+
+    @staticmethod
+    def _read_json(path: Path) -> Any:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+
+
+
+#----------------------------------------------------------------
+# Ferramenta de migracao: python -m app.core.sqlite_project_store
+#----------------------------------------------------------------
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Migra os projetos em JSON para o banco SQLite.")
+    parser.add_argument("--projects-dir", default=None, help="pasta dos projetos (padrão: data/projects)")
+    parser.add_argument("--db", default=None, help="arquivo do banco (padrão: data/projects.sqlite3)")
+    parser.add_argument("--overwrite", action="store_true", help="substitui projetos que já estão no banco")
+    args = parser.parse_args()
+
+    store = SQLiteProjectStore(Path(args.db) if args.db else None)
+    report = store.migrate_from_json(Path(args.projects_dir) if args.projects_dir else None, overwrite=args.overwrite)
+    for name, status in report.items():
+        print(f"{status:<9} {name}")
+    print(f"Banco: {store.db_path}")
+    print("Para usar o banco, defina \"project_store\": \"sqlite\" em app_config.json.")
+    return 0 if "failed" not in report.values() else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,146 @@
+import re
+from typing import Dict, List
+
+from app.core.token_tools import CHARS_PER_TOKEN, estimate_tokens
+
+
+# Inicio de artigo/capitulo em estatutos e atas ("Art. 5º", "Artigo 12", "CAPÍTULO III")
+ARTICLE_BOUNDARY = re.compile(r"^(?=\s*(?:Art\.?\s*\d+|Artigo\s+\d+|CAP[IÍ]TULO\s+[IVXLC\d]+))", re.IGNORECASE | re.MULTILINE)
+PARAGRAPH_BOUNDARY = re.compile(r"\n\s*\n")
+
+
+#================================================================
+# CLASSE: TextChunker
+#----------------------------------------------------------------
+# Divide textos longos em partes (chunks) que cabem no orcamento
+# de tokens de uma chamada, para a consolidacao em map-reduce.
+#
+# A divisao respeita, nesta ordem, os limites de pagina, de
+# artigo/capitulo e de paragrafo; so um paragrafo maior que o
+# orcamento e cortado no meio. Cada parte a partir da segunda traz
+# o final da parte anterior (overlap) como contexto, e stitch()
+# remove as linhas repetidas na juncao dos resultados.
+#================================================================
+
+class TextChunker:
+
+    def __init__(self, max_tokens: int = 24000, overlap_tokens: int = 400):
+        self.max_tokens = max(1, int(max_tokens))
+        self.overlap_tokens = max(0, int(overlap_tokens))
+
+
+
+
+    #----------------------------------------------------------------
+    # Divide as paginas em partes dentro do orcamento de tokens
+    #----------------------------------------------------------------
+    # Retorna: lista de {"text": str, "context": str}, onde "context"
+    # e o trecho final da parte anterior ("" na primeira)
+    #----------------------------------------------------------------
+    def split(self, pages: List[str]) -> List[Dict[str, str]]:
+        units: List[str] = []
+        for page in pages:
+            if page and page.strip():
+                units.extend(self._split_unit(page.strip()))
+
+        chunks: List[List[str]] = []
+        current: List[str] = []
+        current_tokens = 0
+
+        for unit in units:
+            # conta tambem o separador entre as unidades
+            unit_tokens = estimate_tokens(unit) + 1
+            if current and current_tokens + unit_tokens > self.max_tokens:
+                chunks.append(current)
+                current, current_tokens = [], 0
+            current.append(unit)
+            current_tokens += unit_tokens
+
+        if current:
+            chunks.append(current)
+
+        result = []
+        for index, chunk_units in enumerate(chunks):
+            context = self._tail(chunks[index - 1]) if index > 0 else ""
+            result.append({"text": "\n\n".join(chunk_units), "context": context})
+        return result
+
+
+
+
+    #----------------------------------------------------------------
+    # Une os resultados das partes removendo a sobreposicao
+    #----------------------------------------------------------------
+    def stitch(self, parts: List[str]) -> str:
+        merged_lines: List[str] = []
+
+        for part in parts:
+            lines = (part or "").strip().splitlines()
+            overlap = self._find_line_overlap(merged_lines, lines)
+            if merged_lines and lines[overlap:]:
+                merged_lines.append("")
+            merged_lines.extend(lines[overlap:])
+
+        return "\n".join(merged_lines).strip()
+
+
+
+
+    #----------------------------------------------------------------
+    # Quebra um trecho maior que o orcamento: artigos, paragrafos e,
+    # em ultimo caso, corte por tamanho
+    #----------------------------------------------------------------
+    def _split_unit(self, text: str) -> List[str]:
+        if estimate_tokens(text) <= self.max_tokens:
+            return [text]
+
+        for boundary in (ARTICLE_BOUNDARY, PARAGRAPH_BOUNDARY):
+            pieces = [p.strip() for p in boundary.split(text) if p and p.strip()]
+            if len(pieces) > 1:
+                units = []
+                for piece in pieces:
+                    units.extend(self._split_unit(piece))
+                return self._merge_small(units)
+
+        max_chars = self.max_tokens * CHARS_PER_TOKEN
+        return [text[i:i + max_chars] for i in range(0, len(text), max_chars)]
+
+
+    def _merge_small(self, units: List[str]) -> List[str]:
+        merged: List[str] = []
+        for unit in units:
+            if merged and estimate_tokens(merged[-1]) + estimate_tokens(unit) <= self.max_tokens:
+                merged[-1] = merged[-1] + "\n\n" + unit
+            else:
+                merged.append(unit)
+        return merged
+
+
+
+
+    def _tail(self, units: List[str]) -> str:
+        if not self.overlap_tokens:
+            return ""
+        max_chars = self.overlap_tokens * CHARS_PER_TOKEN
+        text = "\n\n".join(units)
+        if len(text) <= max_chars:
+            return text
+        tail = text[-max_chars:]
+        # comeca o contexto no inicio de uma linha
+        newline = tail.find("\n")
+        return tail[newline + 1:] if 0 <= newline < len(tail) - 1 else tail
+
+
+    @staticmethod
+    def _find_line_overlap(previous: List[str], lines: List[str], max_lines: int = 30) -> int:
+        def normalize(line: str) -> str:
+            return " ".join(line.split()).lower()
+
+        prev_norm = [normalize(line) for line in previous[-max_lines:] if line.strip()]
+        next_norm = [(i, normalize(line)) for i, line in enumerate(lines[:max_lines]) if line.strip()]
+
+        # maior sufixo do texto anterior que se repete no inicio do proximo
+        for size in range(min(len(prev_norm), len(next_norm)), 0, -1):
+            if prev_norm[-size:] == [norm for _, norm in next_norm[:size]]:
+                return next_norm[size - 1][0] + 1
+        return 0
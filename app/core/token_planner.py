@@ -0,0 +1,192 @@
+import math
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.logger import Logger
+from app.core.image_encoder import get_image_size
+from app.core.token_tools import estimate_tokens
+
+
+# Precos de referencia em USD por 1 milhao de tokens: (entrada, saida).
+# O modelo e identificado pelo prefixo mais longo do nome (sem caixa).
+MODEL_PRICING: Dict[str, Tuple[float, float]] = {
+    "gemini-2.5-pro": (1.25, 10.00),
+    "gemini-2.5-flash-lite": (0.10, 0.40),
+    "gemini-2.5-flash": (0.30, 2.50),
+    "gemini-2.0-flash-lite": (0.075, 0.30),
+    "gemini-2.0-flash": (0.10, 0.40),
+    "gemini-1.5-pro": (1.25, 5.00),
+    "gemini-1.5-flash": (0.075, 0.30),
+}
+
+# Tokens lidos de um cached content do servidor custam essa fracao do
+# preco de entrada (mas contam normalmente no limite de contexto)
+CACHED_INPUT_PRICE_RATIO = 0.25
+
+# Imagens: ate 384px nos dois lados contam 258 tokens; maiores sao
+# divididas em blocos de 768x768, cada um contando 258 tokens.
+IMAGE_TOKENS_PER_TILE = 258
+IMAGE_SMALL_SIDE = 384
+IMAGE_TILE_SIDE = 768
+
+# Acoes do planejamento de uma etapa
+ACTION_SEND = "send"
+ACTION_CHUNK = "chunk"
+ACTION_REJECT = "reject"
+
+
+#================================================================
+# CLASSE: TokenPlanner
+#----------------------------------------------------------------
+# Estima o tamanho (tokens) e o custo de uma chamada a IA antes de
+# envia-la.
+#
+# A contagem e local por padrao (texto por caracteres, imagens pelas
+# dimensoes); com settings.token_count_with_sdk a contagem exata do
+# SDK (count_tokens) e usada, caindo para a estimativa local se a
+# chamada falhar.
+#
+# Etapas acima de settings.token_ceiling sao marcadas para divisao
+# (chunk), se puderem ser divididas, ou rejeitadas antes do envio.
+#================================================================
+
+class TokenPlanner:
+
+    def __init__(self, ai_client: Any = None, max_input_tokens: Optional[int] = None, use_sdk_count: Optional[bool] = None):
+        self.logger = Logger(name="TokenPlanner")
+        self.ai = ai_client
+        self.max_input_tokens = max_input_tokens if max_input_tokens is not None else settings.token_ceiling
+        self.use_sdk_count = settings.token_count_with_sdk if use_sdk_count is None else use_sdk_count
+
+
+
+
+    #----------------------------------------------------------------
+    # Estimativas locais
+    #----------------------------------------------------------------
+    @staticmethod
+    def estimate_text_tokens(text: Optional[str]) -> int:
+        return estimate_tokens(text)
+
+
+    @staticmethod
+    def estimate_image_tokens(images: Optional[List[bytes]]) -> int:
+        total = 0
+        for image in images or []:
+            size = get_image_size(image)
+            if size is None:
+                total += IMAGE_TOKENS_PER_TILE
+                continue
+            width, height = size
+            if width <= IMAGE_SMALL_SIDE and height <= IMAGE_SMALL_SIDE:
+                total += IMAGE_TOKENS_PER_TILE
+            else:
+                tiles = math.ceil(width / IMAGE_TILE_SIDE) * math.ceil(height / IMAGE_TILE_SIDE)
+                total += tiles * IMAGE_TOKENS_PER_TILE
+        return total
+
+
+
+
+    #----------------------------------------------------------------
+    # Conta os tokens de entrada de uma chamada
+    #----------------------------------------------------------------
+    # Retorna: (tokens, origem) com origem "sdk" ou "local"
+    #----------------------------------------------------------------
+    def count_input_tokens(self, prompt: str, model_name: str, images: Optional[List[bytes]] = None) -> Tuple[int, str]:
+        if self.use_sdk_count and self.ai is not None:
+            counted = self.ai.count_tokens(prompt, model_name, images)
+            if counted is not None:
+                return counted, "sdk"
+
+        return self.estimate_text_tokens(prompt) + self.estimate_image_tokens(images), "local"
+
+
+
+
+    #----------------------------------------------------------------
+    # Estima o custo em USD (None se o modelo nao tiver preco conhecido)
+    #----------------------------------------------------------------
+    # cached_tokens: parte de input_tokens lida do cache do servidor,
+    # cobrada a CACHED_INPUT_PRICE_RATIO do preco de entrada
+    #----------------------------------------------------------------
+    @staticmethod
+    def estimate_cost(model_name: str, input_tokens: int, output_tokens: int = 0, cached_tokens: int = 0) -> Optional[float]:
+        name = (model_name or "").lower()
+        matches = [prefix for prefix in MODEL_PRICING if name.startswith(prefix)]
+        if not matches:
+            return None
+        input_price, output_price = MODEL_PRICING[max(matches, key=len)]
+        billed_input = (input_tokens - cached_tokens) * input_price + cached_tokens * input_price * CACHED_INPUT_PRICE_RATIO
+        return (billed_input + output_tokens * output_price) / 1_000_000
+
+
+
+
+    #----------------------------------------------------------------
+    # Planeja uma etapa do fluxo
+    #----------------------------------------------------------------
+    # chunkable: a etapa pode ser dividida se exceder o limite
+    # expected_output_tokens: estimativa da saida, usada no custo
+    # cached_tokens: tokens de um contexto em cache que precede o
+    #   prompt; entram no limite e no total, e custam menos se
+    #   cached_discount=True (cache do servidor)
+    # Retorna: {"step", "model", "input_tokens", "cached_tokens",
+    #           "count_source", "estimated_cost_usd", "action"}
+    #----------------------------------------------------------------
+    def plan_step(
+            self,
+            step: str,
+            prompt: str,
+            model_name: str,
+            images: Optional[List[bytes]] = None,
+            chunkable: bool = False,
+            expected_output_tokens: int = 0,
+            cached_tokens: int = 0,
+            cached_discount: bool = True
+        ) -> Dict[str, Any]:
+
+        input_tokens, source = self.count_input_tokens(prompt, model_name, images)
+        input_tokens += cached_tokens
+
+        action = ACTION_SEND
+        if self.max_input_tokens and input_tokens > self.max_input_tokens:
+            action = ACTION_CHUNK if chunkable else ACTION_REJECT
+            self.logger.warning(
+                f"Etapa '{step}' com ~{input_tokens} tokens excede o limite de {self.max_input_tokens}. "
+                f"Ação: {'dividir' if chunkable else 'rejeitar'}."
+            )
+
+        return {
+            "step": step,
+            "model": model_name,
+            "input_tokens": input_tokens,
+            "cached_tokens": cached_tokens,
+            "count_source": source,
+            "estimated_cost_usd": self.estimate_cost(model_name, input_tokens, expected_output_tokens,
+                                                     cached_tokens if cached_discount else 0),
+            "action": action,
+        }
+
+
+
+
+    #----------------------------------------------------------------
+    # Soma os planos de um fluxo
+    #----------------------------------------------------------------
+    @staticmethod
+    def summarize(plans: List[Dict[str, Any]]) -> Dict[str, Any]:
+        costs = [plan["estimated_cost_usd"] for plan in plans if plan.get("estimated_cost_usd") is not None]
+        return {
+            "steps": len(plans),
+            "input_tokens": sum(plan["input_tokens"] for plan in plans),
+            "estimated_cost_usd": sum(costs) if costs else None,
+            "rejected": sum(1 for plan in plans if plan["action"] == ACTION_REJECT),
+        }
+
+
+    @staticmethod
+    def format_summary(summary: Dict[str, Any]) -> str:
+        cost = summary.get("estimated_cost_usd")
+        cost_text = f"US$ {cost:.4f}" if cost is not None else "custo desconhecido"
+        return f"{summary['steps']} chamada(s), ~{summary['input_tokens']} tokens de entrada, {cost_text}"
@@ -0,0 +1,11 @@
+from typing import Optional
+
+# Estimativa local de tokens, sem chamada a API.
+# Para textos em portugues o Gemini gera, em media, ~1 token a cada 4 caracteres.
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: Optional[str]) -> int:
+    if not text:
+        return 0
+    return max(1, (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN)
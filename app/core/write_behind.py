@@ -0,0 +1,195 @@
+import os
+import copy
+import json
+import time
+import atexit
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from app.core.config import settings
+from app.core.logger import Logger
+from app.core.project_cache import project_cache
+
+
+#================================================================
+# CLASSE: WriteBehindWriter
+#----------------------------------------------------------------
+# Gravacao adiada (write-behind) dos arquivos JSON dos projetos.
+#
+#   - write() so registra o novo conteudo; gravacoes seguidas do
+#     mesmo arquivo dentro da janela de delay_seconds viram uma
+#     so (vale o ultimo conteudo)
+#   - Uma thread em segundo plano grava o lote pendente: primeiro
+#     todos os arquivos temporarios, depois um os.replace atomico
+#     para cada arquivo. Um arquivo nunca fica pela metade
+#   - lookup() devolve o conteudo pendente, para que as leituras
+#     vejam a ultima escrita antes de ela chegar ao disco
+#   - flush() grava na hora (ex.: antes de exportar) e tambem roda
+#     ao encerrar o processo
+#
+# delay_seconds <= 0 grava na hora, ainda com troca atomica.
+#================================================================
+
+class WriteBehindWriter:
+
+    def __init__(self, delay_seconds: float = 0.5, on_written: Optional[Callable[[Path, Any], None]] = None):
+        self.logger = Logger(name="WriteBehindWriter")
+        self.delay_seconds = delay_seconds
+        self.on_written = on_written
+
+        self._pending: Dict[str, Any] = {}
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.stats = {"writes": 0, "flushed_files": 0, "batches": 0, "errors": 0}
+
+        atexit.register(self.flush)
+
+
+
+
+    #----------------------------------------------------------------
+    # Registra o novo conteudo de um arquivo
+    #----------------------------------------------------------------
+    # Retorna: False so se a gravacao imediata (delay <= 0) falhou;
+    # falhas da gravacao adiada ficam no log e sao tentadas de novo
+    #----------------------------------------------------------------
+    def write(self, path: Path, data: Any) -> bool:
+        if self.delay_seconds <= 0:
+            with self._flush_lock:
+                written, _ = self._write_batch({str(path): copy.deepcopy(data)})
+            return bool(written)
+
+        with self._condition:
+            self._pending[str(path)] = copy.deepcopy(data)
+            self.stats["writes"] += 1
+            self._ensure_thread()
+            self._condition.notify()
+        return True
+
+
+    # Retorna: (True, copia do conteudo pendente) ou (False, None)
+    def lookup(self, path: Path) -> Tuple[bool, Any]:
+        with self._condition:
+            if str(path) not in self._pending:
+                return False, None
+            return True, copy.deepcopy(self._pending[str(path)])
+
+
+    # Descarta as escritas pendentes de um diretorio (ex.: projeto deletado)
+    # (espera uma gravacao em andamento terminar)
+    def discard(self, directory: Path) -> None:
+        with self._flush_lock, self._condition:
+            for key in self._matching(str(directory)):
+                del self._pending[key]
+
+
+
+
+    #----------------------------------------------------------------
+    # Grava agora as escritas pendentes
+    #----------------------------------------------------------------
+    # directory: so as escritas dentro dele (None = todas)
+    # Retorna: True se tudo foi gravado
+    #----------------------------------------------------------------
+    def flush(self, directory: Optional[Path] = None) -> bool:
+        with self._flush_lock:
+            with self._condition:
+                keys = self._matching(str(directory)) if directory else list(self._pending)
+                batch = {key: self._pending[key] for key in keys}
+            if not batch:
+                return True
+
+            written, dropped = self._write_batch(batch)
+
+            # so sai da fila o que nao recebeu uma escrita mais nova durante a gravacao
+            with self._condition:
+                for key in written + dropped:
+                    if self._pending.get(key) is batch[key]:
+                        del self._pending[key]
+            return len(written) == len(batch)
+
+
+
+
+    #----------------------------------------------------------------
+    # Thread de gravacao: espera a janela e grava o lote
+    #----------------------------------------------------------------
+    def _ensure_thread(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="WriteBehindWriter", daemon=True)
+            self._thread.start()
+
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._pending:
+                    self._condition.wait()
+            # junta as escritas que chegarem dentro da janela
+            time.sleep(self.delay_seconds)
+            if not self.flush():
+                # falha de disco: tenta de novo na proxima janela
+                time.sleep(self.delay_seconds)
+
+
+    #----------------------------------------------------------------
+    # Grava um lote: temporarios primeiro, depois os.replace
+    #----------------------------------------------------------------
+    # Chamado com _flush_lock (o nome do temporario so e unico entre
+    # processos).
+    # Retorna: (gravados, descartados). Conteudo que nao vira JSON e
+    # descartado; falhas de disco ficam na fila para nova tentativa
+    #----------------------------------------------------------------
+    def _write_batch(self, batch: Dict[str, Any]) -> Tuple[List[str], List[str]]:
+        staged: List[Tuple[str, Path]] = []
+        dropped: List[str] = []
+        for key, data in batch.items():
+            path = Path(key)
+            tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+            try:
+                value = data.model_dump() if isinstance(data, BaseModel) else data
+                content = json.dumps(value, indent=2, ensure_ascii=False)
+            except (TypeError, ValueError) as e:
+                self.stats["errors"] += 1
+                self.logger.error(f"Conteúdo de '{path}' não pode ser gravado como JSON, escrita descartada: {e}")
+                dropped.append(key)
+                continue
+            try:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path.write_text(content, encoding="utf-8")
+                staged.append((key, tmp_path))
+            except OSError as e:
+                self.stats["errors"] += 1
+                self.logger.error(f"Erro ao gravar '{path}': {e}")
+                tmp_path.unlink(missing_ok=True)
+
+        written = []
+        for key, tmp_path in staged:
+            try:
+                os.replace(tmp_path, key)
+                written.append(key)
+            except OSError as e:
+                self.stats["errors"] += 1
+                self.logger.error(f"Erro ao substituir '{key}': {e}")
+                tmp_path.unlink(missing_ok=True)
+                continue
+            if self.on_written:
+                self.on_written(Path(key), batch[key])
+
+        self.stats["batches"] += 1
+        self.stats["flushed_files"] += len(written)
+        return written, dropped
+
+
+    def _matching(self, prefix: str) -> List[str]:
+        return [key for key in self._pending if key == prefix or key.startswith(prefix + "/") or key.startswith(prefix + "\\")]
+
+
+
+
+# Instancia unica: todos os ProjectCRUDService compartilham a fila
+project_writer = WriteBehindWriter(settings.write_behind_delay_ms / 1000, on_written=project_cache.store)
@@ -82,9 +82,15 @@ def render_extraction_interface(project_name:str, category_key: str, category_in
     
     # -- Botão --
     if st.button(f"🤖 Iniciar Extração de IA para **{category_info['name']}**", key=f"extract_{category_key}", type="primary", use_container_width=True):
+        # -- Texto exibido a medida que a IA responde --
+        preview = st.empty()
+
+        def show_partial(text: str):
+            preview.container(height=300, border=True).text(text)
+
         with st.spinner(f"Analisando documentos e extraindo dados de '{category_info['name']}'..."):
 
-            success = project_manager.run_extraction(project_name, category_key)
+            success = project_manager.run_streaming_extraction(project_name, category_key, on_partial=show_partial)
 
             if success:
                 st.success(f"✅ Extração de '{category_info['name']}' concluída!")
@@ -207,6 +213,37 @@ def render_editing_interface(category_key: str, category_info: Dict, files: List
             confirm_reextraction()
 
 
+#---------------------------------------------------------------
+# Extrai todas as categorias de uma vez (pipeline do projeto).
+#---------------------------------------------------------------
+STATUS_ICONS = {'running': '⏳', 'done': '✅', 'resumed': '↩️', 'failed': '❌', 'skipped': '⏭️'}
+
+def render_project_pipeline(project_name: str):
+    if not st.button("⚡ Extrair Todas as Categorias", key="extract_all", use_container_width=True):
+        return
+
+    node_lines = {}
+    with st.status("Executando a extração do projeto...", expanded=True) as status_box:
+        lines = st.empty()
+
+        # -- Atualiza a lista de etapas a cada mudanca de estado --
+        def show_status(node_id: str, status: str, info: Dict):
+            step, category = node_id.split(":", 1)
+            label = CATEGORIES.get(category, {}).get('name', category)
+            node_lines[node_id] = f"{STATUS_ICONS.get(status, '•')} {label} — {step}"
+            lines.markdown("  \n".join(node_lines.values()))
+
+        statuses = project_manager.run_project_extraction(project_name, on_status=show_status)
+
+        if statuses and all(status in ('done', 'resumed') for status in statuses.values()):
+            status_box.update(label="Extração do projeto concluída!", state="complete")
+            logger.info(f"Pipeline de extração concluído para '{project_name}'")
+        else:
+            status_box.update(label="Extração concluída com falhas. Clique de novo para retomar.", state="error")
+            logger.warning(f"Pipeline de extração com falhas para '{project_name}': {statuses}")
+
+
+
 #---------------------------------------------------------------
 # Renderiza uma seção completa para uma categoria de documento.
 #---------------------------------------------------------------
@@ -263,6 +300,7 @@ else:
     st.caption("Nesta seção, você pode iniciar a extração de dados com a IA para cada categoria de documento e, posteriormente, revisar e editar o texto consolidado.")
     st.divider()
 
+    render_project_pipeline(current_project)
 
     for key, info in CATEGORIES.items():
         render_category_section(current_project, key, info)
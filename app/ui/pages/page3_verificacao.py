@@ -149,11 +149,27 @@ st.divider()
 
 pending_checks_count = len([c for c in all_criteria if c['id'] not in results_map])
 if st.button(f"▶️ Verificar todos os {pending_checks_count} critérios pendentes", type="primary", disabled=pending_checks_count == 0):
+    progress_bar = st.progress(0.0, text="Analisando documentos e aplicando todos os critérios...")
+
+    def update_progress(criterion, result, completed, total):
+        progress_bar.progress(completed / total, text=f"{completed}/{total} critérios verificados ({criterion['title']})")
+
     with st.spinner("Analisando documentos e aplicando todos os critérios... Isso pode levar alguns minutos."):
-        project_manager.execute_criteria_verification(current_project)
+        project_manager.execute_criteria_verification(current_project, progress_callback=update_progress)
     st.success("Verificação em lote concluída!")
     st.rerun()
 
+if results_map and st.button("🔁 Re-verificar apenas critérios com documentos alterados", type="secondary"):
+    progress_bar = st.progress(0.0, text="Comparando documentos com a última verificação...")
+
+    def update_incremental_progress(criterion, result, completed, total):
+        progress_bar.progress(completed / total, text=f"{completed}/{total} critérios ({criterion['title']})")
+
+    with st.spinner("Re-verificando critérios cujos documentos foram alterados..."):
+        project_manager.execute_incremental_criteria_verification(current_project, progress_callback=update_incremental_progress)
+    st.success("Re-verificação incremental concluída!")
+    st.rerun()
+
 st.divider()
 
 grouped_criteria = get_grouped_criteria(all_criteria)
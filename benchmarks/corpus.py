@@ -0,0 +1,148 @@
+import json
+import random
+from pathlib import Path
+from typing import Dict, List
+
+import docx
+import fitz  # PyMuPDF
+
+
+# Vocabulario dos documentos sinteticos (estatutos e atas de associacoes)
+WORDS = [
+    "associação", "comunitária", "rádio", "assembleia", "diretoria", "estatuto", "mandato",
+    "presidente", "tesoureiro", "secretário", "sede", "município", "membros", "conselho",
+    "finalidade", "lucrativos", "eleição", "convocação", "quórum", "deliberação", "reunião",
+]
+
+CATEGORIES = ["estatuto", "ata", "identificacao", "licenca", "programacao"]
+
+
+#================================================================
+# CLASSE: SyntheticCorpus
+#----------------------------------------------------------------
+# Gera os arquivos de um projeto sintetico para os benchmarks:
+#
+#   - PDFs com texto (paginas com artigos numerados)
+#   - PDFs digitalizados (paginas so com imagem, sem camada de texto)
+#   - DOCX
+#   - um banco de criterios com N criterios
+#
+# O conteudo e deterministico para a mesma semente, para que
+# execucoes diferentes sejam comparaveis.
+#================================================================
+
+class SyntheticCorpus:
+
+    def __init__(self, seed: int = 0):
+        self.rng = random.Random(seed)
+
+
+    def paragraph(self, words: int = 60) -> str:
+        return " ".join(self.rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+    def page_text(self, page_number: int, articles: int = 4) -> str:
+        lines = [f"CAPÍTULO {page_number}"]
+        for article in range(articles):
+            lines.append(f"Art. {page_number * articles + article + 1}º {self.paragraph()}")
+        return "\n\n".join(lines)
+
+
+
+
+    #----------------------------------------------------------------
+    # PDF com camada de texto
+    #----------------------------------------------------------------
+    def write_text_pdf(self, path: Path, pages: int) -> Path:
+        doc = fitz.open()
+        for number in range(1, pages + 1):
+            page = doc.new_page()
+            page.insert_textbox(fitz.Rect(50, 50, 545, 790), self.page_text(number), fontsize=9)
+        doc.save(str(path))
+        doc.close()
+        return path
+
+
+    #----------------------------------------------------------------
+    # PDF digitalizado: cada pagina e so uma imagem
+    #----------------------------------------------------------------
+    def write_scanned_pdf(self, path: Path, pages: int, dpi: int = 150) -> Path:
+        source = fitz.open()
+        for number in range(1, pages + 1):
+            page = source.new_page()
+            page.insert_textbox(fitz.Rect(50, 50, 545, 790), self.page_text(number), fontsize=9)
+
+        doc = fitz.open()
+        for page in source:
+            pixmap = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY)
+            scanned = doc.new_page(width=page.rect.width, height=page.rect.height)
+            scanned.insert_image(scanned.rect, stream=pixmap.tobytes("png"))
+        doc.save(str(path))
+        doc.close()
+        source.close()
+        return path
+
+
+    def write_docx(self, path: Path, paragraphs: int) -> Path:
+        document = docx.Document()
+        for number in range(paragraphs):
+            document.add_paragraph(f"Art. {number + 1}º {self.paragraph()}")
+        document.save(str(path))
+        return path
+
+
+
+
+    #----------------------------------------------------------------
+    # Banco de criterios no formato de criteria_database.json
+    #----------------------------------------------------------------
+    def criteria(self, count: int) -> List[Dict]:
+        criteria = []
+        for index in range(count):
+            category = CATEGORIES[index % len(CATEGORIES)]
+            criteria.append({
+                "id": f"BENCH_{index + 1:03d}",
+                "title": f"Critério sintético {index + 1}",
+                "description": "Critério gerado para benchmark.",
+                "category": "conteúdo",
+                "source_documents": [category],
+                "relevant_fields": {},
+                "prompt_instruction": f"Verifique se o documento menciona '{self.rng.choice(WORDS)}'. {self.paragraph(12)}",
+                "error_message": "Critério sintético não atendido.",
+            })
+        return criteria
+
+
+    def write_criteria(self, path: Path, count: int) -> Path:
+        path.write_text(json.dumps(self.criteria(count), indent=2, ensure_ascii=False), encoding="utf-8")
+        return path
+
+
+
+
+    #----------------------------------------------------------------
+    # Arquivos de um projeto, nomeados como os uploads ("<categoria>_*")
+    #----------------------------------------------------------------
+    # Retorna: {categoria: [caminhos]}
+    #----------------------------------------------------------------
+    def write_project_files(self, files_dir: Path, text_pages: int, scanned_pages: int, docx_paragraphs: int) -> Dict[str, List[str]]:
+        files_dir.mkdir(parents=True, exist_ok=True)
+        files = {category: [] for category in CATEGORIES}
+
+        def add(category: str, path: Path) -> None:
+            files[category].append(str(path))
+
+        add("estatuto", self.write_text_pdf(files_dir / "estatuto_texto.pdf", text_pages))
+        add("ata", self.write_scanned_pdf(files_dir / "ata_digitalizada.pdf", scanned_pages))
+        # documento misto: paginas com texto seguidas de paginas digitalizadas
+        mixed = files_dir / "licenca_mista.pdf"
+        self.write_text_pdf(mixed, max(1, text_pages // 4))
+        scanned = self.write_scanned_pdf(files_dir / "licenca_mista_scan.pdf", max(1, scanned_pages // 4))
+        with fitz.open(str(mixed)) as doc, fitz.open(str(scanned)) as scan_doc:
+            doc.insert_pdf(scan_doc)
+            doc.saveIncr()
+        scanned.unlink()
+        add("licenca", mixed)
+        add("programacao", self.write_docx(files_dir / "programacao_grade.docx", docx_paragraphs))
+        add("identificacao", self.write_scanned_pdf(files_dir / "identificacao_documentos.pdf", max(1, scanned_pages // 2)))
+        return files
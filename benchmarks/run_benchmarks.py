@@ -0,0 +1,331 @@
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import platform
+import tempfile
+import threading
+from pathlib import Path
+from datetime import datetime
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+try:
+    import psutil
+except ImportError:  # opcional: sem psutil o RSS dos processos filhos nao e somado
+    psutil = None
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from benchmarks.corpus import SyntheticCorpus
+
+
+PROJECT_NAME = "benchmark_project"
+REPORT_VERSION = 1
+
+
+#================================================================
+# Benchmark de ponta a ponta do JACA
+#----------------------------------------------------------------
+# Cria um diretorio de dados temporario (JACA_DATA_DIR) com um
+# projeto sintetico e roda os fluxos reais contra o backend falso de
+# IA (JACA_AI_BACKEND=fake):
+#
+#   extraction         pipeline do projeto (ingestao, consolidacao,
+#                      extracao secundaria), sem cache
+#   extraction_warm    o mesmo pipeline de novo, com os caches de
+#                      ingestao e de respostas preenchidos
+#   criteria           verificacao de todos os criterios
+#   criteria_incremental  verificacao incremental (nada mudou)
+#   export             pacote PDF final (ExportManager)
+#
+# Para cada etapa: tempo de parede, pico de RSS e contagem de
+# chamadas (backend falso, RequestScheduler, cache de respostas e
+# cache de projetos).
+# O relatorio JSON pode ser comparado com um anterior (--baseline).
+#
+# Uso: python -m benchmarks.run_benchmarks --profile realistic
+#================================================================
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark de ponta a ponta do JACA com o backend falso de IA.")
+    parser.add_argument("--profile", default="instant", help="perfil do backend falso (nome, JSON ou arquivo; ver FakeProfile)")
+    parser.add_argument("--text-pages", type=int, default=40, help="páginas do PDF de texto (estatuto)")
+    parser.add_argument("--scanned-pages", type=int, default=12, help="páginas do PDF digitalizado (ata)")
+    parser.add_argument("--docx-paragraphs", type=int, default=200, help="parágrafos do DOCX (programação)")
+    parser.add_argument("--criteria", type=int, default=60, help="número de critérios sintéticos")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--rpm", type=int, default=0, help="limite de requisições por minuto do app (0 = sem limite)")
+    parser.add_argument("--batch", action="store_true", help="verificação de critérios em lote")
+    parser.add_argument("--store", choices=["json", "sqlite"], default="json", help="armazenamento dos projetos")
+    parser.add_argument("--output", default=None, help="arquivo do relatório (padrão: benchmarks/results/<data>.json)")
+    parser.add_argument("--baseline", default=None, help="relatório anterior para comparação")
+    parser.add_argument("--data-dir", default=None, help="diretório de dados (padrão: temporário, apagado no fim)")
+    parser.add_argument("--verbose", action="store_true", help="mantém os logs de nível INFO")
+    return parser.parse_args()
+
+
+
+
+#----------------------------------------------------------------
+# Diretorio de dados isolado: configuracao, criterios e relatorio
+#----------------------------------------------------------------
+def prepare_data_dir(data_dir: Path, args: argparse.Namespace, corpus: SyntheticCorpus) -> None:
+    data_dir.mkdir(parents=True, exist_ok=True)
+    shutil.copy(REPO_ROOT / "app" / "data" / "report_config.json", data_dir / "report_config.json")
+    corpus.write_criteria(data_dir / "criteria_database.json", args.criteria)
+
+    config = {
+        "api_key": "",
+        "ai_backend": "fake",
+        "extraction_model": "gemini-2.5-flash",
+        "criteria_model": "gemini-2.5-flash",
+        "rate_limit_rpm": args.rpm,
+        "rate_limit_tpm": 0,
+        "criteria_batch_mode": args.batch,
+        "context_cache_mode": "server",
+        "project_store": args.store,
+    }
+    (data_dir / "app_config.json").write_text(json.dumps(config, indent=2), encoding="utf-8")
+
+
+
+
+#================================================================
+# CLASSE: StageMeter
+#----------------------------------------------------------------
+# Mede as etapas: tempo de parede, pico de RSS (amostrado em uma
+# thread) e a diferenca nos contadores de chamadas.
+#================================================================
+
+class StageMeter:
+
+    def __init__(self, ai_client: Any, project_cache: Any, sample_seconds: float = 0.02):
+        self.ai = ai_client
+        self.project_cache = project_cache
+        self.sample_seconds = sample_seconds
+        self.stages: Dict[str, Dict] = {}
+
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[Dict]:
+        extra: Dict[str, Any] = {}
+        before = self._counters()
+        peak = [current_rss_bytes()]
+        stop = threading.Event()
+
+        def sample() -> None:
+            while not stop.wait(self.sample_seconds):
+                peak[0] = max(peak[0], current_rss_bytes())
+
+        sampler = threading.Thread(target=sample, daemon=True)
+        sampler.start()
+        start = time.perf_counter()
+        try:
+            yield extra
+        finally:
+            wall = time.perf_counter() - start
+            stop.set()
+            sampler.join()
+            peak[0] = max(peak[0], current_rss_bytes())
+
+            self.stages[name] = {
+                "wall_seconds": round(wall, 4),
+                "peak_rss_mb": round(peak[0] / (1024 * 1024), 1),
+                "calls": self._diff(before, self._counters()),
+                **extra,
+            }
+            print(f"  {name:<22} {wall:8.2f}s  pico RSS {self.stages[name]['peak_rss_mb']:8.1f} MB")
+
+
+    def _counters(self) -> Dict[str, float]:
+        counters: Counter = Counter()
+        for key, value in getattr(self.ai.client, "stats", {}).items():
+            counters[f"backend.{key}"] = value
+        for key, value in self.ai.scheduler.stats.items():
+            counters[f"scheduler.{key}"] = value
+        cache = self.ai.cache.get_stats()
+        counters["response_cache.hits"] = cache["hits"]
+        counters["response_cache.misses"] = cache["misses"]
+        projects = self.project_cache.get_stats()
+        counters["project_cache.hits"] = projects["hits"]
+        counters["project_cache.misses"] = projects["misses"]
+        return counters
+
+
+    @staticmethod
+    def _diff(before: Dict[str, float], after: Dict[str, float]) -> Dict[str, float]:
+        diff = {}
+        for key in sorted(after):
+            delta = after[key] - before.get(key, 0)
+            if delta:
+                diff[key] = round(delta, 3) if isinstance(delta, float) else delta
+        return diff
+
+
+
+
+#----------------------------------------------------------------
+# RSS atual do processo (com os processos filhos, se houver psutil)
+#----------------------------------------------------------------
+def current_rss_bytes() -> int:
+    if psutil is not None:
+        process = psutil.Process()
+        total = process.memory_info().rss
+        for child in process.children(recursive=True):
+            try:
+                total += child.memory_info().rss
+            except psutil.Error:
+                pass
+        return total
+
+    statm = Path("/proc/self/statm")
+    if statm.exists():
+        return int(statm.read_text().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+    if resource is not None:
+        # ru_maxrss e o pico do processo (KB no Linux, bytes no macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    return 0
+
+
+def rss_source() -> str:
+    if psutil is not None:
+        return "psutil (processo + filhos)"
+    if Path("/proc/self/statm").exists():
+        return "/proc/self/statm (apenas o processo principal)"
+    return "ru_maxrss" if resource is not None else "indisponível"
+
+
+
+
+#----------------------------------------------------------------
+# Compara dois relatorios etapa a etapa
+#----------------------------------------------------------------
+def compare_reports(baseline: Dict, current: Dict) -> List[str]:
+    lines = []
+    for name, stage in current["stages"].items():
+        old = baseline.get("stages", {}).get(name)
+        if not old:
+            lines.append(f"  {name:<22} (nova etapa)")
+            continue
+        parts = []
+        for metric in ("wall_seconds", "peak_rss_mb"):
+            if old.get(metric):
+                change = (stage[metric] - old[metric]) / old[metric] * 100
+                parts.append(f"{metric} {old[metric]} -> {stage[metric]} ({change:+.1f}%)")
+        lines.append(f"  {name:<22} " + ", ".join(parts))
+    return lines
+
+
+
+
+def run(args: argparse.Namespace) -> Dict:
+    corpus = SyntheticCorpus(args.seed)
+    keep_data = args.data_dir is not None
+    data_dir = Path(args.data_dir) if keep_data else Path(tempfile.mkdtemp(prefix="jaca_bench_"))
+    prepare_data_dir(data_dir, args, corpus)
+
+    # precisa estar definido antes de importar o app (settings e o cliente sao criados na importacao)
+    os.environ["JACA_DATA_DIR"] = str(data_dir)
+    # o log vai para o diretorio do benchmark, nao para app/log.txt
+    os.environ["JACA_LOG_FILE"] = str(data_dir / "log.txt")
+    os.environ["JACA_AI_BACKEND"] = "fake"
+    os.environ["JACA_FAKE_PROFILE"] = args.profile
+    if not args.verbose:
+        logging.disable(logging.INFO)
+
+    from app.core.ai_client import gemini_client
+    from app.core.export_manager import ExportManager
+    from app.core.path_manager import PathManager
+    from app.core.project_cache import project_cache
+    from app.core.project_crud_service import ProjectCRUDService
+    from app.core.project_workflow_orchestrator import ProjectWorkflowOrchestrator
+
+    try:
+        crud = ProjectCRUDService()
+        crud.create_project(PROJECT_NAME)
+        project = crud.load_project(PROJECT_NAME)
+        project.base_files = corpus.write_project_files(
+            PathManager.get_project_files_dir(PROJECT_NAME), args.text_pages, args.scanned_pages, args.docx_paragraphs
+        )
+        crud.save_project(project)
+
+        orchestrator = ProjectWorkflowOrchestrator()
+        meter = StageMeter(gemini_client, project_cache)
+        print(f"Benchmark em {data_dir} (perfil '{args.profile}')")
+
+        with meter.stage("extraction") as extra:
+            statuses = orchestrator.run_project_extraction_pipeline(PROJECT_NAME, resume=False)
+            extra["nodes"] = statuses
+
+        with meter.stage("extraction_warm") as extra:
+            statuses = orchestrator.run_project_extraction_pipeline(PROJECT_NAME, resume=False, overwrite_existing=True)
+            extra["nodes"] = statuses
+
+        with meter.stage("criteria") as extra:
+            results = orchestrator.execute_criteria_verification(PROJECT_NAME)
+            extra["results"] = dict(Counter(result.get("status") for result in results))
+
+        with meter.stage("criteria_incremental") as extra:
+            results = orchestrator.execute_criteria_verification(PROJECT_NAME, incremental=True)
+            extra["results"] = dict(Counter(result.get("status") for result in results))
+
+        with meter.stage("export") as extra:
+            crud.flush(PROJECT_NAME)
+            export_dir = PathManager.get_project_exports_dir(PROJECT_NAME)
+            export_dir.mkdir(parents=True, exist_ok=True)
+            package = ExportManager().generate_full_package(crud.load_project(PROJECT_NAME), {}, str(export_dir))
+            extra["package_bytes"] = Path(package).stat().st_size
+
+        return {
+            "report_version": REPORT_VERSION,
+            "created_at": datetime.now().isoformat(),
+            "environment": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count(),
+                "rss_source": rss_source(),
+            },
+            "parameters": {key: value for key, value in vars(args).items() if key not in ("output", "baseline", "data_dir", "verbose")},
+            "fake_profile": gemini_client.client.profile.as_dict(),
+            "stages": meter.stages,
+        }
+    finally:
+        if not keep_data:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+
+
+
+def main() -> int:
+    args = parse_args()
+    report = run(args)
+
+    output = Path(args.output) if args.output else REPO_ROOT / "benchmarks" / "results" / f"{datetime.now():%Y%m%d_%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"Relatório salvo em {output}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        print("Comparação com", args.baseline)
+        print("\n".join(compare_reports(baseline, report)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())